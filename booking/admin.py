@@ -1,18 +1,94 @@
+import hashlib
+from abc import ABCMeta, abstractmethod
 from django.contrib import admin
-from .models import UserProfile, TravelOption, Booking
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import UserProfile, TravelOption, Booking, City, Passenger, RouteDaySummary
+
+# Unfiltered changelists trust the planner's row estimate above this size
+ESTIMATE_THRESHOLD = 10000
+COUNT_CACHE_TTL = 60
+FILTER_CACHE_TTL = 300
+
+def estimated_row_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # reltuples is -1 until the table is first analyzed
+    return int(row[0]) if row and row[0] >= 0 else None
+
+class EstimatedCountPaginator(Paginator):
+    # Exact COUNT(*) over 100k+ rows on every changelist page is the slowest
+    # query the admin runs. Unfiltered pages use the planner's estimate and
+    # filtered counts are cached briefly.
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'booking:admin_count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        return cache.get_or_set(key, queryset.count, COUNT_CACHE_TTL)
+
+class CachedValuesListFilter(admin.SimpleListFilter, metaclass=ABCMeta):
+    # Sidebar choices come from a small cached source instead of a DISTINCT
+    # over the whole changelist table
+    field_name = None
+    
+    @abstractmethod
+    def values(self):
+        """Return the filter's choices; the result is cached."""
+    
+    def lookups(self, request, model_admin):
+        values = cache.get_or_set(f'booking:admin_filter:{self.parameter_name}', self.values, FILTER_CACHE_TTL)
+        return [(value, value) for value in values]
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_name: self.value()})
+        return queryset
+
+class SourceCityFilter(CachedValuesListFilter):
+    title = 'source'
+    parameter_name = field_name = 'source'
+    
+    def values(self):
+        return list(City.objects.filter(departing_routes__isnull=False).distinct().values_list('name', flat=True))
+
+class DestinationCityFilter(CachedValuesListFilter):
+    title = 'destination'
+    parameter_name = field_name = 'destination'
+    
+    def values(self):
+        return list(City.objects.filter(arriving_routes__isnull=False).distinct().values_list('name', flat=True))
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'phone', 'created_at', 'updated_at']
+    list_select_related = ['user']
     search_fields = ['user__username', 'user__email', 'phone']
     list_filter = ['created_at', 'updated_at']
+    raw_id_fields = ['user']
 
 @admin.register(TravelOption)
 class TravelOptionAdmin(admin.ModelAdmin):
     list_display = ['travel_id', 'type', 'source', 'destination', 'departure_date_time', 'price', 'available_seats']
-    list_filter = ['type', 'departure_date_time', 'source', 'destination']
+    list_filter = ['type', 'departure_date_time', SourceCityFilter, DestinationCityFilter]
     search_fields = ['travel_id', 'source', 'destination', 'operator']
     ordering = ['departure_date_time']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         (None, {
@@ -26,12 +102,36 @@ class TravelOptionAdmin(admin.ModelAdmin):
         }),
     )
 
+class PassengerInline(admin.TabularInline):
+    model = Passenger
+    fields = ['position', 'name']
+    readonly_fields = ['position', 'name']
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['booking_id', 'user', 'travel_option', 'number_of_seats', 'total_price', 'status', 'booking_date']
+    list_select_related = ['user', 'travel_option']
     list_filter = ['status', 'booking_date']
     search_fields = ['booking_id', 'user__username', 'contact_email', 'contact_phone']
     readonly_fields = ['booking_id', 'booking_date', 'total_price']
+    raw_id_fields = ['user']
+    autocomplete_fields = ['travel_option']
+    inlines = [PassengerInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # Exact passenger name matches come from passenger_name_idx instead
+        # of a LIKE over every booking
+        if search_term.strip():
+            results |= queryset & self.model.for_passenger(search_term)
+        return results, may_have_duplicates
     
     fieldsets = (
         (None, {
@@ -46,4 +146,20 @@ class BookingAdmin(admin.ModelAdmin):
         ('Timestamps', {
             'fields': ('booking_date',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(RouteDaySummary)
+class RouteDaySummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'route', 'type', 'option_count', 'available_seats', 'min_price', 'updated_at']
+    list_filter = ['type', 'date']
+    list_select_related = ['route__source', 'route__destination']
+    date_hierarchy = 'date'
+    raw_id_fields = ['route']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
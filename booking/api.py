@@ -0,0 +1,193 @@
+"""
+JSON API: travel search, connection search, fare calendar, city
+autocomplete and batch bookings.
+
+Search responses are built from values_list() tuples rather than model
+instances. ``format=json`` returns one keyset-paginated page of compact rows;
+``format=ndjson`` streams every match, one JSON object per line, reading
+the table through a server-side cursor in fixed-size chunks.
+"""
+import json
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from .batch import BatchBookingError, book_batch
+from .city_index import city_index
+from .fare_calendar import route_calendar
+from .forms import CityAutocompleteForm, ConnectionSearchForm, FareCalendarForm, TravelSearchForm
+from .inventory import SeatsUnavailable
+from .itineraries import connection_graph
+from .models import Route, TravelOption
+from .pagination import KeysetPaginator
+from .search import cached_search_count, search_ordering, search_travel_options
+
+ROW_FIELDS = (
+    'id', 'travel_id', 'type', 'source', 'destination', 'departure_date_time',
+    'arrival_date_time', 'price', 'available_seats', 'total_seats', 'operator',
+)
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_CHUNK_SIZE = 2000
+DEFAULT_CONNECTION_LIMIT = 10
+DEFAULT_CITY_LIMIT = 10
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return None
+    return limit if 0 < limit <= MAX_LIMIT else None
+
+
+def _stream_rows(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(ROW_FIELDS, row))) + '\n'
+
+
+@require_GET
+def travel_options_api(request):
+    form = TravelSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    options = search_travel_options(form.cleaned_data)
+    output = request.GET.get('format', 'json')
+
+    if output == 'ndjson':
+        rows = options.values_list(*ROW_FIELDS).iterator(chunk_size=STREAM_CHUNK_SIZE)
+        return StreamingHttpResponse(_stream_rows(rows), content_type='application/x-ndjson')
+
+    if output != 'json':
+        return JsonResponse({'errors': {'format': ['Use json or ndjson.']}}, status=400)
+
+    limit = _limit(request)
+    if limit is None:
+        return JsonResponse({'errors': {'limit': [f'Must be between 1 and {MAX_LIMIT}.']}}, status=400)
+
+    paginator = KeysetPaginator(
+        options.values_list(*ROW_FIELDS),
+        search_ordering(form.cleaned_data),
+        limit,
+        fields=ROW_FIELDS,
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'fields': ROW_FIELDS,
+        'rows': list(page),
+        'count': cached_search_count(options, form.cleaned_data),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }, json_dumps_params={'separators': (',', ':')})
+
+
+@require_GET
+def connections_api(request):
+    form = ConnectionSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+
+    errors = {}
+    cities = {}
+    for field in ('source', 'destination'):
+        cities[field] = connection_graph.resolve(data[field])
+        if cities[field] is None:
+            errors[field] = ['No upcoming departures for this city.']
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    start = timezone.make_aware(datetime.combine(data['date'], time.min))
+    itineraries = connection_graph.search(
+        cities['source'], cities['destination'], start, start + timedelta(days=1),
+        seats=data['seats'] or 1,
+        max_legs=data['max_legs'],
+        sort=data['sort_by'] or 'arrival',
+        limit=data['limit'] or DEFAULT_CONNECTION_LIMIT,
+    )
+
+    # One query for every leg of every itinerary
+    leg_ids = {pk for itinerary in itineraries for pk in itinerary.legs}
+    rows = {row[0]: row for row in TravelOption.objects.filter(pk__in=leg_ids).values_list(*ROW_FIELDS)}
+    results = []
+    for itinerary in itineraries:
+        if not all(pk in rows for pk in itinerary.legs):
+            continue
+        result = itinerary.as_dict()
+        result['legs'] = [rows[pk] for pk in itinerary.legs]
+        results.append(result)
+    return JsonResponse({
+        'fields': ROW_FIELDS,
+        'itineraries': results,
+    }, encoder=DjangoJSONEncoder, json_dumps_params={'separators': (',', ':')})
+
+
+@require_GET
+def fare_calendar_api(request):
+    form = FareCalendarForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+
+    route_id = (
+        Route.objects
+        .filter(source__name__iexact=data['source'].strip(), destination__name__iexact=data['destination'].strip())
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if route_id is None:
+        return JsonResponse({'errors': {'destination': ['No route between these cities.']}}, status=400)
+
+    return JsonResponse({
+        'route': route_id,
+        'type': data['type'] or None,
+        'days': route_calendar(route_id, data['type'] or None),
+    }, encoder=DjangoJSONEncoder, json_dumps_params={'separators': (',', ':')})
+
+
+@require_GET
+def city_autocomplete_api(request):
+    form = CityAutocompleteForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    cities = city_index.complete(form.cleaned_data['q'], form.cleaned_data['limit'] or DEFAULT_CITY_LIMIT)
+    return JsonResponse({
+        'cities': [{'name': name, 'departures': departures} for name, departures in cities],
+    }, json_dumps_params={'separators': (',', ':')})
+
+
+@login_required
+@require_POST
+def batch_booking_api(request):
+    try:
+        items = json.loads(request.body)['items']
+    except (ValueError, KeyError, TypeError):
+        items = None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return JsonResponse({'errors': {'items': [{'message': 'Send {"items": [{...}, ...]}.', 'code': 'invalid'}]}}, status=400)
+
+    try:
+        bookings = book_batch(request.user, items)
+    except BatchBookingError as e:
+        return JsonResponse({'errors': e.errors}, status=400)
+    except SeatsUnavailable as e:
+        return JsonResponse({'errors': {'items': [{'message': str(e), 'code': 'unavailable'}]}}, status=409)
+
+    return JsonResponse({
+        'bookings': [
+            {
+                'id': booking.pk,
+                'booking_id': booking.booking_id,
+                'travel_option': booking.travel_option_id,
+                'number_of_seats': booking.number_of_seats,
+                'total_price': booking.total_price,
+            }
+            for booking in bookings
+        ],
+    }, status=201, encoder=DjangoJSONEncoder)
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'booking'
\ No newline at end of file
+    name = 'booking'
+
+    def ready(self):
+        from . import performance, ratelimit, signals  # noqa: F401
@@ -0,0 +1,84 @@
+"""
+Async versions of the read-heavy views, served when ASYNC_VIEWS is on
+(the default under travel_booking.asgi).
+
+Data is fetched with the async ORM so the event loop is free while queries
+run. Template rendering stays synchronous and runs through sync_to_async,
+because the auth and messages context processors lazily load the session.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import render
+from django.utils import timezone
+
+from .featured import featured_feed
+from .forms import TravelSearchForm
+from .models import TravelOption
+from .pagination import KeysetPaginator
+from .route_index import route_index
+from .search import acached_search, search_ordering
+from .views import TRAVEL_OPTIONS_PER_PAGE
+
+arender = sync_to_async(render)
+
+
+def _numbered_page(options, total_count, number):
+    paginator = Paginator(options, TRAVEL_OPTIONS_PER_PAGE)
+    paginator.count = total_count
+    page_obj = paginator.get_page(number)
+    page_obj.object_list = list(page_obj.object_list)
+    return page_obj
+
+
+async def home(request):
+    featured_options = await sync_to_async(featured_feed.get)()
+    return await arender(request, 'booking/home.html', {'featured_options': featured_options})
+
+
+async def travel_options(request):
+    form = TravelSearchForm(request.GET)
+    cleaned_data = form.cleaned_data if form.is_valid() else None
+    options, total_count = await acached_search(cleaned_data)
+
+    # Pagination: keyset cursors by default, numbered pages for old ?page= links
+    keyset = 'page' not in request.GET
+    if not keyset:
+        page_obj = await sync_to_async(_numbered_page)(options, total_count, request.GET.get('page'))
+    else:
+        paginator = KeysetPaginator(options, search_ordering(cleaned_data), TRAVEL_OPTIONS_PER_PAGE)
+        page_obj = await paginator.aget_page(request.GET.get('cursor'))
+
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('cursor', None)
+
+    return await arender(request, 'booking/travel_options.html', {
+        'page_obj': page_obj,
+        'keyset': keyset,
+        'form': form,
+        'total_count': total_count,
+        'query_string': query.urlencode()
+    })
+
+
+async def travel_option_detail(request, pk):
+    try:
+        option = await TravelOption.objects.aget(pk=pk)
+    except TravelOption.DoesNotExist:
+        raise Http404('No TravelOption matches the given query.')
+
+    similar_options = TravelOption.objects.filter(departure_date_time__gte=timezone.now()).exclude(pk=pk)
+    candidates = await sync_to_async(route_index.candidates)(
+        source=option.source, destination=option.destination, exact=True
+    )
+    if candidates is not None:
+        # A few spare ids cover the current option and any stale index entries
+        similar_options = similar_options.filter(pk__in=candidates[:10])
+    else:
+        similar_options = similar_options.filter(source=option.source, destination=option.destination)
+
+    return await arender(request, 'booking/travel_option_detail.html', {
+        'option': option,
+        'similar_options': [similar async for similar in similar_options[:3]]
+    })
@@ -0,0 +1,100 @@
+"""
+Batch bookings for agencies booking many itineraries at once.
+
+book_batch() validates every item up front and loads all the options in
+one query. In a single transaction it then locks the options in primary-key
+order, so two overlapping batches can never deadlock, and takes the seats
+with one guarded UPDATE per option. All the Booking rows go in through one
+bulk_create, and all their Passenger rows through another. Either every item is booked or none is.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .booking_ids import new_booking_ids
+from .forms import BookingForm
+from .inventory import reserve_seats_bulk
+from .models import Booking, Passenger, TravelOption
+
+MAX_BATCH_ITEMS = 200
+
+
+class BatchBookingError(Exception):
+    def __init__(self, errors):
+        # {item index: {field: [{'message': ..., 'code': ...}]}}
+        super().__init__('Invalid batch booking')
+        self.errors = errors
+
+
+def _option_id(item):
+    pk = item.get('travel_option')
+    # JSON true is an int to Python, and equal to 1
+    return pk if isinstance(pk, int) and not isinstance(pk, bool) else None
+
+
+def _validate(items):
+    if not items:
+        raise BatchBookingError({'items': [{'message': 'At least one item is required.', 'code': 'required'}]})
+    if len(items) > MAX_BATCH_ITEMS:
+        raise BatchBookingError({'items': [{'message': f'At most {MAX_BATCH_ITEMS} items per batch.', 'code': 'max_items'}]})
+
+    errors = {}
+    forms = []
+    for index, item in enumerate(items):
+        form = BookingForm(item)
+        if not form.is_valid():
+            errors[index] = form.errors.get_json_data(escape_html=True)
+        forms.append(form)
+
+    option_ids = {_option_id(item) for item in items} - {None}
+    options = TravelOption.objects.in_bulk(list(option_ids))
+
+    seats_by_option = defaultdict(int)
+    now = timezone.now()
+    for index, (item, form) in enumerate(zip(items, forms)):
+        option = options.get(_option_id(item))
+        if option is None:
+            errors.setdefault(index, {})['travel_option'] = [{'message': 'Unknown travel option.', 'code': 'invalid'}]
+        elif option.departure_date_time <= now:
+            errors.setdefault(index, {})['travel_option'] = [{'message': 'This travel option has departed.', 'code': 'unavailable'}]
+        elif index not in errors:
+            seats_by_option[option.pk] += form.cleaned_data['number_of_seats']
+
+    for option_id, seats in seats_by_option.items():
+        if seats > options[option_id].available_seats:
+            for index, item in enumerate(items):
+                if item.get('travel_option') == option_id:
+                    errors.setdefault(index, {})['number_of_seats'] = [{'message': 'Not enough seats left.', 'code': 'unavailable'}]
+
+    if errors:
+        raise BatchBookingError(errors)
+    return forms, options, seats_by_option
+
+
+def book_batch(user, items):
+    """
+    Book every item for ``user`` or none of them. Items are dicts with
+    travel_option (pk), number_of_seats, passenger_names, contact_email and
+    contact_phone. Raises BatchBookingError for invalid items and
+    SeatsUnavailable if the seats went in the meantime.
+    """
+    forms, options, seats_by_option = _validate(items)
+    booking_ids = new_booking_ids(len(items))
+
+    with transaction.atomic():
+        reserve_seats_bulk(seats_by_option)
+
+        bookings = []
+        for form, item, booking_id in zip(forms, items, booking_ids):
+            booking = form.save(commit=False)
+            option = options[item['travel_option']]
+            booking.booking_id = booking_id
+            booking.user = user
+            booking.travel_option = option
+            booking.total_price = option.price * booking.number_of_seats
+            booking.status = 'CONFIRMED'
+            bookings.append(booking)
+        Booking.objects.bulk_create(bookings)
+        Passenger.objects.bulk_create([passenger for booking in bookings for passenger in booking.build_passengers()])
+    return bookings
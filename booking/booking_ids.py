@@ -0,0 +1,94 @@
+"""
+Booking reference generator.
+
+IDs are 'BK' followed by 18 Crockford base32 characters: 45 bits of
+millisecond timestamp, then a 45-bit sequence. The alphabet sorts in the
+same order as the values, so new IDs sort roughly by creation time and land
+at the right-hand edge of the unique index instead of at random pages.
+
+Each process starts every millisecond at a random sequence value from
+``secrets`` and increments it for the rest of that millisecond. IDs from
+one process therefore never repeat and stay strictly increasing, even if
+the clock steps back. Two processes would have to draw sequence values
+within one batch of each other in the same millisecond to collide.
+Legacy 'BK' + 8 character IDs remain valid.
+"""
+import os
+import re
+import secrets
+import threading
+import time
+
+PREFIX = 'BK'
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+TIME_BITS = 45
+SEQUENCE_BITS = 45
+SEQUENCE_LIMIT = 1 << SEQUENCE_BITS
+# Fresh milliseconds start in the lower half so a bulk request rarely overflows
+SEQUENCE_SEED_BITS = SEQUENCE_BITS - 1
+
+BOOKING_ID_RE = re.compile(r'^BK(?:[A-Z0-9]{8}|[0-9A-HJKMNP-TV-Z]{18})$')
+
+# Three base32 characters per 15 bits
+_CHUNK = [a + b + c for a in ALPHABET for b in ALPHABET for c in ALPHABET]
+_MASK = (1 << 15) - 1
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_sequence = 0
+
+
+def _reset_after_fork():
+    # A forked child must not continue the parent's sequence
+    global _lock, _last_ms, _last_sequence
+    _lock = threading.Lock()
+    _last_ms = 0
+    _last_sequence = 0
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _encode45(value):
+    return _CHUNK[value >> 30] + _CHUNK[(value >> 15) & _MASK] + _CHUNK[value & _MASK]
+
+
+def _reserve(count):
+    """Claim ``count`` consecutive sequence values; returns (ms, first sequence)."""
+    global _last_ms, _last_sequence
+    with _lock:
+        now = time.time_ns() // 1_000_000
+        if now > _last_ms:
+            ms, start = now, secrets.randbits(SEQUENCE_SEED_BITS)
+        else:
+            ms, start = _last_ms, _last_sequence + 1
+        if start + count > SEQUENCE_LIMIT:
+            # Sequence space for this millisecond is used up; borrow the next one
+            ms, start = ms + 1, secrets.randbits(SEQUENCE_SEED_BITS)
+        _last_ms, _last_sequence = ms, start + count - 1
+    return ms, start
+
+
+def new_booking_ids(count):
+    """Return ``count`` unique booking IDs in ascending order."""
+    if count <= 0:
+        return []
+    ids = []
+    while count:
+        # Batches never straddle the sequence limit of one millisecond
+        size = min(count, SEQUENCE_LIMIT >> 1)
+        ms, start = _reserve(size)
+        prefix = PREFIX + _encode45(ms % (1 << TIME_BITS))
+        ids.extend([prefix + _encode45(sequence) for sequence in range(start, start + size)])
+        count -= size
+    return ids
+
+
+def new_booking_id():
+    ms, sequence = _reserve(1)
+    return PREFIX + _encode45(ms % (1 << TIME_BITS)) + _encode45(sequence)
+
+
+def is_valid_booking_id(value):
+    return bool(BOOKING_ID_RE.match(value))
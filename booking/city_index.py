@@ -0,0 +1,107 @@
+"""
+Process-local city autocomplete.
+
+Every city is indexed under its full name and under each word that follows
+a space or hyphen, so 'chi' finds 'Ho Chi Minh City' and 'chinch' finds
+'Pimpri-Chinchwad'. Keys are casefolded, with hyphens and whitespace runs
+folded to one space, and kept in a single sorted list, so a lookup is a
+bisect plus a scan over the matches. Matches rank by the number of upcoming
+options departing from the city. The index is rebuilt every
+``CITY_INDEX_TTL`` seconds from the City table and one grouped count, in
+the background (booking.index_rebuild), and the TravelOption signals keep
+it current in between.
+"""
+import bisect
+import heapq
+import re
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from .index_rebuild import BackgroundRebuildMixin
+from .models import City, TravelOption
+
+SEPARATORS = re.compile(r'[\s-]+')
+
+
+def normalize_city(value):
+    return SEPARATORS.sub(' ', value.casefold()).strip()
+
+
+def _keys(name):
+    words = normalize_city(name).split(' ')
+    return {(' '.join(words[i:]), name) for i in range(len(words))}
+
+
+class CityIndex(BackgroundRebuildMixin):
+    def __init__(self):
+        super().__init__()
+        self._keys = []        # sorted (key, city name)
+        self._volume = {}      # city name -> upcoming departures
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'CITY_INDEX_TTL', 600)
+
+    def load(self):
+        volume = dict.fromkeys(City.objects.values_list('name', flat=True), 0)
+        counts = (
+            TravelOption.objects.filter(route__isnull=False, departure_date_time__gte=timezone.now())
+            .order_by()
+            .values_list('route__source__name')
+            .annotate(count=Count('id'))
+        )
+        # A city created after the first read still arrives with its count
+        volume.update(counts)
+        keys = sorted(key for name in volume for key in _keys(name))
+        return keys, volume
+
+    def install(self, state):
+        self._keys, self._volume = state
+
+    def _add_city(self, name):
+        if name not in self._volume:
+            self._volume[name] = 0
+            for key in _keys(name):
+                bisect.insort(self._keys, key)
+
+    def option_created(self, option):
+        with self._lock:
+            if self._journaled(self.option_created, option):
+                return
+            self._add_city(option.source)
+            self._add_city(option.destination)
+            if option.departure_date_time >= timezone.now():
+                self._volume[option.source] += 1
+
+    def option_deleted(self, option):
+        with self._lock:
+            if self._journaled(self.option_deleted, option):
+                return
+            if option.departure_date_time >= timezone.now() and self._volume.get(option.source):
+                self._volume[option.source] -= 1
+
+    def complete(self, term, limit=10):
+        """
+        Return up to ``limit`` (city, departures) pairs whose name, or a word
+        in it, starts with ``term``. Cities whose name starts with the term
+        come first, then the busiest.
+        """
+        self.ensure_fresh()
+        term = normalize_city(term)
+        with self._lock:
+            if not term:
+                matches = dict.fromkeys(self._volume, True)
+            else:
+                matches = {}
+                position = bisect.bisect_left(self._keys, (term,))
+                while position < len(self._keys) and self._keys[position][0].startswith(term):
+                    key, name = self._keys[position]
+                    matches[name] = matches.get(name, False) or key == normalize_city(name)
+                    position += 1
+            ranked = heapq.nsmallest(limit, matches, key=lambda name: (not matches[name], -self._volume[name], name))
+            return [(name, self._volume[name]) for name in ranked]
+
+
+city_index = CityIndex()
@@ -0,0 +1,121 @@
+"""
+Fare calendar: the cheapest bookable fare and the number of bookable
+options per departure day on one route.
+
+A route's calendar covers the next DAYS days. It comes from one grouped
+aggregate over that route's options and is stored in the CACHE alias
+under the route's key. Catalog saves and deletes (booking.signals) and
+seat changes (booking.inventory) drop the keys of the routes they touch.
+An entry also expires once the earliest departure it counts has left, so
+a departed option never sets a day's price.
+
+Those drops only reach other workers through a shared cache. In a
+process-local cache an entry lives at most LOCAL_TTL seconds, which bounds
+how stale another worker's bookings can leave it.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import TravelOption
+
+DEFAULT_SETTINGS = {
+    'DAYS': 90,
+    'TTL': 3600,
+    'CACHE': 'default',
+    'LOCAL_TTL': 60,
+}
+
+KEY_PREFIX = 'booking:fare_calendar:'
+# SQLite hands back MIN() of a decimal column without its scale
+CENTS = Decimal('0.01')
+
+
+def calendar_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'FARE_CALENDAR', {})}
+
+
+def calendar_cache():
+    return caches[calendar_config()['CACHE']]
+
+
+def cache_timeout(cache, config):
+    if isinstance(cache, LocMemCache):
+        return min(config['TTL'], config['LOCAL_TTL'])
+    return config['TTL']
+
+
+def cache_key(route_id):
+    return f'{KEY_PREFIX}{route_id}'
+
+
+def _build(route_id, now, days):
+    last_day = timezone.localdate(now) + timedelta(days=days)
+    rows = list(
+        TravelOption.objects
+        .filter(
+            route_id=route_id,
+            available_seats__gt=0,
+            departure_date_time__gt=now,
+            departure_date_time__lt=timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min)),
+        )
+        .annotate(date=TruncDate('departure_date_time'))
+        .values('date', 'type')
+        .annotate(options=Count('id'), cheapest=Min('price'), first_departure=Min('departure_date_time'))
+        .order_by('date', 'type')
+    )
+    return {
+        'days': [(row['date'], row['type'], row['options'], row['cheapest'].quantize(CENTS)) for row in rows],
+        'valid_until': min((row['first_departure'] for row in rows), default=None),
+    }
+
+
+def route_calendar(route_id, travel_type=None):
+    """
+    Return [{'date', 'min_price', 'options'}] for every day in the window
+    with a bookable option on the route, optionally for one travel type.
+    """
+    key = cache_key(route_id)
+    cache = calendar_cache()
+    entry = cache.get(key)
+    now = timezone.now()
+    if entry is None or (entry['valid_until'] is not None and entry['valid_until'] <= now):
+        config = calendar_config()
+        entry = _build(route_id, now, config['DAYS'])
+        timeout = cache_timeout(cache, config)
+        if entry['valid_until'] is not None:
+            timeout = min(timeout, max(1, int((entry['valid_until'] - now).total_seconds())))
+        cache.set(key, entry, timeout)
+
+    calendar = {}
+    for day, row_type, options, cheapest in entry['days']:
+        if travel_type and row_type != travel_type:
+            continue
+        if day in calendar:
+            calendar[day]['options'] += options
+            calendar[day]['min_price'] = min(calendar[day]['min_price'], cheapest)
+        else:
+            calendar[day] = {'date': day, 'min_price': cheapest, 'options': options}
+    return list(calendar.values())
+
+
+def routes_changed(route_ids):
+    calendar_cache().delete_many([cache_key(route_id) for route_id in set(route_ids) if route_id is not None])
+
+
+def options_changed(option_ids):
+    """
+    Drop the calendars of the options' routes once the current transaction
+    commits. Call it inside the transaction that changed the options: the
+    lookup then reads rows it already holds instead of queueing behind other
+    writers.
+    """
+    route_ids = list(TravelOption.objects.filter(pk__in=option_ids).values_list('route_id', flat=True).distinct())
+    transaction.on_commit(lambda: routes_changed(route_ids))
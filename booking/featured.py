@@ -0,0 +1,122 @@
+"""
+Precomputed featured-options feed for the home page.
+
+The feed ranks the soonest upcoming departures by the share of seats still
+free, discounted by days until departure, keeps one option per route, and
+is stored in the default cache. A warm home page costs one cache read and
+no queries. A seat change on a featured option or any catalog save/delete
+marks the feed stale. Stale or expired feeds are still served while a
+background thread rebuilds them. ``refresh_featured_feed`` rebuilds the
+feed on a schedule.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from .search import upcoming_options
+
+DEFAULT_SETTINGS = {
+    'SIZE': 6,
+    'TTL': 300,
+    'MAX_AGE': 3600,
+    'CANDIDATES': 500,
+    'MIN_LEAD_HOURS': 2,
+    'BACKGROUND_REFRESH': True,
+}
+
+FEED_KEY = 'booking:featured_feed'
+STALE_KEY = 'booking:featured_feed:stale'
+LOCK_KEY = 'booking:featured_feed:lock'
+LOCK_TIMEOUT = 60
+
+
+def feed_score(option, now):
+    days = max((option.departure_date_time - now).total_seconds() / 86400, 0)
+    return option.available_seats / max(option.total_seats, 1) / (1 + days)
+
+
+def rank_options(options, size, now):
+    ranked = sorted(options, key=lambda option: (-feed_score(option, now), option.departure_date_time, option.pk))
+    featured = []
+    routes = set()
+    for option in ranked:
+        route = (option.source, option.destination)
+        if route in routes:
+            continue
+        routes.add(route)
+        featured.append(option)
+        if len(featured) == size:
+            break
+    return featured
+
+
+class FeaturedFeed:
+    @property
+    def config(self):
+        return {**DEFAULT_SETTINGS, **getattr(settings, 'FEATURED_FEED', {})}
+
+    def build(self):
+        config = self.config
+        now = timezone.now()
+        lead = timedelta(hours=config['MIN_LEAD_HOURS'])
+        candidates = list(
+            upcoming_options()
+            .filter(departure_date_time__gte=now + lead)
+            .order_by('departure_date_time', 'pk')[:config['CANDIDATES']]
+        )
+        options = rank_options(candidates, config['SIZE'], now)
+
+        refresh_at = now + timedelta(seconds=config['TTL'])
+        if options:
+            # Rebuild before the earliest featured option comes inside the lead time
+            refresh_at = min(refresh_at, min(option.departure_date_time for option in options) - lead)
+        return {
+            'options': options,
+            'ids': {option.pk for option in options},
+            'built_at': now,
+            'refresh_at': refresh_at,
+        }
+
+    def refresh(self):
+        cache.delete(STALE_KEY)
+        entry = self.build()
+        cache.set(FEED_KEY, entry, self.config['MAX_AGE'])
+        return entry['options']
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            cache.delete(LOCK_KEY)
+            connection.close()
+
+    def schedule_refresh(self):
+        # Single flight across threads and, with a shared cache, across workers
+        if cache.add(LOCK_KEY, True, LOCK_TIMEOUT):
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def get(self):
+        entries = cache.get_many([FEED_KEY, STALE_KEY])
+        entry = entries.get(FEED_KEY)
+        if entry is None:
+            return self.refresh()
+        if STALE_KEY in entries or entry['refresh_at'] <= timezone.now():
+            if not self.config['BACKGROUND_REFRESH']:
+                return self.refresh()
+            self.schedule_refresh()
+        return entry['options']
+
+    def mark_stale(self):
+        cache.set(STALE_KEY, True, self.config['MAX_AGE'])
+
+    def option_changed(self, option_id):
+        entry = cache.get(FEED_KEY)
+        if entry is not None and option_id in entry['ids']:
+            self.mark_stale()
+
+
+featured_feed = FeaturedFeed()
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from .models import UserProfile, Booking, TravelOption
+from .models import PASSENGER_NAME_LENGTH, UserProfile, Booking, TravelOption, split_passenger_names
 
 class UserRegistrationForm(forms.ModelForm):
     password = forms.CharField(widget=forms.PasswordInput(attrs={'class': 'form-control'}))
@@ -85,6 +85,14 @@ class BookingForm(forms.ModelForm):
             raise ValidationError('Number of seats must be at least 1')
         return seats
     
+    def clean_passenger_names(self):
+        names = split_passenger_names(self.cleaned_data.get('passenger_names', ''))
+        if not names:
+            raise ValidationError('Please enter at least one passenger name')
+        if any(len(name) > PASSENGER_NAME_LENGTH for name in names):
+            raise ValidationError(f'Passenger names can be at most {PASSENGER_NAME_LENGTH} characters')
+        return ', '.join(names)
+    
     def clean_contact_phone(self):
         phone = self.cleaned_data.get('contact_phone')
         if phone and len(phone) < 10:
@@ -128,4 +136,38 @@ class TravelSearchForm(forms.Form):
         choices=SORT_CHOICES,
         required=False,
         widget=forms.Select(attrs={'class': 'form-control'})
-    )
\ No newline at end of file
+    )
+
+class ConnectionSearchForm(forms.Form):
+    SORT_CHOICES = [
+        ('arrival', 'Earliest Arrival'),
+        ('duration', 'Shortest Trip'),
+        ('price', 'Lowest Price'),
+    ]
+    
+    source = forms.CharField(max_length=100)
+    destination = forms.CharField(max_length=100)
+    date = forms.DateField()
+    seats = forms.IntegerField(required=False, min_value=1, max_value=10)
+    max_legs = forms.IntegerField(required=False, min_value=1, max_value=3)
+    sort_by = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=50)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        source = cleaned_data.get('source')
+        destination = cleaned_data.get('destination')
+        
+        if source and destination and source.strip().casefold() == destination.strip().casefold():
+            raise ValidationError('Source and destination must be different')
+        
+        return cleaned_data
+
+class FareCalendarForm(forms.Form):
+    source = forms.CharField(max_length=100)
+    destination = forms.CharField(max_length=100)
+    type = forms.ChoiceField(choices=TravelOption.TRAVEL_TYPES, required=False)
+
+class CityAutocompleteForm(forms.Form):
+    q = forms.CharField(max_length=100, required=False)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=50)
@@ -0,0 +1,86 @@
+"""
+Background rebuilds for the process-local indexes (route_index and
+connection_graph).
+
+Only the first build runs in the caller's thread, when there is nothing to
+serve yet. After that, an index past its TTL keeps answering from the old
+copy while one daemon thread per index rebuilds it. Changes the signals
+apply during a rebuild are journaled and replayed onto the new copy before
+it is swapped in, so a change the rebuild's read missed is not lost.
+
+The thread is started once the caller's transaction commits: a rebuild
+reads on its own connection and would not see rows the caller has not
+committed yet.
+"""
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRebuildMixin:
+    """
+    Subclasses provide ``ttl``, ``load()``, which reads the tables and returns
+    the new state without touching the index, and ``install(state)``, which
+    swaps it in and is called holding ``self._lock``. Incremental updates
+    call ``self._journaled(method, *args)`` first and, under the lock, skip
+    the update when it returns True.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuilding = threading.Lock()
+        self._journal = None
+        self._built_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def build(self):
+        with self._lock:
+            self._journal = []
+        try:
+            state = self.load()
+            with self._lock:
+                journal, self._journal = self._journal, None
+                self.install(state)
+                self._built_at = time.monotonic()
+                for method, args in journal:
+                    method(*args)
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def _journaled(self, method, *args):
+        # During a rebuild, replay the update on the new copy as well
+        if self._journal is not None:
+            self._journal.append((method, args))
+        return self._built_at is None
+
+    def _rebuild_in_background(self):
+        try:
+            self.build()
+        except DatabaseError:
+            logger.exception('Rebuilding %s failed', type(self).__name__)
+        finally:
+            self._rebuilding.release()
+            connection.close()
+
+    def schedule_rebuild(self):
+        # Single flight: one rebuild at a time per index and process
+        if self._rebuilding.acquire(blocking=False):
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    def ensure_fresh(self):
+        with self._lock:
+            built_at = self._built_at
+        if built_at is None:
+            with self._rebuilding:
+                if self._built_at is None:
+                    self.build()
+        elif time.monotonic() - built_at >= self.ttl:
+            transaction.on_commit(self.schedule_rebuild)
@@ -0,0 +1,293 @@
+"""
+Seat inventory for TravelOption.
+
+All seat changes go through a single conditional UPDATE so concurrent
+bookings can never drive ``available_seats`` below zero or above
+``total_seats``. The optional locking mode takes a row lock first
+(``SELECT ... FOR UPDATE SKIP LOCKED``) for callers that need to read the
+row before deciding, and both modes retry on transient database conflicts.
+
+Checkout is two-phase: place_hold() takes the seats and saves a PENDING
+booking with an expiry, confirm_hold() flips it to CONFIRMED without touching
+the option row, and release_expired_holds() returns the seats of lapsed holds
+in batches. start_hold_sweeper() runs that sweep on a timer in each server
+worker (gunicorn.conf.py), so abandoned checkouts always get their seats
+back.
+
+Every seat change also updates the option's RouteDaySummary row inside the
+same transaction, so the summary commits or rolls back with it, and looks up
+the option's route there so its fare calendar is dropped on commit.
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from . import fare_calendar
+from .featured import featured_feed
+from .itineraries import connection_graph
+from .models import Booking, TravelOption
+from .route_summary import refresh_options, seats_changed
+from .search_cache import search_cache
+
+DEFAULT_RETRIES = 5
+RETRY_BACKOFF = 0.005
+MAX_BACKOFF_EXPONENT = 6
+DEFAULT_HOLD_TTL = 600
+SWEEP_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+_sweeper = None
+
+
+class SeatsUnavailable(Exception):
+    pass
+
+
+class InventoryConflict(Exception):
+    pass
+
+
+def _backoff(attempt):
+    time.sleep(RETRY_BACKOFF * (2 ** min(attempt, MAX_BACKOFF_EXPONENT)) * random.uniform(0.5, 1.5))
+
+
+def _options_changed(option_ids):
+    def invalidate():
+        for option_id in option_ids:
+            featured_feed.option_changed(option_id)
+            connection_graph.seats_changed(option_id)
+
+    transaction.on_commit(invalidate)
+
+
+def _seats_changed(option_id):
+    _options_changed([option_id])
+
+
+def _decrement(option_id, seats):
+    return TravelOption.objects.filter(
+        pk=option_id,
+        available_seats__gte=seats,
+        departure_date_time__gt=timezone.now(),
+    ).update(
+        available_seats=F('available_seats') - seats,
+        updated_at=timezone.now(),
+    )
+
+
+def _increment(option_id, seats):
+    return TravelOption.objects.filter(
+        pk=option_id,
+        available_seats__lte=F('total_seats') - seats,
+    ).update(
+        available_seats=F('available_seats') + seats,
+        updated_at=timezone.now(),
+    )
+
+
+def _reserve_locked(option_id, seats, skip_locked):
+    option = (
+        TravelOption.objects
+        .select_for_update(skip_locked=skip_locked)
+        .only('pk', 'available_seats', 'departure_date_time')
+        .filter(pk=option_id)
+        .first()
+    )
+    if option is None:
+        if skip_locked and TravelOption.objects.filter(pk=option_id).exists():
+            raise InventoryConflict(f'Travel option {option_id} is locked')
+        raise SeatsUnavailable(f'Travel option {option_id} does not exist')
+    if option.available_seats < seats or option.departure_date_time <= timezone.now():
+        return 0
+    return _decrement(option_id, seats)
+
+
+def reserve_seats(option_id, seats, lock=False, skip_locked=True, retries=DEFAULT_RETRIES):
+    """
+    Take ``seats`` from the option's inventory or raise SeatsUnavailable.
+
+    With ``lock=True`` the row is locked with SELECT FOR UPDATE before the
+    decrement; ``skip_locked`` makes contended rows raise a conflict that is
+    retried instead of queueing behind the lock holder.
+    """
+    if seats <= 0:
+        raise ValueError('seats must be positive')
+
+    for attempt in range(retries + 1):
+        try:
+            with transaction.atomic():
+                if lock:
+                    updated = _reserve_locked(option_id, seats, skip_locked)
+                else:
+                    updated = _decrement(option_id, seats)
+                if updated:
+                    seats_changed(option_id, -seats)
+                    fare_calendar.options_changed([option_id])
+                    search_cache.options_changed([option_id])
+        except (OperationalError, InventoryConflict):
+            if attempt == retries:
+                raise
+            _backoff(attempt)
+            continue
+
+        if not updated:
+            raise SeatsUnavailable(
+                f'Not enough seats left on travel option {option_id}'
+            )
+        _seats_changed(option_id)
+        return
+
+
+def reserve_seats_bulk(seats_by_option):
+    """
+    Take seats from several options at once, all or nothing. Rows are locked
+    in pk order so overlapping multi-option reservations cannot deadlock.
+    """
+    with transaction.atomic():
+        locked = list(
+            TravelOption.objects.select_for_update()
+            .filter(pk__in=seats_by_option)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        if len(locked) != len(seats_by_option):
+            raise SeatsUnavailable('Some travel options no longer exist')
+        for option_id in locked:
+            if not _decrement(option_id, seats_by_option[option_id]):
+                raise SeatsUnavailable(f'Not enough seats left on travel option {option_id}')
+        refresh_options(locked)
+        fare_calendar.options_changed(locked)
+        search_cache.options_changed(locked)
+        _options_changed(locked)
+
+
+def release_seats(option_id, seats, retries=DEFAULT_RETRIES):
+    """Return ``seats`` to the option's inventory, never exceeding total_seats."""
+    if seats <= 0:
+        raise ValueError('seats must be positive')
+
+    for attempt in range(retries + 1):
+        try:
+            with transaction.atomic():
+                released = bool(_increment(option_id, seats))
+                if released:
+                    seats_changed(option_id, seats)
+                    fare_calendar.options_changed([option_id])
+                    search_cache.options_changed([option_id])
+        except OperationalError:
+            if attempt == retries:
+                raise
+            _backoff(attempt)
+            continue
+
+        if released:
+            _seats_changed(option_id)
+        return released
+
+
+def place_hold(booking, ttl=None):
+    """
+    Take the booking's seats and save it as a PENDING hold that lapses after
+    ``ttl`` seconds (``settings.SEAT_HOLD_TTL``). Raises SeatsUnavailable.
+    """
+    if ttl is None:
+        ttl = getattr(settings, 'SEAT_HOLD_TTL', DEFAULT_HOLD_TTL)
+    with transaction.atomic():
+        reserve_seats(booking.travel_option_id, booking.number_of_seats)
+        booking.status = 'PENDING'
+        booking.hold_expires_at = timezone.now() + timedelta(seconds=ttl)
+        booking.save()
+    return booking
+
+
+def confirm_hold(booking_id):
+    """Confirm a live hold. Returns False once it has lapsed or been released."""
+    return bool(
+        Booking.objects.filter(
+            pk=booking_id, status='PENDING', hold_expires_at__gt=timezone.now()
+        ).update(status='CONFIRMED', hold_expires_at=None)
+    )
+
+
+def _return_seats(seats_by_option):
+    # One UPDATE per distinct seat count instead of one per option; Least()
+    # keeps available_seats within total_seats
+    options_by_seats = defaultdict(list)
+    for option_id, seats in seats_by_option.items():
+        options_by_seats[seats].append(option_id)
+    now = timezone.now()
+    for seats, option_ids in options_by_seats.items():
+        TravelOption.objects.filter(pk__in=option_ids).update(
+            available_seats=Least(F('available_seats') + seats, F('total_seats')),
+            updated_at=now,
+        )
+    refresh_options(list(seats_by_option))
+    fare_calendar.options_changed(list(seats_by_option))
+    search_cache.options_changed(list(seats_by_option))
+    _options_changed(list(seats_by_option))
+
+
+def release_expired_holds(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """Cancel holds that lapsed before ``now`` and return their seats. Returns the number released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        try:
+            with transaction.atomic():
+                held = list(
+                    Booking.objects.select_for_update(skip_locked=True)
+                    .filter(status='PENDING', hold_expires_at__lte=now)
+                    .order_by('hold_expires_at', 'id')
+                    .values_list('pk', 'travel_option_id', 'number_of_seats')[:batch_size]
+                )
+                if not held:
+                    return released
+
+                cancelled = Booking.objects.filter(
+                    pk__in=[pk for pk, _, _ in held], status='PENDING'
+                ).update(status='CANCELLED', hold_expires_at=None)
+                if cancelled != len(held):
+                    # Without row locks (SQLite) a hold can be cancelled by its
+                    # owner between the read and the write; redo the batch
+                    raise InventoryConflict('Hold released concurrently')
+
+                seats_by_option = defaultdict(int)
+                for _, option_id, seats in held:
+                    seats_by_option[option_id] += seats
+                _return_seats(seats_by_option)
+        except InventoryConflict:
+            continue
+        released += len(held)
+
+
+def _sweep_forever(interval, batch_size):
+    while True:
+        # Jitter keeps the workers' sweeps from lining up
+        time.sleep(interval * random.uniform(0.9, 1.1))
+        try:
+            release_expired_holds(batch_size=batch_size)
+        except DatabaseError:
+            logger.exception('Releasing expired seat holds failed')
+        finally:
+            connection.close()
+
+
+def start_hold_sweeper(interval, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Release lapsed holds every ``interval`` seconds from a daemon thread.
+    Sweepers in other workers skip each other's locked rows. Returns the thread.
+    """
+    global _sweeper
+    if interval > 0 and (_sweeper is None or not _sweeper.is_alive()):
+        _sweeper = threading.Thread(target=_sweep_forever, args=(interval, batch_size), daemon=True, name='hold-sweeper')
+        _sweeper.start()
+    return _sweeper
@@ -0,0 +1,332 @@
+"""
+Multi-leg connection search over an in-memory, time-expanded route graph.
+
+Every upcoming option is a timed edge between two cities. Edges are grouped
+by (source, destination) into parallel arrays sorted by departure minute,
+so "the departures on this hop within a layover window" is two bisects. A
+search scans the first legs leaving the source in the requested window and
+extends each one hop at a time, up to MAX_LEGS. A connection must leave at
+least MIN_LAYOVER_MINUTES and at most MAX_LAYOVER_HOURS after the previous
+leg lands, and every leg needs enough seats. Third legs are only tried
+from cities with a direct edge into the destination, and once ``limit``
+itineraries are in hand any partial one that already ranks below the worst
+of them is dropped, since arrival, duration and price only grow per leg.
+
+The graph is rebuilt every TTL seconds, in the background while the old
+graph keeps serving (booking.index_rebuild). In between, the TravelOption
+signals add and remove edges, and seat changes mark options dirty so their
+seat counts are reloaded, in one query, before the next search.
+"""
+import bisect
+import heapq
+from array import array
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from .index_rebuild import BackgroundRebuildMixin
+from .models import Route, TravelOption
+
+DEFAULT_SETTINGS = {
+    'MIN_LAYOVER_MINUTES': 60,
+    'MAX_LAYOVER_HOURS': 24,
+    'MAX_LEGS': 3,
+    'TTL': 3600,
+}
+
+SORT_KEYS = {
+    'arrival': lambda itinerary: (itinerary.arrival, itinerary.duration, itinerary.price),
+    'duration': lambda itinerary: (itinerary.duration, itinerary.arrival, itinerary.price),
+    'price': lambda itinerary: (itinerary.price, itinerary.arrival, itinerary.duration),
+}
+
+
+def search_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'CONNECTION_SEARCH', {})}
+
+
+def _minutes(value):
+    return int(value.timestamp()) // 60
+
+
+def _from_minutes(value):
+    return datetime.fromtimestamp(value * 60, tz=dt_timezone.utc)
+
+
+def _cents(price):
+    return int(Decimal(str(price)) * 100)
+
+
+class Hop:
+    """Departures on one (source, destination) pair, sorted by departure."""
+    __slots__ = ('departures', 'arrivals', 'prices', 'seats', 'ids')
+
+    def __init__(self):
+        self.departures = array('q')
+        self.arrivals = array('q')
+        self.prices = array('q')
+        self.seats = array('q')
+        self.ids = array('q')
+
+    def insert(self, departure, arrival, price, seats, pk):
+        position = bisect.bisect_right(self.departures, departure)
+        self.departures.insert(position, departure)
+        self.arrivals.insert(position, arrival)
+        self.prices.insert(position, price)
+        self.seats.insert(position, seats)
+        self.ids.insert(position, pk)
+
+    def find(self, departure, pk):
+        position = bisect.bisect_left(self.departures, departure)
+        while position < len(self.ids) and self.ids[position] != pk:
+            position += 1
+        return position if position < len(self.ids) else None
+
+    def remove(self, position):
+        for column in (self.departures, self.arrivals, self.prices, self.seats, self.ids):
+            del column[position]
+
+    def window(self, earliest, latest, seats):
+        lo = bisect.bisect_left(self.departures, earliest)
+        hi = bisect.bisect_right(self.departures, latest)
+        return [i for i in range(lo, hi) if self.seats[i] >= seats]
+
+
+class Itinerary:
+    __slots__ = ('legs', 'departure', 'arrival', 'price')
+
+    def __init__(self, legs, departure, arrival, price):
+        self.legs = legs            # option ids in travel order
+        self.departure = departure  # minutes since the epoch
+        self.arrival = arrival
+        self.price = price          # hundredths of the currency unit
+
+    @property
+    def duration(self):
+        return self.arrival - self.departure
+
+    def extend(self, hop, i):
+        return Itinerary(self.legs + (hop.ids[i],), self.departure, hop.arrivals[i], self.price + hop.prices[i])
+
+    def as_dict(self):
+        return {
+            'legs': list(self.legs),
+            'departure': _from_minutes(self.departure),
+            'arrival': _from_minutes(self.arrival),
+            'duration_minutes': self.duration,
+            'price': Decimal(self.price) / 100,
+        }
+
+
+class ConnectionGraph(BackgroundRebuildMixin):
+    def __init__(self):
+        super().__init__()
+        self._hops = {}        # (source, destination) -> Hop
+        self._out = {}         # source -> destinations with a hop
+        self._into = {}        # destination -> sources with a hop
+        self._entries = {}     # option id -> (source, destination, departure minute)
+        self._names = {}       # casefolded city name -> city name
+        self._route_cities = {}
+        self._dirty = set()
+
+    @property
+    def ttl(self):
+        return search_config()['TTL']
+
+    def load(self):
+        now = timezone.now()
+        route_cities = {
+            route_id: (source, destination)
+            for route_id, source, destination in Route.objects.values_list('id', 'source__name', 'destination__name')
+        }
+        rows = (
+            TravelOption.objects
+            .filter(departure_date_time__gte=now, route__isnull=False)
+            .order_by('departure_date_time', 'pk')
+            .values_list('pk', 'route_id', 'departure_date_time', 'arrival_date_time', 'price', 'available_seats')
+        )
+
+        hops = {}
+        entries = {}
+        for pk, route_id, departure, arrival, price, seats in rows.iterator(chunk_size=5000):
+            source, destination = route_cities[route_id]
+            hop = hops.get((source, destination))
+            if hop is None:
+                hop = hops[(source, destination)] = Hop()
+            departure = _minutes(departure)
+            # Rows arrive in departure order, so appending keeps each hop sorted
+            hop.departures.append(departure)
+            hop.arrivals.append(_minutes(arrival))
+            hop.prices.append(_cents(price))
+            hop.seats.append(seats)
+            hop.ids.append(pk)
+            entries[pk] = (source, destination, departure)
+
+        out, into = {}, {}
+        for source, destination in hops:
+            out.setdefault(source, set()).add(destination)
+            into.setdefault(destination, set()).add(source)
+        names = {name.casefold(): name for pair in route_cities.values() for name in pair}
+        return hops, out, into, entries, names, route_cities
+
+    def install(self, state):
+        self._hops, self._out, self._into, self._entries, self._names, self._route_cities = state
+        self._dirty = set()
+
+    def ensure_fresh(self):
+        super().ensure_fresh()
+        self._reload_seats()
+
+    def add(self, option):
+        with self._lock:
+            if self._journaled(self.add, option):
+                return
+            self._discard(option.pk)
+            if option.route_id is None or option.departure_date_time < timezone.now():
+                return
+            cities = self._route_cities.get(option.route_id)
+            if cities is None:
+                cities = self._route_cities[option.route_id] = (option.route.source.name, option.route.destination.name)
+            source, destination = cities
+            hop = self._hops.get((source, destination))
+            if hop is None:
+                hop = self._hops[(source, destination)] = Hop()
+                self._out.setdefault(source, set()).add(destination)
+                self._into.setdefault(destination, set()).add(source)
+                self._names.setdefault(source.casefold(), source)
+                self._names.setdefault(destination.casefold(), destination)
+            departure = _minutes(option.departure_date_time)
+            hop.insert(departure, _minutes(option.arrival_date_time), _cents(option.price), option.available_seats, option.pk)
+            self._entries[option.pk] = (source, destination, departure)
+
+    def discard(self, pk):
+        with self._lock:
+            if not self._journaled(self.discard, pk):
+                self._discard(pk)
+
+    def _discard(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        source, destination, departure = entry
+        hop = self._hops[(source, destination)]
+        position = hop.find(departure, pk)
+        if position is not None:
+            hop.remove(position)
+
+    def seats_changed(self, pk):
+        with self._lock:
+            if not self._journaled(self.seats_changed, pk) and pk in self._entries:
+                self._dirty.add(pk)
+
+    def _reload_seats(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        seats = dict(TravelOption.objects.filter(pk__in=dirty).values_list('pk', 'available_seats'))
+        with self._lock:
+            for pk, available in seats.items():
+                entry = self._entries.get(pk)
+                if entry is None:
+                    continue
+                source, destination, departure = entry
+                hop = self._hops[(source, destination)]
+                position = hop.find(departure, pk)
+                if position is not None:
+                    hop.seats[position] = available
+
+    def resolve(self, name):
+        self.ensure_fresh()
+        return self._names.get(name.strip().casefold())
+
+    def search(self, source, destination, start, end, seats=1, max_legs=None, sort='arrival', limit=10):
+        """
+        Return up to ``limit`` itineraries from ``source`` to ``destination``
+        (exact city names) whose first leg departs in [start, end), best first
+        by ``sort`` (arrival, duration or price).
+        """
+        config = search_config()
+        max_legs = min(max_legs or config['MAX_LEGS'], config['MAX_LEGS'])
+        min_layover = config['MIN_LAYOVER_MINUTES']
+        max_layover = config['MAX_LAYOVER_HOURS'] * 60
+        key = SORT_KEYS[sort]
+        self.ensure_fresh()
+
+        start = _minutes(max(start, timezone.now()))
+        end = _minutes(end) - 1
+        # Max-heap of the best ``limit`` itineraries so far, as (negated key, order, itinerary)
+        kept = []
+        order = 0
+
+        def worst():
+            # Every sort key only grows as legs are added, so a partial itinerary
+            # that already ranks below the worst kept one can never make the cut.
+            return tuple(-part for part in kept[0][0]) if len(kept) == limit else None
+
+        def offer(itinerary):
+            nonlocal order
+            entry = (tuple(-part for part in key(itinerary)), order, itinerary)
+            order += 1
+            if len(kept) < limit:
+                heapq.heappush(kept, entry)
+            elif entry > kept[0]:
+                heapq.heapreplace(kept, entry)
+
+        def hopeless(partial):
+            bound = worst()
+            return bound is not None and key(partial)[0] > bound[0]
+
+        with self._lock:
+            into_destination = self._into.get(destination, set())
+
+            def finish(partial, city):
+                # At most ``limit`` ways from ``city`` straight to the
+                # destination can make the overall top ``limit``
+                hop = self._hops.get((city, destination))
+                if hop is None:
+                    return
+                window = hop.window(partial.arrival + min_layover, partial.arrival + max_layover, seats)
+                for itinerary in heapq.nsmallest(limit, (partial.extend(hop, i) for i in window), key=key):
+                    offer(itinerary)
+
+            # Direct options first, then one and two changes, so the bound is
+            # as tight as possible before the wide three-leg scan.
+            firsts = []
+            for first_stop in self._out.get(source, ()):
+                hop = self._hops[(source, first_stop)]
+                for i in hop.window(start, end, seats):
+                    first = Itinerary((hop.ids[i],), hop.departures[i], hop.arrivals[i], hop.prices[i])
+                    if first_stop == destination:
+                        offer(first)
+                    else:
+                        firsts.append((first_stop, first))
+            firsts.sort(key=lambda pair: key(pair[1]))
+
+            if max_legs >= 2:
+                for first_stop, first in firsts:
+                    if hopeless(first):
+                        break
+                    if first_stop in into_destination:
+                        finish(first, first_stop)
+
+            if max_legs >= 3:
+                for first_stop, first in firsts:
+                    if hopeless(first):
+                        break
+                    for second_stop in self._out.get(first_stop, set()) & into_destination:
+                        if second_stop in (source, destination):
+                            continue
+                        middle = self._hops[(first_stop, second_stop)]
+                        window = middle.window(first.arrival + min_layover, first.arrival + max_layover, seats)
+                        for j in window:
+                            partial = first.extend(middle, j)
+                            if not hopeless(partial):
+                                finish(partial, second_stop)
+
+        return sorted((itinerary for _, _, itinerary in kept), key=key)
+
+
+connection_graph = ConnectionGraph()
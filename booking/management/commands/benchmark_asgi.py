@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import statistics
+import threading
+import time
+import types
+from urllib.parse import urlencode
+from booking import async_views, views
+from booking.models import TravelOption
+from booking.urls import build_urlpatterns
+
+
+def _urlconf(read_views):
+    module = types.ModuleType(f'benchmark_urls_{read_views.__name__}')
+    module.urlpatterns = build_urlpatterns(read_views)
+    return module
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'mean': statistics.mean(latencies) * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare sync (WSGI) and async (ASGI) throughput of the home, search and detail views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent in-flight requests')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        concurrency = options['concurrency']
+        option = TravelOption.objects.order_by('pk').first()
+        if option is None:
+            raise CommandError('No travel options found; run populate_data first')
+
+        paths = [
+            '/',
+            '/travel-options/',
+            '/travel-options/?' + urlencode({'source': option.source, 'sort_by': 'price_low'}),
+            f'/travel-option/{option.pk}/',
+        ]
+        workload = [paths[i % len(paths)] for i in range(total)]
+
+        with override_settings(ALLOWED_HOSTS=['*'], RATE_LIMIT={'ENABLED': False}):
+            with override_settings(ROOT_URLCONF=_urlconf(views)):
+                wsgi = self._run_wsgi(workload, concurrency)
+            with override_settings(ROOT_URLCONF=_urlconf(async_views)):
+                asgi = asyncio.run(self._run_asgi(workload, concurrency))
+
+        self.stdout.write(f'{total} requests, concurrency {concurrency}')
+        for name, result in [('WSGI (sync views)', wsgi), ('ASGI (async views)', asgi)]:
+            self.stdout.write(
+                f'{name:<20} {result["throughput"]:8.1f} req/s  '
+                f'p50 {result["p50"]:7.1f} ms  p95 {result["p95"]:7.1f} ms  mean {result["mean"]:7.1f} ms'
+            )
+        self.stdout.write(self.style.SUCCESS(f'ASGI/WSGI throughput ratio: {asgi["throughput"] / wsgi["throughput"]:.2f}x'))
+
+    def _run_wsgi(self, workload, concurrency):
+        local = threading.local()
+
+        def fetch(path):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            started = time.perf_counter()
+            response = local.client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path} returned {response.status_code}')
+            return time.perf_counter() - started
+
+        def close_connections(_):
+            connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(fetch, workload[:concurrency]))  # warm up
+            started = time.perf_counter()
+            latencies = list(pool.map(fetch, workload))
+            elapsed = time.perf_counter() - started
+            list(pool.map(close_connections, range(concurrency)))
+        return _summary(latencies, elapsed)
+
+    async def _run_asgi(self, workload, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(path):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                if response.status_code != 200:
+                    raise CommandError(f'{path} returned {response.status_code}')
+                return time.perf_counter() - started
+
+        await asyncio.gather(*(fetch(path) for path in workload[:concurrency]))  # warm up
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(fetch(path) for path in workload))
+        elapsed = time.perf_counter() - started
+        return _summary(latencies, elapsed)
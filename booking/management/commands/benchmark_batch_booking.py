@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+import json
+import time
+from booking.inventory import release_seats
+from booking.models import Booking, TravelOption
+
+USERNAME = 'batch_benchmark_agency'
+PASSWORD = 'batch-benchmark'
+
+
+class Command(BaseCommand):
+    help = 'Time N single-seat bookings posted one by one against the same N items posted as one batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=60, help='Bookings per run (at most 200 per batch)')
+        parser.add_argument('--options', type=int, default=3, help='Travel options the bookings are spread over')
+
+    def handle(self, *args, **options):
+        count = options['items']
+        if not 0 < count <= 200 or options['options'] <= 0:
+            raise CommandError('--items must be 1-200 and --options positive')
+
+        option_ids = list(
+            TravelOption.objects.filter(departure_date_time__gt=timezone.now(), available_seats__gte=2 * count)
+            .order_by('-available_seats')
+            .values_list('pk', flat=True)[:options['options']]
+        )
+        if not option_ids:
+            raise CommandError(f'No upcoming travel option has {2 * count} seats left; run populate_data first')
+
+        User.objects.filter(username=USERNAME).delete()
+        user = User.objects.create_user(USERNAME, f'{USERNAME}@example.com', PASSWORD)
+        items = [
+            {
+                'travel_option': option_ids[i % len(option_ids)],
+                'number_of_seats': 1,
+                'passenger_names': 'Batch Benchmark',
+                'contact_email': 'batch-benchmark@example.com',
+                'contact_phone': '9876543210',
+            }
+            for i in range(count)
+        ]
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'], RATE_LIMIT={'ENABLED': False}):
+                client = Client()
+                client.force_login(user)
+
+                with CaptureQueriesContext(connection) as single_queries:
+                    started = time.perf_counter()
+                    for item in items:
+                        client.post(reverse('book_travel', args=[item['travel_option']]), item)
+                    single = time.perf_counter() - started
+
+                with CaptureQueriesContext(connection) as batch_queries:
+                    started = time.perf_counter()
+                    response = client.post(reverse('api_batch_booking'), json.dumps({'items': items}), content_type='application/json')
+                    batch = time.perf_counter() - started
+                if response.status_code != 201:
+                    raise CommandError(f'Batch booking failed with {response.status_code}: {response.content[:200]!r}')
+        finally:
+            # Give the seats back before the bookings go with the user
+            for option_id, seats in Booking.objects.filter(user__username=USERNAME).exclude(status='CANCELLED').values_list('travel_option_id', 'number_of_seats'):
+                release_seats(option_id, seats)
+            User.objects.filter(username=USERNAME).delete()
+
+        self.stdout.write(f'{"mode":<8} {"total ms":>9} {"ms/item":>8} {"queries":>8}')
+        for label, elapsed, queries in (('single', single, single_queries), ('batch', batch, batch_queries)):
+            self.stdout.write(f'{label:<8} {elapsed * 1000:>9.1f} {elapsed * 1000 / count:>8.2f} {len(queries):>8}')
+        self.stdout.write(f'Batch is {single / batch:.1f}x faster for {count} items over {len(option_ids)} options.')
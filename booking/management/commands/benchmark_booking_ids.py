@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+import random
+import string
+import time
+from booking.booking_ids import new_booking_id, new_booking_ids
+
+
+def legacy_booking_id():
+    return 'BK' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+
+
+class Command(BaseCommand):
+    help = 'Compare booking id generation rates and check the generated ids for collisions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000, help='Ids per method')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Ids per new_booking_ids() call')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+
+        def bulk():
+            ids = []
+            for start in range(0, count, batch_size):
+                ids.extend(new_booking_ids(min(batch_size, count - start)))
+            return ids
+
+        methods = [
+            ('legacy random', lambda: [legacy_booking_id() for _ in range(count)]),
+            ('new_booking_id', lambda: [new_booking_id() for _ in range(count)]),
+            (f'new_booking_ids({batch_size})', bulk),
+        ]
+        for name, generate in methods:
+            started = time.perf_counter()
+            ids = generate()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{name:<24} {count / elapsed:>12,.0f} ids/s  '
+                f'{(elapsed / count) * 1e9:>7.0f} ns/id  duplicates {count - len(set(ids))}'
+            )
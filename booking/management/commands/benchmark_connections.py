@@ -0,0 +1,91 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+import random
+import resource
+import time
+from booking.itineraries import connection_graph
+from booking.models import TravelOption
+from booking.performance import percentile
+
+
+class Command(BaseCommand):
+    help = 'Seed the catalog and measure connection graph build time, memory and multi-leg search latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000], help='Catalog sizes to seed and benchmark, e.g. 100000 1000000')
+        parser.add_argument('--no-seed', action='store_true', help='Benchmark the current catalog instead of reseeding')
+        parser.add_argument('--queries', type=int, default=500, help='Searches per catalog size')
+        parser.add_argument('--days', type=int, default=30, help='Search dates are drawn from the next N days')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the catalog and the queries')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive', help='Do not ask before reseeding')
+
+    def handle(self, *args, **options):
+        if options['queries'] <= 0 or options['days'] <= 0:
+            raise CommandError('--queries and --days must be positive')
+
+        sizes = [None] if options['no_seed'] else options['rows']
+        if not options['no_seed'] and options['interactive']:
+            answer = input(f'This deletes all bookings and travel options in {connection.settings_dict["NAME"]}. Continue? [y/N] ')
+            if answer.lower() != 'y':
+                raise CommandError('Aborted')
+
+        for rows in sizes:
+            if rows is not None:
+                self.stdout.write(f'Seeding {rows:,} travel options...')
+                call_command('populate_data', count=rows, seed=options['seed'], stdout=StringIO())
+            self.run(options)
+
+    def run(self, options):
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        connection_graph.build()
+        build_s = time.perf_counter() - started
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+        rng = random.Random(options['seed'])
+        cities = sorted(connection_graph._out)
+        if len(cities) < 2:
+            raise CommandError('Not enough cities with upcoming departures to benchmark')
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        latencies = []
+        legs = {}
+        answered = 0
+        for _ in range(options['queries']):
+            source, destination = rng.sample(cities, 2)
+            start = today + timedelta(days=rng.randrange(1, options['days'] + 1))
+            began = time.perf_counter()
+            itineraries = connection_graph.search(source, destination, start, start + timedelta(days=1))
+            latencies.append(time.perf_counter() - began)
+            if itineraries:
+                answered += 1
+                fewest = min(len(itinerary.legs) for itinerary in itineraries)
+                legs[fewest] = legs.get(fewest, 0) + 1
+        latencies.sort()
+
+        # Incremental upkeep: reload seats for a batch of changed options
+        sample = list(TravelOption.objects.filter(departure_date_time__gt=timezone.now()).values_list('pk', flat=True)[:500])
+        for pk in sample:
+            connection_graph.seats_changed(pk)
+        began = time.perf_counter()
+        connection_graph.ensure_fresh()
+        reload_ms = (time.perf_counter() - began) * 1000
+
+        self.stdout.write(f'\n{TravelOption.objects.count():,} travel options')
+        self.stdout.write(
+            f'graph: {len(connection_graph._entries):,} edges on {len(connection_graph._hops):,} hops, '
+            f'built in {build_s:.2f}s, peak RSS +{rss_growth / 1024:.0f} MB'
+        )
+        self.stdout.write(
+            f'search: {len(latencies)} queries, p50 {percentile(latencies, 0.50) * 1000:.2f} ms, '
+            f'p95 {percentile(latencies, 0.95) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms'
+        )
+        self.stdout.write(
+            f'answered {answered}/{len(latencies)}; fewest legs '
+            + ', '.join(f'{count}: {legs[count]}' for count in sorted(legs))
+        )
+        self.stdout.write(f'seat reload for {len(sample)} changed options: {reload_ms:.1f} ms')
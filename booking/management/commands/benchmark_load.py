@@ -0,0 +1,249 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+import django
+import json
+import platform
+import random
+import statistics
+import time
+from booking.models import Route, TravelOption
+from booking.performance import percentile
+
+ENDPOINTS = ['home', 'search', 'detail', 'book', 'cancel', 'my_bookings']
+DEFAULT_MIX = 'home=30,search=30,detail=20,book=8,cancel=4,my_bookings=8'
+USERNAME_PREFIX = 'loadtest_user_'
+SAMPLE_OPTIONS = 2000
+SAMPLE_ROUTES = 500
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise CommandError(f'Unknown endpoint {name!r} in --mix; choose from {", ".join(ENDPOINTS)}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Invalid weight for {name!r} in --mix')
+    if not mix or sum(mix.values()) <= 0:
+        raise CommandError('--mix needs at least one positive weight')
+    return mix
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'requests': 0, 'errors': errors}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': round(len(latencies) / elapsed, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+class TrafficModel:
+    """Picks requests for simulated users from the seeded catalog."""
+
+    def __init__(self, mix, seed):
+        self.endpoints = list(mix)
+        self.weights = [mix[name] for name in self.endpoints]
+        self.seed = seed
+
+        now = timezone.now()
+        bounds = TravelOption.objects.order_by('pk').values_list('pk', flat=True)
+        first, last = bounds.first(), bounds.last()
+        if first is None:
+            raise CommandError('No travel options found; seed with --rows or run populate_data first')
+        # Sample ids across the whole table instead of only the soonest departures
+        rng = random.Random(seed)
+        candidates = rng.sample(range(first, last + 1), min(SAMPLE_OPTIONS * 2, last - first + 1))
+        self.option_ids = list(
+            TravelOption.objects.filter(pk__in=candidates, departure_date_time__gt=now, available_seats__gt=0)
+            .values_list('pk', flat=True)[:SAMPLE_OPTIONS]
+        )
+        self.routes = list(
+            Route.objects.values_list('source__name', 'destination__name').order_by('pk')[:SAMPLE_ROUTES]
+        )
+        if not self.option_ids or not self.routes:
+            raise CommandError('No upcoming travel options with seats left to benchmark against')
+
+    def search_params(self, rng):
+        source, destination = rng.choice(self.routes)
+        params = {'source': source}
+        roll = rng.random()
+        if roll < 0.5:
+            params['destination'] = destination
+        if roll > 0.7:
+            params['sort_by'] = 'price_low'
+        if rng.random() < 0.3:
+            params['type'] = rng.choice(['FLIGHT', 'TRAIN', 'BUS'])
+        return params
+
+
+class SimulatedUser:
+    def __init__(self, user):
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(user)
+        self.bookings = []
+
+    def request(self, endpoint, model, rng):
+        if endpoint == 'cancel' and not self.bookings:
+            endpoint = 'book'
+
+        if endpoint == 'home':
+            response = self.client.get(reverse('home'))
+        elif endpoint == 'search':
+            response = self.client.get(reverse('travel_options'), model.search_params(rng))
+        elif endpoint == 'detail':
+            response = self.client.get(reverse('travel_option_detail', args=[rng.choice(model.option_ids)]))
+        elif endpoint == 'my_bookings':
+            response = self.client.get(reverse('my_bookings'))
+        elif endpoint == 'book':
+            response = self.client.post(reverse('book_travel', args=[rng.choice(model.option_ids)]), {
+                'number_of_seats': 1,
+                'passenger_names': 'Load Test',
+                'contact_email': 'loadtest@example.com',
+                'contact_phone': '9876543210',
+            })
+            if response.status_code == 302:
+                match = resolve(response['Location'])
+                if match.url_name == 'booking_detail':
+                    # Checkout is a seat hold followed by confirmation
+                    response = self.client.post(reverse('confirm_booking', args=[match.kwargs['pk']]))
+                    self.bookings.append(match.kwargs['pk'])
+        else:
+            response = self.client.post(reverse('cancel_booking', args=[self.bookings.pop()]))
+        return endpoint, response.status_code
+
+
+class Command(BaseCommand):
+    help = 'Seed the catalog and replay a weighted traffic mix in process, reporting latency percentiles per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000], help='Catalog sizes to seed and benchmark, e.g. 10000 100000 1000000')
+        parser.add_argument('--no-seed', action='store_true', help='Benchmark the current catalog instead of reseeding')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help='Endpoint weights, e.g. home=30,search=30,detail=20,...')
+        parser.add_argument('--requests', type=int, default=2000, help='Measured requests per catalog size')
+        parser.add_argument('--users', type=int, default=100, help='Simulated logged-in users')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads; users are shared among them')
+        parser.add_argument('--warmup', type=int, default=100, help='Unmeasured requests before timing')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the catalog and the traffic')
+        parser.add_argument('--output', default='load_benchmark.json', help='JSON results file')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive', help='Do not ask before reseeding')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        concurrency = options['concurrency']
+        if concurrency <= 0 or options['users'] < concurrency or options['requests'] <= 0:
+            raise CommandError('--requests and --concurrency must be positive and --users at least --concurrency')
+
+        sizes = [None] if options['no_seed'] else options['rows']
+        if not options['no_seed'] and options['interactive']:
+            answer = input(f'This deletes all bookings and travel options in {connection.settings_dict["NAME"]}. Continue? [y/N] ')
+            if answer.lower() != 'y':
+                raise CommandError('Aborted')
+
+        runs = []
+        for rows in sizes:
+            if rows is not None:
+                self.stdout.write(f'Seeding {rows:,} travel options...')
+                call_command('populate_data', count=rows, seed=options['seed'], stdout=StringIO())
+            run = self.run_mix(mix, options)
+            run['rows'] = TravelOption.objects.count()
+            runs.append(run)
+            self.report(run)
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'mix': mix,
+            'requests': options['requests'],
+            'users': options['users'],
+            'concurrency': concurrency,
+            'seed': options['seed'],
+            'runs': runs,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def create_users(self, count):
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        password = make_password(None)
+        User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{i}', email=f'{USERNAME_PREFIX}{i}@example.com', password=password)
+            for i in range(count)
+        ])
+        return list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk'))
+
+    def run_mix(self, mix, options):
+        concurrency = options['concurrency']
+        model = TrafficModel(mix, options['seed'])
+        users = self.create_users(options['users'])
+        per_thread = [options['requests'] // concurrency + (i < options['requests'] % concurrency) for i in range(concurrency)]
+        warmup = options['warmup'] // concurrency
+
+        def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            simulated = [SimulatedUser(user) for user in users[index::concurrency]]
+            samples = []
+            try:
+                for i in range(warmup + per_thread[index]):
+                    user = simulated[i % len(simulated)]
+                    endpoint = rng.choices(model.endpoints, model.weights)[0]
+                    started = time.perf_counter()
+                    endpoint, status = user.request(endpoint, model, rng)
+                    if i >= warmup:
+                        samples.append((endpoint, time.perf_counter() - started, status >= 400))
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+            return samples
+
+        # Simulated users replay far more requests than the rate limits allow
+        with override_settings(ALLOWED_HOSTS=['*'], RATE_LIMIT={'ENABLED': False}):
+            started = time.perf_counter()
+            if concurrency == 1:
+                results = [worker(0)]
+            else:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    results = list(pool.map(worker, range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        samples = [sample for result in results for sample in result]
+        endpoints = {}
+        for name in ENDPOINTS:
+            selected = [sample for sample in samples if sample[0] == name]
+            if selected:
+                endpoints[name] = summarize([s[1] for s in selected], sum(s[2] for s in selected), elapsed)
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'overall': summarize([s[1] for s in samples], sum(s[2] for s in samples), elapsed),
+            'endpoints': endpoints,
+        }
+
+    def report(self, run):
+        self.stdout.write(f'\n{run["rows"]:,} travel options, {run["elapsed_s"]}s')
+        self.stdout.write(f'{"endpoint":<12} {"requests":>8} {"errors":>6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+        for name, result in [*run['endpoints'].items(), ('overall', run['overall'])]:
+            self.stdout.write(
+                f'{name:<12} {result["requests"]:>8} {result["errors"]:>6} {result["throughput"]:>8.1f} '
+                f'{result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f}'
+            )
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+import statistics
+import time
+from booking.forms import TravelSearchForm
+from booking.search import upcoming_options
+
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Measure travel_options.html render time per page with and without card fragment caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[9, 50], help='Cards per page')
+        parser.add_argument('--repeat', type=int, default=50, help='Renders per measurement')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        request = RequestFactory().get('/travel-options/')
+        request.user = AnonymousUser()
+
+        self.stdout.write(f'{"cards":>5}  {"no cache":>10}  {"cold":>10}  {"warm":>10}')
+        for size in options['sizes']:
+            page = list(upcoming_options()[:size])
+            if len(page) < size:
+                raise CommandError(f'Need {size} upcoming travel options; run populate_data first')
+            context = {
+                'page_obj': page,
+                'form': TravelSearchForm(),
+                'total_count': len(page),
+                'query_string': '',
+            }
+
+            def render():
+                started = time.perf_counter()
+                render_to_string('booking/travel_options.html', context, request)
+                return time.perf_counter() - started
+
+            with override_settings(CACHES=DUMMY_CACHES):
+                uncached = [render() for _ in range(repeat)]
+
+            cold = []
+            for _ in range(repeat):
+                cache.clear()
+                cold.append(render())
+            warm = [render() for _ in range(repeat)]
+
+            self.stdout.write(
+                f'{size:>5}  {statistics.median(uncached) * 1000:>8.2f}ms  '
+                f'{statistics.median(cold) * 1000:>8.2f}ms  {statistics.median(warm) * 1000:>8.2f}ms'
+            )
@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+import random
+import time
+from booking.models import TravelOption
+from booking.performance import percentile
+
+USERNAME = 'session_benchmark_user'
+PASSWORD = 'session-benchmark'
+SESSIONS = 'django.contrib.sessions.backends.'
+MESSAGES = 'django.contrib.messages.storage.'
+# (label, session engine, message storage); the first two are the old setups
+CONFIGURATIONS = [
+    ('db + session messages', SESSIONS + 'db', MESSAGES + 'session.SessionStorage'),
+    ('db + fallback messages', SESSIONS + 'db', MESSAGES + 'fallback.FallbackStorage'),
+    ('cached_db + cookie messages', SESSIONS + 'cached_db', MESSAGES + 'cookie.CookieStorage'),
+    ('cache + cookie messages', SESSIONS + 'cache', MESSAGES + 'cookie.CookieStorage'),
+]
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class StatementCounter:
+    def __init__(self):
+        self.session_reads = 0
+        self.session_writes = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip().upper()
+        write = statement.startswith(WRITES)
+        if 'DJANGO_SESSION' in statement:
+            if write:
+                self.session_writes += 1
+            else:
+                self.session_reads += 1
+        if write:
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Replay login-to-logout booking flows under each session/message setup and count session table I/O'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flows', type=int, default=50, help='Booking flows per configuration')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the options booked')
+
+    def handle(self, *args, **options):
+        if options['flows'] <= 0:
+            raise CommandError('--flows must be positive')
+
+        option_ids = list(
+            TravelOption.objects.filter(departure_date_time__gt=timezone.now(), available_seats__gt=0)
+            .values_list('pk', flat=True)[:500]
+        )
+        if not option_ids:
+            raise CommandError('No upcoming travel options with seats left; run populate_data first')
+
+        User.objects.filter(username=USERNAME).delete()
+        user = User.objects.create_user(USERNAME, f'{USERNAME}@example.com', PASSWORD)
+        try:
+            self.stdout.write(
+                f'{"configuration":<30} {"session reads":>13} {"session writes":>14} {"all writes":>10} {"flow p50 ms":>11}'
+            )
+            for label, engine, storage in CONFIGURATIONS:
+                rng = random.Random(options['seed'])
+                caches['sessions'].clear()
+                with override_settings(
+                    SESSION_ENGINE=engine,
+                    MESSAGE_STORAGE=storage,
+                    ALLOWED_HOSTS=['*'],
+                    RATE_LIMIT={'ENABLED': False},
+                    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+                ):
+                    user.set_password(PASSWORD)
+                    user.save(update_fields=['password'])
+                    counter = StatementCounter()
+                    durations = []
+                    with connection.execute_wrapper(counter):
+                        for _ in range(options['flows']):
+                            started = time.perf_counter()
+                            self.flow(rng.choice(option_ids))
+                            durations.append(time.perf_counter() - started)
+                durations.sort()
+                flows = options['flows']
+                self.stdout.write(
+                    f'{label:<30} {counter.session_reads / flows:>13.1f} {counter.session_writes / flows:>14.1f} '
+                    f'{counter.writes / flows:>10.1f} {percentile(durations, 0.50) * 1000:>11.1f}'
+                )
+        finally:
+            User.objects.filter(username=USERNAME).delete()
+        self.stdout.write('Counts are per flow: login, search, detail, book, confirm, my bookings, cancel, logout.')
+
+    def flow(self, option_id):
+        client = Client()
+        option = TravelOption.objects.only('source').get(pk=option_id)
+        client.post(reverse('login'), {'username': USERNAME, 'password': PASSWORD}, follow=True)
+        client.get(reverse('travel_options'), {'source': option.source})
+        client.get(reverse('travel_option_detail', args=[option_id]))
+        response = client.post(reverse('book_travel', args=[option_id]), {
+            'number_of_seats': 1,
+            'passenger_names': 'Session Benchmark',
+            'contact_email': 'session-benchmark@example.com',
+            'contact_phone': '9876543210',
+        })
+        match = resolve(response['Location']) if response.status_code == 302 else None
+        if match is not None and match.url_name == 'booking_detail':
+            booking_id = match.kwargs['pk']
+            client.get(response['Location'])
+            client.post(reverse('confirm_booking', args=[booking_id]), follow=True)
+            client.get(reverse('my_bookings'))
+            client.post(reverse('cancel_booking', args=[booking_id]), follow=True)
+        client.get(reverse('logout'), follow=True)
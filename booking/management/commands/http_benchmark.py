@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException
+from urllib.parse import urlencode
+from urllib.request import urlopen
+import time
+from booking.models import TravelOption
+
+
+class Command(BaseCommand):
+    help = 'Measure request rate and latency of a running server over the read-heavy pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--requests', type=int, default=400, help='Requests to send after warm-up')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client threads')
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        total = options['requests']
+        concurrency = options['concurrency']
+        option = TravelOption.objects.order_by('pk').first()
+        if option is None:
+            raise CommandError('No travel options found; run populate_data first')
+
+        paths = [
+            '/',
+            '/travel-options/',
+            '/travel-options/?' + urlencode({'source': option.source, 'sort_by': 'price_low'}),
+            f'/travel-option/{option.pk}/',
+        ]
+
+        def fetch(i):
+            """Returns (latency, None), or (None, error) for a failed request."""
+            path = paths[i % len(paths)]
+            started = time.perf_counter()
+            try:
+                with urlopen(base + path, timeout=30) as response:
+                    response.read()
+            except (OSError, HTTPException) as e:
+                return None, f'{path}: {e}'
+            return time.perf_counter() - started, None
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(fetch, range(concurrency)))  # warm up
+            started = time.perf_counter()
+            results = list(pool.map(fetch, range(total)))
+            elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results if latency is not None)
+        errors = Counter(error for _, error in results if error is not None)
+        for error, count in errors.most_common(5):
+            self.stderr.write(f'{count} x {error}')
+        if not latencies:
+            raise CommandError(f'All {total} requests failed')
+
+        ok = len(latencies)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{ok / elapsed:.1f} req/s  '
+                f'p50 {latencies[ok // 2] * 1000:.1f} ms  '
+                f'p95 {latencies[max(int(ok * 0.95) - 1, 0)] * 1000:.1f} ms'
+                + (f'  ({total - ok} of {total} failed)' if ok < total else '')
+            )
+        )
@@ -1,8 +1,318 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import timedelta
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+import csv
+import multiprocessing
 import random
-from booking.models import TravelOption
+import time
+from booking.featured import featured_feed
+from booking.models import Booking, CatalogVersion, City, Route, TravelOption, travel_minutes
+from booking.route_summary import rebuild_route_summary
+
+# Major Indian cities with proper classification
+TIER1_CITIES = [
+    'Delhi', 'Mumbai', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad',
+    'Pune', 'Ahmedabad', 'Surat', 'Jaipur'
+]
+
+TIER2_CITIES = [
+    'Lucknow', 'Kanpur', 'Nagpur', 'Indore', 'Thane', 'Bhopal',
+    'Visakhapatnam', 'Pimpri-Chinchwad', 'Patna', 'Vadodara',
+    'Ghaziabad', 'Ludhiana', 'Agra', 'Nashik', 'Faridabad',
+    'Meerut', 'Rajkot', 'Kalyan-Dombivali', 'Vasai-Virar', 'Varanasi',
+    'Srinagar', 'Aurangabad', 'Dhanbad', 'Amritsar', 'Allahabad',
+    'Ranchi', 'Howrah', 'Coimbatore', 'Jabalpur', 'Gwalior'
+]
+
+TIER3_CITIES = [
+    'Vijayawada', 'Jodhpur', 'Madurai', 'Raipur', 'Kota', 'Guwahati',
+    'Chandigarh', 'Solapur', 'Hubballi-Dharwad', 'Tiruchirappalli',
+    'Bareilly', 'Mysuru', 'Tiruppur', 'Gurgaon', 'Aligarh',
+    'Jalandhar', 'Bhubaneswar', 'Salem', 'Warangal', 'Guntur',
+    'Bhiwandi', 'Saharanpur', 'Gorakhpur', 'Bikaner', 'Amravati',
+    'Noida', 'Jamshedpur', 'Bhilai Nagar', 'Cuttack', 'Firozabad',
+    'Kochi', 'Nellore', 'Bhavnagar', 'Dehradun', 'Durgapur',
+    'Asansol', 'Rourkela', 'Nanded', 'Kolhapur', 'Ajmer',
+    'Akola', 'Gulbarga', 'Jamnagar', 'Ujjain', 'Loni',
+    'Siliguri', 'Jhansi', 'Ulhasnagar', 'Jammu', 'Sangli-Miraj',
+    'Belgaum', 'Mangalore', 'Ambattur', 'Tirunelveli', 'Malegaon'
+]
+
+ALL_INDIAN_CITIES = TIER1_CITIES + TIER2_CITIES + TIER3_CITIES
+
+# International destinations accessible from major Indian airports
+INTERNATIONAL_DESTINATIONS = [
+    # Middle East
+    'Dubai', 'Abu Dhabi', 'Sharjah', 'Doha', 'Kuwait City', 'Riyadh', 'Jeddah',
+    'Muscat', 'Manama', 'Baghdad', 'Tehran', 'Beirut',
+
+    # Southeast Asia
+    'Singapore', 'Bangkok', 'Kuala Lumpur', 'Jakarta', 'Manila', 'Ho Chi Minh City',
+    'Hanoi', 'Phuket', 'Denpasar', 'Yangon', 'Phnom Penh', 'Vientiane',
+
+    # East Asia
+    'Hong Kong', 'Tokyo', 'Osaka', 'Seoul', 'Busan', 'Taipei', 'Shanghai',
+    'Beijing', 'Guangzhou', 'Shenzhen', 'Macau',
+
+    # Europe
+    'London', 'Paris', 'Frankfurt', 'Amsterdam', 'Zurich', 'Vienna',
+    'Rome', 'Milan', 'Madrid', 'Barcelona', 'Brussels', 'Copenhagen',
+    'Stockholm', 'Helsinki', 'Warsaw', 'Prague', 'Budapest', 'Bucharest',
+    'Moscow', 'St. Petersburg', 'Istanbul', 'Athens',
+
+    # North America
+    'New York', 'Los Angeles', 'Chicago', 'San Francisco', 'Washington DC',
+    'Boston', 'Atlanta', 'Dallas', 'Houston', 'Seattle', 'Toronto',
+    'Vancouver', 'Montreal',
+
+    # Oceania
+    'Sydney', 'Melbourne', 'Perth', 'Brisbane', 'Adelaide', 'Auckland',
+
+    # Africa
+    'Johannesburg', 'Cape Town', 'Cairo', 'Nairobi', 'Lagos', 'Addis Ababa',
+    'Dar es Salaam', 'Mauritius', 'Seychelles',
+
+    # South America
+    'São Paulo', 'Buenos Aires', 'Santiago', 'Lima',
+
+    # Other destinations
+    'Kathmandu', 'Dhaka', 'Karachi', 'Lahore', 'Islamabad', 'Colombo',
+    'Male', 'Thimphu', 'Tashkent', 'Almaty', 'Ashgabat'
+]
+
+# Realistic operators
+OPERATORS = {
+    'FLIGHT': [
+        # Indian carriers
+        'IndiGo', 'Air India', 'SpiceJet', 'GoFirst', 'Vistara', 'Air India Express',
+        'Alliance Air', 'TruJet', 'Star Air',
+        # International carriers operating in India
+        'Emirates', 'Qatar Airways', 'Etihad Airways', 'Singapore Airlines',
+        'Thai Airways', 'Malaysia Airlines', 'Cathay Pacific', 'British Airways',
+        'Lufthansa', 'KLM', 'Air France', 'Turkish Airlines', 'Flydubai',
+        'Kuwait Airways', 'Oman Air', 'Saudi Arabian Airlines'
+    ],
+    'TRAIN': [
+        'Indian Railways', 'Rajdhani Express', 'Shatabdi Express', 'Duronto Express',
+        'Garib Rath', 'Jan Shatabdi', 'Intercity Express', 'Superfast Express',
+        'Mail Express', 'Passenger Train', 'MEMU', 'DEMU', 'Vande Bharat Express',
+        'Tejas Express', 'Double Decker Express', 'Humsafar Express'
+    ],
+    'BUS': [
+        # Government operators
+        'KSRTC', 'MSRTC', 'APSRTC', 'TNSTC', 'UPSRTC', 'RSRTC', 'GSRTC',
+        'HRTC', 'PEPSU', 'DTC', 'BMTC', 'MTC', 'BEST',
+        # Private operators
+        'RedBus', 'Travels India', 'VRL Travels', 'SRS Travels', 'Kallada Travels',
+        'Orange Tours', 'Neeta Tours', 'Prasanna Purple', 'Raj National Express',
+        'Parveen Travels', 'Jabbar Travels', 'Paulo Travels', 'Sharma Travels',
+        'Rajasthan Roadways', 'Punjab Roadways'
+    ]
+}
+
+AIRLINE_CODES = {
+    'IndiGo': '6E', 'Air India': 'AI', 'SpiceJet': 'SG', 'Vistara': 'UK',
+    'Emirates': 'EK', 'Qatar Airways': 'QR', 'Singapore Airlines': 'SQ'
+}
+
+TRAVEL_TYPES = ['FLIGHT', 'TRAIN', 'BUS']
+
+# Airport cities (can have international flights)
+INTERNATIONAL_AIRPORT_CITIES = [
+    'Delhi', 'Mumbai', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad',
+    'Pune', 'Ahmedabad', 'Kochi', 'Goa', 'Thiruvananthapuram', 'Calicut',
+    'Coimbatore', 'Tiruchirappalli', 'Madurai', 'Amritsar', 'Chandigarh',
+    'Jaipur', 'Lucknow', 'Varanasi', 'Guwahati', 'Bhubaneswar',
+    'Visakhapatnam', 'Vijayawada', 'Indore', 'Nagpur', 'Srinagar'
+]
+
+ALL_CITIES = sorted(set(ALL_INDIAN_CITIES + INTERNATIONAL_DESTINATIONS + INTERNATIONAL_AIRPORT_CITIES))
+
+COPY_COLUMNS = [
+    'travel_id', 'type', 'source', 'destination', 'departure_date_time',
+    'arrival_date_time', 'price', 'available_seats', 'total_seats', 'operator',
+    'route_id', 'duration_minutes', 'created_at', 'updated_at',
+]
+
+FLIGHT_CITIES = TIER1_CITIES + TIER2_CITIES + TIER3_CITIES[:20]
+
+
+def generate_option(rng, index, now):
+    """Build one travel option as a dict; ``index`` makes travel_id unique."""
+    # Random travel type
+    travel_type = rng.choice(TRAVEL_TYPES)
+
+    # Determine if this should be international (only for flights from major airports)
+    is_international = False
+    if travel_type == 'FLIGHT' and rng.random() < 0.15:  # 15% international flights
+        source = rng.choice(INTERNATIONAL_AIRPORT_CITIES)
+        if rng.random() < 0.5:
+            # India to International
+            destination = rng.choice(INTERNATIONAL_DESTINATIONS)
+        else:
+            # International to India
+            source, destination = rng.choice(INTERNATIONAL_DESTINATIONS), source
+        is_international = True
+
+    if not is_international:
+        # Domestic routes: flights prefer tier 1 and tier 2 cities, trains and
+        # buses connect all cities
+        available_cities = FLIGHT_CITIES if travel_type == 'FLIGHT' else ALL_INDIAN_CITIES
+        source = rng.choice(available_cities)
+        destination = rng.choice(available_cities)
+        while destination == source:
+            destination = rng.choice(available_cities)
+
+    # Random departure (next 90 days) at a time slot suited to the transport type
+    if travel_type == 'FLIGHT':
+        departure_hour = rng.randint(5, 23)
+        departure_minute = rng.choice([0, 15, 30, 45])
+    elif travel_type == 'TRAIN':
+        departure_hour = rng.randint(5, 22)
+        departure_minute = rng.choice([0, 15, 30, 45])
+    else:  # BUS
+        departure_hour = rng.randint(6, 23)
+        departure_minute = rng.choice([0, 30])
+
+    departure_date = (now + timedelta(days=rng.randint(1, 90))).replace(
+        hour=departure_hour,
+        minute=departure_minute,
+        second=0,
+        microsecond=0
+    )
+
+    # Calculate duration and pricing based on travel type and route
+    if travel_type == 'FLIGHT':
+        if is_international:
+            if destination in ['Dubai', 'Abu Dhabi', 'Sharjah', 'Doha', 'Kuwait City', 'Muscat']:
+                duration_hours = rng.uniform(2.5, 4.5)
+                base_price = rng.uniform(15000, 45000)
+            elif destination in ['Singapore', 'Bangkok', 'Kuala Lumpur']:
+                duration_hours = rng.uniform(3.5, 6.0)
+                base_price = rng.uniform(18000, 55000)
+            elif destination in ['London', 'Paris', 'Frankfurt']:
+                duration_hours = rng.uniform(8.0, 11.0)
+                base_price = rng.uniform(35000, 80000)
+            elif destination in ['New York', 'Los Angeles']:
+                duration_hours = rng.uniform(14.0, 18.0)
+                base_price = rng.uniform(45000, 120000)
+            else:
+                duration_hours = rng.uniform(4.0, 12.0)
+                base_price = rng.uniform(20000, 60000)
+            total_seats = rng.choice([150, 180, 200, 250, 300, 350])
+        else:
+            duration_hours = rng.uniform(1.0, 3.5)
+            base_price = rng.uniform(3000, 15000)
+            total_seats = rng.choice([150, 180, 200, 250])
+    elif travel_type == 'TRAIN':
+        duration_hours = rng.uniform(2.0, 36.0)  # Up to 36 hours for long routes
+        base_price = rng.uniform(200, 3500)
+        total_seats = rng.choice([72, 100, 150, 200, 300])  # AC/Sleeper combinations
+    else:  # BUS
+        duration_hours = rng.uniform(2.0, 18.0)
+        base_price = rng.uniform(300, 2500)
+        total_seats = rng.choice([35, 40, 45, 49, 53])  # Various bus sizes
+
+    # Random availability (80-95% occupancy is common)
+    occupancy_rate = rng.uniform(0.05, 0.95)
+    operator = rng.choice(OPERATORS[travel_type])
+
+    # Travel ids embed the row index, so they are unique without lookups or retries
+    if travel_type == 'FLIGHT':
+        travel_id = f"{AIRLINE_CODES.get(operator, 'AI')}{100 + index}"
+    elif travel_type == 'TRAIN':
+        travel_id = f"{10000 + index}"
+    else:  # BUS
+        travel_id = f"BUS{1000 + index}"
+
+    arrival_date = departure_date + timedelta(hours=duration_hours)
+
+    return {
+        'travel_id': travel_id,
+        'type': travel_type,
+        'source': source,
+        'destination': destination,
+        'departure_date_time': departure_date,
+        'arrival_date_time': arrival_date,
+        'duration_minutes': travel_minutes(departure_date, arrival_date),
+        'price': round(base_price * rng.uniform(0.7, 1.4), 2),
+        'available_seats': max(1, int(total_seats * (1 - occupancy_rate))),
+        'total_seats': total_seats,
+        'operator': operator,
+        'is_international': is_international,
+    }
+
+
+def ensure_routes(pairs):
+    """Create any missing Route rows for (source, destination) pairs and map them to ids."""
+    pairs = set(pairs)
+    names = {name for pair in pairs for name in pair}
+    City.objects.bulk_create([City(name=name) for name in names], ignore_conflicts=True)
+    city_ids = dict(City.objects.filter(name__in=names).values_list('name', 'id'))
+    Route.objects.bulk_create(
+        [Route(source_id=city_ids[s], destination_id=city_ids[d]) for s, d in pairs],
+        ignore_conflicts=True,
+    )
+    return {
+        (source, destination): route_id
+        for route_id, source, destination in Route.objects.filter(
+            source__name__in=names, destination__name__in=names
+        ).values_list('id', 'source__name', 'destination__name')
+    }
+
+
+def _copy_rows(rows, now):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] if column in row else now for column in COPY_COLUMNS])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(
+            f"COPY {TravelOption._meta.db_table} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def write_chunk(start, size, seed, now, use_copy):
+    """Generate rows [start, start + size) and write them in one transaction."""
+    # Seeding per row keeps the catalog identical for a seed whatever the
+    # batch size or worker count
+    rows = [generate_option(random.Random((seed << 32) | index), index, now) for index in range(start, start + size)]
+    route_ids = ensure_routes((row['source'], row['destination']) for row in rows)
+    for row in rows:
+        row['route_id'] = route_ids[(row['source'], row['destination'])]
+
+    with transaction.atomic():
+        if use_copy:
+            _copy_rows(rows, now)
+        else:
+            fields = [column for column in COPY_COLUMNS if column not in ('created_at', 'updated_at')]
+            TravelOption.objects.bulk_create(
+                [TravelOption(**{field: row[field] for field in fields}) for row in rows],
+                batch_size=size,
+            )
+        # Bulk writes skip the model signals; this tells the running servers'
+        # route indexes that they are behind
+        CatalogVersion.bump()
+
+    stats = Counter(row['type'] for row in rows)
+    stats['INTERNATIONAL'] = sum(row['is_international'] for row in rows)
+    return stats
+
+
+def _write_chunk_in_worker(args):
+    # Forked workers must not share the parent's database sockets
+    connections.close_all()
+    try:
+        return write_chunk(*args)
+    finally:
+        connections.close_all()
+
 
 class Command(BaseCommand):
     help = 'Populate database with realistic Indian travel options'
@@ -14,305 +324,110 @@ class Command(BaseCommand):
             default=10000,
             help='Number of travel options to create',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows generated and inserted per batch',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed for a reproducible catalog',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes writing batches in parallel',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Load batches with PostgreSQL COPY instead of bulk INSERT',
+        )
 
     def handle(self, *args, **options):
         count = options['count']
-        
-        # Major Indian cities with proper classification
-        tier1_cities = [
-            'Delhi', 'Mumbai', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad',
-            'Pune', 'Ahmedabad', 'Surat', 'Jaipur'
-        ]
-        
-        tier2_cities = [
-            'Lucknow', 'Kanpur', 'Nagpur', 'Indore', 'Thane', 'Bhopal',
-            'Visakhapatnam', 'Pimpri-Chinchwad', 'Patna', 'Vadodara',
-            'Ghaziabad', 'Ludhiana', 'Agra', 'Nashik', 'Faridabad',
-            'Meerut', 'Rajkot', 'Kalyan-Dombivali', 'Vasai-Virar', 'Varanasi',
-            'Srinagar', 'Aurangabad', 'Dhanbad', 'Amritsar', 'Allahabad',
-            'Ranchi', 'Howrah', 'Coimbatore', 'Jabalpur', 'Gwalior'
-        ]
-        
-        tier3_cities = [
-            'Vijayawada', 'Jodhpur', 'Madurai', 'Raipur', 'Kota', 'Guwahati',
-            'Chandigarh', 'Solapur', 'Hubballi-Dharwad', 'Tiruchirappalli',
-            'Bareilly', 'Mysuru', 'Tiruppur', 'Gurgaon', 'Aligarh',
-            'Jalandhar', 'Bhubaneswar', 'Salem', 'Warangal', 'Guntur',
-            'Bhiwandi', 'Saharanpur', 'Gorakhpur', 'Bikaner', 'Amravati',
-            'Noida', 'Jamshedpur', 'Bhilai Nagar', 'Cuttack', 'Firozabad',
-            'Kochi', 'Nellore', 'Bhavnagar', 'Dehradun', 'Durgapur',
-            'Asansol', 'Rourkela', 'Nanded', 'Kolhapur', 'Ajmer',
-            'Akola', 'Gulbarga', 'Jamnagar', 'Ujjain', 'Loni',
-            'Siliguri', 'Jhansi', 'Ulhasnagar', 'Jammu', 'Sangli-Miraj',
-            'Belgaum', 'Mangalore', 'Ambattur', 'Tirunelveli', 'Malegaon'
-        ]
-        
-        all_indian_cities = tier1_cities + tier2_cities + tier3_cities
-        
-        # International destinations accessible from major Indian airports
-        international_destinations = [
-            # Middle East
-            'Dubai', 'Abu Dhabi', 'Sharjah', 'Doha', 'Kuwait City', 'Riyadh', 'Jeddah',
-            'Muscat', 'Manama', 'Baghdad', 'Tehran', 'Beirut',
-            
-            # Southeast Asia
-            'Singapore', 'Bangkok', 'Kuala Lumpur', 'Jakarta', 'Manila', 'Ho Chi Minh City',
-            'Hanoi', 'Phuket', 'Denpasar', 'Yangon', 'Phnom Penh', 'Vientiane',
-            
-            # East Asia
-            'Hong Kong', 'Tokyo', 'Osaka', 'Seoul', 'Busan', 'Taipei', 'Shanghai',
-            'Beijing', 'Guangzhou', 'Shenzhen', 'Macau',
-            
-            # Europe
-            'London', 'Paris', 'Frankfurt', 'Amsterdam', 'Zurich', 'Vienna',
-            'Rome', 'Milan', 'Madrid', 'Barcelona', 'Brussels', 'Copenhagen',
-            'Stockholm', 'Helsinki', 'Warsaw', 'Prague', 'Budapest', 'Bucharest',
-            'Moscow', 'St. Petersburg', 'Istanbul', 'Athens',
-            
-            # North America
-            'New York', 'Los Angeles', 'Chicago', 'San Francisco', 'Washington DC',
-            'Boston', 'Atlanta', 'Dallas', 'Houston', 'Seattle', 'Toronto',
-            'Vancouver', 'Montreal',
-            
-            # Oceania
-            'Sydney', 'Melbourne', 'Perth', 'Brisbane', 'Adelaide', 'Auckland',
-            
-            # Africa
-            'Johannesburg', 'Cape Town', 'Cairo', 'Nairobi', 'Lagos', 'Addis Ababa',
-            'Dar es Salaam', 'Mauritius', 'Seychelles',
-            
-            # South America
-            'São Paulo', 'Buenos Aires', 'Santiago', 'Lima',
-            
-            # Other destinations
-            'Kathmandu', 'Dhaka', 'Karachi', 'Lahore', 'Islamabad', 'Colombo',
-            'Male', 'Thimphu', 'Tashkent', 'Almaty', 'Ashgabat'
-        ]
-        
-        # Realistic operators
-        operators = {
-            'FLIGHT': [
-                # Indian carriers
-                'IndiGo', 'Air India', 'SpiceJet', 'GoFirst', 'Vistara', 'Air India Express',
-                'Alliance Air', 'TruJet', 'Star Air',
-                # International carriers operating in India
-                'Emirates', 'Qatar Airways', 'Etihad Airways', 'Singapore Airlines',
-                'Thai Airways', 'Malaysia Airlines', 'Cathay Pacific', 'British Airways',
-                'Lufthansa', 'KLM', 'Air France', 'Turkish Airlines', 'Flydubai',
-                'Kuwait Airways', 'Oman Air', 'Saudi Arabian Airlines'
-            ],
-            'TRAIN': [
-                'Indian Railways', 'Rajdhani Express', 'Shatabdi Express', 'Duronto Express',
-                'Garib Rath', 'Jan Shatabdi', 'Intercity Express', 'Superfast Express',
-                'Mail Express', 'Passenger Train', 'MEMU', 'DEMU', 'Vande Bharat Express',
-                'Tejas Express', 'Double Decker Express', 'Humsafar Express'
-            ],
-            'BUS': [
-                # Government operators
-                'KSRTC', 'MSRTC', 'APSRTC', 'TNSTC', 'UPSRTC', 'RSRTC', 'GSRTC',
-                'HRTC', 'PEPSU', 'DTC', 'BMTC', 'MTC', 'BEST',
-                # Private operators
-                'RedBus', 'Travels India', 'VRL Travels', 'SRS Travels', 'Kallada Travels',
-                'Orange Tours', 'Neeta Tours', 'Prasanna Purple', 'Raj National Express',
-                'Parveen Travels', 'Jabbar Travels', 'Paulo Travels', 'Sharma Travels',
-                'Rajasthan Roadways', 'Punjab Roadways'
-            ]
-        }
-        
-        travel_types = ['FLIGHT', 'TRAIN', 'BUS']
-        
-        # Airport cities (can have international flights)
-        international_airport_cities = [
-            'Delhi', 'Mumbai', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad',
-            'Pune', 'Ahmedabad', 'Kochi', 'Goa', 'Thiruvananthapuram', 'Calicut',
-            'Coimbatore', 'Tiruchirappalli', 'Madurai', 'Amritsar', 'Chandigarh',
-            'Jaipur', 'Lucknow', 'Varanasi', 'Guwahati', 'Bhubaneswar',
-            'Visakhapatnam', 'Vijayawada', 'Indore', 'Nagpur', 'Srinagar'
+        batch_size = options['batch_size']
+        workers = options['workers']
+        use_copy = options['copy']
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+
+        if batch_size <= 0 or workers <= 0:
+            raise CommandError('--batch-size and --workers must be positive')
+        if use_copy and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL')
+
+        # Clear existing data with set-based deletes rather than per-row cascades
+        Booking.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TravelOption._meta.db_table}')
+        CatalogVersion.bump()
+
+        now = timezone.now()
+        chunks = [
+            (start, min(batch_size, count - start), seed, now, use_copy)
+            for start in range(0, count, batch_size)
         ]
-        
-        # Clear existing data
-        TravelOption.objects.all().delete()
-        
-        created_count = 0
-        
-        for i in range(count):
-            # Random travel type
-            travel_type = random.choice(travel_types)
-            
-            # Determine if this should be international (only for flights from major airports)
-            is_international = False
-            if travel_type == 'FLIGHT' and random.random() < 0.15:  # 15% international flights
-                source = random.choice(international_airport_cities)
-                if random.random() < 0.5:
-                    # India to International
-                    destination = random.choice(international_destinations)
-                    is_international = True
-                else:
-                    # International to India
-                    source, destination = random.choice(international_destinations), source
-                    is_international = True
-            
-            if not is_international:
-                # Domestic routes
-                if travel_type == 'FLIGHT':
-                    # Flights prefer tier 1 and tier 2 cities
-                    available_cities = tier1_cities + tier2_cities + tier3_cities[:20]
-                elif travel_type == 'TRAIN':
-                    # Trains connect all cities
-                    available_cities = all_indian_cities
-                else:  # BUS
-                    # Buses prefer shorter routes, mostly tier 2 and tier 3 cities
-                    available_cities = tier1_cities + tier2_cities + tier3_cities
-                
-                source = random.choice(available_cities)
-                destination = random.choice([city for city in available_cities if city != source])
-            
-            # Random dates (next 90 days)
-            departure_date = timezone.now() + timedelta(days=random.randint(1, 90))
-            
-            # Random departure time based on transport type
-            if travel_type == 'FLIGHT':
-                departure_hour = random.choice([5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23])
-                departure_minute = random.choice([0, 15, 30, 45])
-            elif travel_type == 'TRAIN':
-                departure_hour = random.choice([5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22])
-                departure_minute = random.choice([0, 15, 30, 45])
-            else:  # BUS
-                departure_hour = random.choice([6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23])
-                departure_minute = random.choice([0, 30])
-            
-            departure_date = departure_date.replace(
-                hour=departure_hour, 
-                minute=departure_minute, 
-                second=0, 
-                microsecond=0
-            )
-            
-            # Calculate duration and pricing based on travel type and route
-            if travel_type == 'FLIGHT':
-                if is_international:
-                    # International flight durations
-                    if destination in ['Dubai', 'Abu Dhabi', 'Sharjah', 'Doha', 'Kuwait City', 'Muscat']:
-                        duration_hours = random.uniform(2.5, 4.5)
-                        base_price = random.uniform(15000, 45000)
-                    elif destination in ['Singapore', 'Bangkok', 'Kuala Lumpur']:
-                        duration_hours = random.uniform(3.5, 6.0)
-                        base_price = random.uniform(18000, 55000)
-                    elif destination in ['London', 'Paris', 'Frankfurt']:
-                        duration_hours = random.uniform(8.0, 11.0)
-                        base_price = random.uniform(35000, 80000)
-                    elif destination in ['New York', 'Los Angeles']:
-                        duration_hours = random.uniform(14.0, 18.0)
-                        base_price = random.uniform(45000, 120000)
-                    else:
-                        duration_hours = random.uniform(4.0, 12.0)
-                        base_price = random.uniform(20000, 60000)
-                    
-                    total_seats = random.choice([150, 180, 200, 250, 300, 350])
-                else:
-                    # Domestic flight durations
-                    duration_hours = random.uniform(1.0, 3.5)
-                    base_price = random.uniform(3000, 15000)
-                    total_seats = random.choice([150, 180, 200, 250])
-            
-            elif travel_type == 'TRAIN':
-                # Train durations based on distance estimation
-                duration_hours = random.uniform(2.0, 36.0)  # Up to 36 hours for long routes
-                base_price = random.uniform(200, 3500)
-                total_seats = random.choice([72, 100, 150, 200, 300])  # AC/Sleeper combinations
-            
-            else:  # BUS
-                duration_hours = random.uniform(2.0, 18.0)
-                base_price = random.uniform(300, 2500)
-                total_seats = random.choice([35, 40, 45, 49, 53])  # Various bus sizes
-            
-            arrival_date = departure_date + timedelta(hours=duration_hours)
-            
-            # Add realistic price variation
-            price = round(base_price * random.uniform(0.7, 1.4), 2)
-            
-            # Random availability (80-95% occupancy is common)
-            occupancy_rate = random.uniform(0.05, 0.95)
-            available_seats = max(1, int(total_seats * (1 - occupancy_rate)))
-            
-            # Generate travel ID
-            if travel_type == 'FLIGHT':
-                airline_codes = {
-                    'IndiGo': '6E', 'Air India': 'AI', 'SpiceJet': 'SG', 'Vistara': 'UK',
-                    'Emirates': 'EK', 'Qatar Airways': 'QR', 'Singapore Airlines': 'SQ'
-                }
-                operator_name = random.choice(operators[travel_type])
-                code = airline_codes.get(operator_name, 'AI')
-                travel_id = f"{code}{random.randint(100, 9999)}"
-            elif travel_type == 'TRAIN':
-                travel_id = f"{random.randint(10000, 99999)}"
-            else:  # BUS
-                travel_id = f"BUS{random.randint(1000, 9999)}"
-            
-            try:
-                travel_option = TravelOption.objects.create(
-                    travel_id=travel_id,
-                    type=travel_type,
-                    source=source,
-                    destination=destination,
-                    departure_date_time=departure_date,
-                    arrival_date_time=arrival_date,
-                    price=price,
-                    available_seats=available_seats,
-                    total_seats=total_seats,
-                    operator=random.choice(operators[travel_type])
-                )
-                created_count += 1
-                
-                if created_count % 100 == 0:
-                    self.stdout.write(
-                        self.style.SUCCESS(f'Created {created_count} travel options...')
-                    )
-                    
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Error creating travel option: {e}')
-                )
-                continue
-        
+
+        started = time.perf_counter()
+        stats = Counter()
+        if workers > 1 and len(chunks) > 1:
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                results = pool.map(_write_chunk_in_worker, chunks)
+                for result in results:
+                    stats.update(result)
+                    self._progress(stats)
+        else:
+            for chunk in chunks:
+                stats.update(write_chunk(*chunk))
+                self._progress(stats)
+        elapsed = time.perf_counter() - started
+
+        # Bulk writes skip the model signals; with a shared cache this also
+        # refreshes the running servers' home feed
+        featured_feed.mark_stale()
+        summary_started = time.perf_counter()
+        summary_rows = rebuild_route_summary()
+        summary_elapsed = time.perf_counter() - summary_started
+
+        created_count = stats['FLIGHT'] + stats['TRAIN'] + stats['BUS']
+        rate = created_count / elapsed if elapsed else 0
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully created {created_count} travel options!'
+                f'Successfully created {created_count} travel options '
+                f'in {elapsed:.2f}s ({rate:,.0f} rows/s, seed {seed})!'
             )
         )
-        
-        # Display statistics
-        flights = TravelOption.objects.filter(type='FLIGHT').count()
-        trains = TravelOption.objects.filter(type='TRAIN').count()
-        buses = TravelOption.objects.filter(type='BUS').count()
-        
-        # Count international vs domestic flights
-        international_flights = TravelOption.objects.filter(
-            type='FLIGHT'
-        ).exclude(
-            destination__in=all_indian_cities
-        ).count() + TravelOption.objects.filter(
-            type='FLIGHT'
-        ).exclude(
-            source__in=all_indian_cities
-        ).count()
-        
-        domestic_flights = flights - international_flights
-        
+        self.stdout.write(f'Rebuilt {summary_rows} route summary rows in {summary_elapsed:.2f}s')
+
+        # Display statistics computed from the generated rows
+        international_flights = stats['INTERNATIONAL']
+        domestic_flights = stats['FLIGHT'] - international_flights
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'\n=== TRAVEL OPTIONS SUMMARY ===\n'
-                f'Total Options: {flights + trains + buses}\n\n'
-                f'Flights: {flights}\n'
+                f'Total Options: {created_count}\n\n'
+                f'Flights: {stats["FLIGHT"]}\n'
                 f'  - Domestic: {domestic_flights}\n'
                 f'  - International: {international_flights}\n\n'
-                f'Trains: {trains}\n'
-                f'Buses: {buses}\n\n'
+                f'Trains: {stats["TRAIN"]}\n'
+                f'Buses: {stats["BUS"]}\n\n'
                 f'Coverage:\n'
-                f'  - Indian Cities: {len(all_indian_cities)}\n'
-                f'  - International Destinations: {len(international_destinations)}\n'
-                f'  - Airlines: {len(operators["FLIGHT"])}\n'
-                f'  - Train Services: {len(operators["TRAIN"])}\n'
-                f'  - Bus Operators: {len(operators["BUS"])}'
+                f'  - Indian Cities: {len(ALL_INDIAN_CITIES)}\n'
+                f'  - International Destinations: {len(INTERNATIONAL_DESTINATIONS)}\n'
+                f'  - Airlines: {len(OPERATORS["FLIGHT"])}\n'
+                f'  - Train Services: {len(OPERATORS["TRAIN"])}\n'
+                f'  - Bus Operators: {len(OPERATORS["BUS"])}'
             )
-        )
\ No newline at end of file
+        )
+
+    def _progress(self, stats):
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {stats["FLIGHT"] + stats["TRAIN"] + stats["BUS"]} travel options...')
+        )
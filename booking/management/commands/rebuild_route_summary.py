@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+from booking.route_summary import REBUILD_BATCH_SIZE, rebuild_route_summary
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-(route, type, date) availability summary from the travel options'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='Routes aggregated per query')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.perf_counter()
+        rows = rebuild_route_summary(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} route summary rows in {time.perf_counter() - started:.2f}s'
+        ))
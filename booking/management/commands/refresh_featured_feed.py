@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+from booking.featured import featured_feed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the home page featured feed, once or every --interval seconds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0, help='Seconds between rebuilds; 0 runs once')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval < 0:
+            raise CommandError('--interval must not be negative')
+
+        while True:
+            started = time.perf_counter()
+            featured = featured_feed.refresh()
+            self.stdout.write(
+                f'Featured feed rebuilt with {len(featured)} options '
+                f'in {(time.perf_counter() - started) * 1000:.1f} ms'
+            )
+            if not interval:
+                break
+            time.sleep(interval)
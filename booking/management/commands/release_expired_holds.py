@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+from booking.inventory import SWEEP_BATCH_SIZE, release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Cancel PENDING bookings whose seat hold has expired and return their seats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help='Holds released per transaction')
+        parser.add_argument('--interval', type=int, default=0, help='Seconds between sweeps; 0 sweeps once')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+        if batch_size <= 0 or interval < 0:
+            raise CommandError('--batch-size must be positive and --interval not negative')
+
+        while True:
+            started = time.perf_counter()
+            released = release_expired_holds(batch_size=batch_size)
+            self.stdout.write(
+                f'Released {released} expired holds in {(time.perf_counter() - started) * 1000:.1f} ms'
+            )
+            if not interval:
+                break
+            time.sleep(interval)
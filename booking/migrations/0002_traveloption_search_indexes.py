@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+# icontains compiles to UPPER(col) LIKE UPPER('%term%') on PostgreSQL, which a
+# trigram GIN index on the same expression can serve. Other backends skip it.
+TRIGRAM_INDEXES = [
+    ('travel_source_trgm_idx', 'source'),
+    ('travel_destination_trgm_idx', 'destination'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON booking_traveloption '
+            f'USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['departure_date_time'], name='travel_upcoming_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['type', 'departure_date_time'], name='travel_type_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['price', 'departure_date_time'], name='travel_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['type', 'price'], name='travel_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(fields=['source', 'destination', 'departure_date_time'], name='travel_route_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
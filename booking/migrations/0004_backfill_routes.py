@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def backfill_routes(apps, schema_editor):
+    City = apps.get_model('booking', 'City')
+    Route = apps.get_model('booking', 'Route')
+    TravelOption = apps.get_model('booking', 'TravelOption')
+
+    pairs = list(
+        TravelOption.objects.filter(route__isnull=True)
+        .values_list('source', 'destination')
+        .distinct()
+    )
+    if not pairs:
+        return
+
+    names = {name for pair in pairs for name in pair}
+    City.objects.bulk_create([City(name=name) for name in names], ignore_conflicts=True)
+    city_ids = dict(City.objects.filter(name__in=names).values_list('name', 'id'))
+
+    Route.objects.bulk_create(
+        [Route(source_id=city_ids[source], destination_id=city_ids[destination]) for source, destination in pairs],
+        ignore_conflicts=True,
+    )
+    route_ids = {
+        (source, destination): route_id
+        for route_id, source, destination in Route.objects.values_list('id', 'source__name', 'destination__name')
+    }
+
+    # One set-based UPDATE per route rather than one per option
+    for (source, destination), route_id in route_ids.items():
+        TravelOption.objects.filter(
+            route__isnull=True, source=source, destination=destination
+        ).update(route_id=route_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_city_route'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_routes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_backfill_routes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='traveloption',
+            name='travel_upcoming_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='traveloption',
+            name='travel_type_departure_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='traveloption',
+            name='travel_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='traveloption',
+            name='travel_type_price_idx',
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['departure_date_time', 'id'], name='travel_upcoming_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['type', 'departure_date_time', 'id'], name='travel_type_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['price', 'id'], name='travel_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(condition=models.Q(('available_seats__gt', 0)), fields=['type', 'price', 'id'], name='travel_type_price_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def backfill_durations(apps, schema_editor):
+    TravelOption = apps.get_model('booking', 'TravelOption')
+
+    # Walk the table by pk so each batch is one indexed range read and one bulk UPDATE
+    last_pk = 0
+    while True:
+        batch = list(
+            TravelOption.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'departure_date_time', 'arrival_date_time')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for option in batch:
+            seconds = (option.arrival_date_time - option.departure_date_time).total_seconds()
+            option.duration_minutes = max(0, int(seconds // 60))
+        TravelOption.objects.bulk_update(batch, ['duration_minutes'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_keyset_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='traveloption',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_durations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+NAME_LENGTH = 100
+
+
+def backfill_passengers(apps, schema_editor):
+    Booking = apps.get_model('booking', 'Booking')
+    Passenger = apps.get_model('booking', 'Passenger')
+
+    # Walk bookings by pk and write each batch's passengers in one bulk INSERT
+    last_pk = 0
+    while True:
+        batch = list(
+            Booking.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'passenger_names')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        passengers = []
+        for booking_id, text in batch:
+            names = [' '.join(name.split()) for name in text.split(',') if name.strip()]
+            for position, name in enumerate(names):
+                passengers.append(Passenger(
+                    booking_id=booking_id,
+                    position=position,
+                    name=name[:NAME_LENGTH],
+                    normalized_name=name.casefold()[:NAME_LENGTH],
+                ))
+        Passenger.objects.bulk_create(passengers)
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_booking_seat_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Passenger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('name', models.CharField(max_length=100)),
+                ('normalized_name', models.CharField(editable=False, max_length=100)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='passengers', to='booking.booking')),
+            ],
+            options={
+                'ordering': ['booking', 'position'],
+                'indexes': [models.Index(fields=['normalized_name', 'booking'], name='passenger_name_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='passenger',
+            constraint=models.UniqueConstraint(fields=('booking', 'position'), name='unique_passenger_position'),
+        ),
+        migrations.RunPython(backfill_passengers, migrations.RunPython.noop),
+    ]
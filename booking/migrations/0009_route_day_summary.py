@@ -0,0 +1,70 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+
+ROUTE_BATCH_SIZE = 500
+
+
+def populate_summary(apps, schema_editor):
+    Route = apps.get_model('booking', 'Route')
+    RouteDaySummary = apps.get_model('booking', 'RouteDaySummary')
+    TravelOption = apps.get_model('booking', 'TravelOption')
+
+    # One grouped aggregate per batch of routes
+    route_ids = list(Route.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(route_ids), ROUTE_BATCH_SIZE):
+        batch = route_ids[start:start + ROUTE_BATCH_SIZE]
+        rows = (
+            TravelOption.objects.filter(route_id__gte=batch[0], route_id__lte=batch[-1])
+            .annotate(date=TruncDate('departure_date_time'))
+            .order_by()
+            .values('route_id', 'type', 'date')
+            .annotate(
+                options=Count('id'),
+                seats=Sum('available_seats'),
+                cheapest=Min('price'),
+            )
+        )
+        RouteDaySummary.objects.bulk_create([
+            RouteDaySummary(
+                route_id=row['route_id'], type=row['type'], date=row['date'],
+                option_count=row['options'], available_seats=row['seats'], min_price=row['cheapest'],
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_passengers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteDaySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('FLIGHT', 'Flight'), ('TRAIN', 'Train'), ('BUS', 'Bus')], max_length=10)),
+                ('date', models.DateField()),
+                ('option_count', models.PositiveIntegerField(default=0)),
+                ('available_seats', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_summaries', to='booking.route')),
+            ],
+            options={
+                'verbose_name_plural': 'route day summaries',
+                'ordering': ['date', 'route', 'type'],
+                'indexes': [models.Index(fields=['date', 'type'], name='route_summary_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='routedaysummary',
+            constraint=models.UniqueConstraint(fields=('route', 'type', 'date'), name='unique_route_day_summary'),
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from .booking_ids import new_booking_id
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -14,6 +15,38 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+class City(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'cities'
+    
+    def __str__(self):
+        return self.name
+
+class Route(models.Model):
+    source = models.ForeignKey(City, on_delete=models.PROTECT, related_name='departing_routes')
+    destination = models.ForeignKey(City, on_delete=models.PROTECT, related_name='arriving_routes')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'destination'], name='unique_route'),
+        ]
+    
+    def __str__(self):
+        return f"{self.source} → {self.destination}"
+    
+    @classmethod
+    def for_cities(cls, source, destination):
+        source_city, _ = City.objects.get_or_create(name=source)
+        destination_city, _ = City.objects.get_or_create(name=destination)
+        route, _ = cls.objects.get_or_create(source=source_city, destination=destination_city)
+        return route
+
+def travel_minutes(departure, arrival):
+    return max(0, int((arrival - departure).total_seconds() // 60))
+
 class TravelOption(models.Model):
     TRAVEL_TYPES = [
         ('FLIGHT', 'Flight'),
@@ -31,25 +64,106 @@ class TravelOption(models.Model):
     available_seats = models.PositiveIntegerField()
     total_seats = models.PositiveIntegerField()
     operator = models.CharField(max_length=100, default='Default Operator')
+    route = models.ForeignKey(Route, on_delete=models.PROTECT, null=True, blank=True, related_name='options')
+    # Stored so list pages don't recompute timedeltas per card
+    duration_minutes = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['departure_date_time']
+        # Every search filters on upcoming options with seats left, so the
+        # composite indexes are partial on that predicate and end in id to
+        # match the (sort key, pk) keyset ordering. Trigram indexes for
+        # icontains city lookups are PostgreSQL-only and live in migration 0002.
+        indexes = [
+            models.Index(fields=['departure_date_time', 'id'], condition=models.Q(available_seats__gt=0), name='travel_upcoming_idx'),
+            models.Index(fields=['type', 'departure_date_time', 'id'], condition=models.Q(available_seats__gt=0), name='travel_type_departure_idx'),
+            models.Index(fields=['price', 'id'], condition=models.Q(available_seats__gt=0), name='travel_price_idx'),
+            models.Index(fields=['type', 'price', 'id'], condition=models.Q(available_seats__gt=0), name='travel_type_price_idx'),
+            models.Index(fields=['source', 'destination', 'departure_date_time'], name='travel_route_idx'),
+        ]
     
     def __str__(self):
         return f"{self.travel_id} - {self.type} from {self.source} to {self.destination}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_cities = (instance.__dict__.get('source'), instance.__dict__.get('destination'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the normalized route in step with the free-text city columns
+        if self.route_id is None or getattr(self, '_loaded_cities', None) != (self.source, self.destination):
+            self.route = Route.for_cities(self.source, self.destination)
+            self._loaded_cities = (self.source, self.destination)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'route'}
+        self.duration_minutes = travel_minutes(self.departure_date_time, self.arrival_date_time)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'duration_minutes'}
+        super().save(*args, **kwargs)
+    
     @property
     def is_available(self):
         return self.available_seats > 0 and self.departure_date_time > timezone.now()
     
     @property
     def duration(self):
-        delta = self.arrival_date_time - self.departure_date_time
-        hours = delta.total_seconds() // 3600
-        minutes = (delta.total_seconds() % 3600) // 60
-        return f"{int(hours)}h {int(minutes)}m"
+        hours, minutes = divmod(self.duration_minutes, 60)
+        return f"{hours}h {minutes}m"
+
+class CatalogVersion(models.Model):
+    # A single row advanced by every catalog write, in the writer's
+    # transaction, so each worker's in-memory route index can tell when
+    # another process has changed options it holds
+    version = models.PositiveBigIntegerField(default=0)
+    
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+    
+    @classmethod
+    def bump(cls):
+        """Advance the version and return the new value."""
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(pk=1)
+            cls.objects.filter(pk=1).update(version=models.F('version') + 1)
+        return cls.current()
+
+class RouteDaySummary(models.Model):
+    # One row per (route, type, departure date), kept current by
+    # booking.route_summary so reports read O(routes) rows, not every option
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='day_summaries')
+    type = models.CharField(max_length=10, choices=TravelOption.TRAVEL_TYPES)
+    date = models.DateField()
+    option_count = models.PositiveIntegerField(default=0)
+    available_seats = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date', 'route', 'type']
+        verbose_name_plural = 'route day summaries'
+        constraints = [
+            models.UniqueConstraint(fields=['route', 'type', 'date'], name='unique_route_day_summary'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'type'], name='route_summary_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.route} {self.type} on {self.date}"
+
+PASSENGER_NAME_LENGTH = 100
+
+def split_passenger_names(text):
+    return [' '.join(name.split()) for name in text.split(',') if name.strip()]
+
+def normalize_passenger_name(name):
+    # Case- and whitespace-insensitive form used for passenger lookups
+    return ' '.join(name.split()).casefold()
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -68,24 +182,84 @@ class Booking(models.Model):
     passenger_names = models.TextField(help_text="Comma-separated passenger names")
     contact_email = models.EmailField()
     contact_phone = models.CharField(max_length=15)
+    # Set while PENDING: the held seats return to inventory after this time
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-booking_date']
+        indexes = [
+            models.Index(fields=['hold_expires_at', 'id'], condition=models.Q(status='PENDING'), name='booking_hold_expiry_idx'),
+        ]
     
     def __str__(self):
         return f"Booking {self.booking_id} by {self.user.username}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_passenger_names = instance.__dict__.get('passenger_names')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.booking_id:
-            import random
-            import string
-            self.booking_id = 'BK' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+            self.booking_id = new_booking_id()
         
         if not self.total_price:
             self.total_price = self.travel_option.price * self.number_of_seats
         
-        super().save(*args, **kwargs)
+        # Keep the Passenger rows in step with the comma-separated text
+        update_fields = kwargs.get('update_fields')
+        adding = self._state.adding
+        if 'passenger_names' not in self.__dict__ or (update_fields is not None and 'passenger_names' not in update_fields):
+            changed = False
+        else:
+            changed = adding or self.passenger_names != getattr(self, '_loaded_passenger_names', None)
+        if not changed:
+            super().save(*args, **kwargs)
+            return
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not adding:
+                self.passengers.all().delete()
+            Passenger.objects.bulk_create(self.build_passengers())
+        self._loaded_passenger_names = self.passenger_names
+    
+    @classmethod
+    def for_passenger(cls, name):
+        matches = Passenger.objects.filter(normalized_name=normalize_passenger_name(name)[:PASSENGER_NAME_LENGTH])
+        return cls.objects.filter(pk__in=matches.values('booking_id'))
+    
+    def build_passengers(self):
+        return [
+            Passenger(booking=self, position=position, name=name[:PASSENGER_NAME_LENGTH],
+                      normalized_name=normalize_passenger_name(name)[:PASSENGER_NAME_LENGTH])
+            for position, name in enumerate(split_passenger_names(self.passenger_names))
+        ]
     
     @property
     def is_cancellable(self):
-        return self.status == 'CONFIRMED' and self.travel_option.departure_date_time > timezone.now()
\ No newline at end of file
+        return self.status in ('CONFIRMED', 'PENDING') and self.travel_option.departure_date_time > timezone.now()
+    
+    @property
+    def is_held(self):
+        return self.status == 'PENDING' and self.hold_expires_at is not None and self.hold_expires_at > timezone.now()
+
+class Passenger(models.Model):
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='passengers')
+    position = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=PASSENGER_NAME_LENGTH)
+    normalized_name = models.CharField(max_length=PASSENGER_NAME_LENGTH, editable=False)
+    
+    class Meta:
+        ordering = ['booking', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'position'], name='unique_passenger_position'),
+        ]
+        # Finding every booking for a passenger reads only this index
+        indexes = [
+            models.Index(fields=['normalized_name', 'booking'], name='passenger_name_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name
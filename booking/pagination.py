@@ -0,0 +1,111 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the (sort key, pk) of their boundary rows instead of
+an OFFSET, so page N costs the same as page 1 and no COUNT is needed to
+navigate. Cursor tokens are signed so clients cannot forge arbitrary
+filters into them.
+"""
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+CURSOR_SALT = 'booking.pagination.cursor'
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, ordering, per_page, fields=None):
+        # ordering is (sort field, 'pk') with a shared direction, e.g. ('-price', '-pk').
+        # Pass the values_list() field names as ``fields`` when paging tuples.
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.descending = self.ordering[0].startswith('-')
+        self.key = self.ordering[0].lstrip('-')
+        self.field = queryset.model._meta.get_field(self.key)
+        self.positions = {name: i for i, name in enumerate(fields)} if fields else None
+
+    def _row_value(self, row, name):
+        if self.positions is None:
+            return getattr(row, name)
+        return row[self.positions['id' if name == 'pk' else name]]
+
+    def _encode(self, row, direction):
+        value = self._row_value(row, self.key)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        return signing.dumps([direction, value, self._row_value(row, 'pk')], salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, token):
+        try:
+            direction, value, pk = signing.loads(token, salt=CURSOR_SALT)
+            return direction, self.field.to_python(value), int(pk)
+        except (signing.BadSignature, ValidationError, ValueError, TypeError):
+            return None
+
+    def _after(self, value, pk, forward):
+        # Rows strictly after (value, pk) in the walking direction
+        greater = forward != self.descending
+        op = 'gt' if greater else 'lt'
+        return Q(**{f'{self.key}__{op}': value}) | Q(**{self.key: value, f'pk__{op}': pk})
+
+    def _reversed(self):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def _page_query(self, token):
+        cursor = self._decode(token) if token else None
+        direction = cursor[0] if cursor else 'next'
+
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._after(cursor[1], cursor[2], direction == 'next'))
+        ordering = self.ordering if direction == 'next' else self._reversed()
+        return cursor, direction, queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def _build_page(self, rows, cursor, direction):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage([])
+
+        has_next = more if direction == 'next' else True
+        has_previous = cursor is not None if direction == 'next' else more
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(rows[-1], 'next') if has_next else None,
+            previous_cursor=self._encode(rows[0], 'prev') if has_previous else None,
+        )
+
+    def get_page(self, token=None):
+        cursor, direction, queryset = self._page_query(token)
+        return self._build_page(list(queryset), cursor, direction)
+
+    async def aget_page(self, token=None):
+        cursor, direction, queryset = self._page_query(token)
+        return self._build_page([row async for row in queryset], cursor, direction)
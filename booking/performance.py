@@ -0,0 +1,195 @@
+"""
+Request-level performance instrumentation.
+
+PerformanceMiddleware times each sampled request and records, per URL name,
+the wall time, query count, total SQL time and slowest query. Queries are
+timed by an execute wrapper installed on every database connection that only
+records while a sampled request is in flight. The request's metrics live in
+a context variable, so queries that async views run in sync_to_async threads
+are counted too. Sampled responses carry a Server-Timing header, and the
+in-process percentiles are served to staff at ``staff/performance/``.
+
+Queries run while a streaming response is being consumed are not counted.
+"""
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,
+    'WINDOW': 1000,
+    'SERVER_TIMING': True,
+}
+
+MAX_SQL_LENGTH = 500
+
+_current = ContextVar('booking_request_metrics', default=None)
+
+
+def performance_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'PERFORMANCE_MONITOR', {})}
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql_time', 'slowest_time', 'slowest_sql')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+
+    def record(self, sql, duration):
+        self.queries += 1
+        self.sql_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_sql = sql
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record(sql, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # First in the list so connection.execute_wrapper() blocks, which pop
+    # the last wrapper on exit, never remove it
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class PerformanceStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, wall, metrics):
+        window = performance_config()['WINDOW']
+        with self._lock:
+            view = self._views.get(view_name)
+            if view is None:
+                view = self._views[view_name] = {
+                    'count': 0,
+                    'wall': deque(maxlen=window),
+                    'sql': deque(maxlen=window),
+                    'queries': deque(maxlen=window),
+                    'slowest_query': None,
+                }
+            view['count'] += 1
+            view['wall'].append(wall)
+            view['sql'].append(metrics.sql_time)
+            view['queries'].append(metrics.queries)
+            slowest = view['slowest_query']
+            if metrics.slowest_sql is not None and (slowest is None or metrics.slowest_time > slowest[0]):
+                view['slowest_query'] = (metrics.slowest_time, metrics.slowest_sql[:MAX_SQL_LENGTH])
+
+    def snapshot(self):
+        with self._lock:
+            views = {
+                name: (view['count'], sorted(view['wall']), sorted(view['sql']), list(view['queries']), view['slowest_query'])
+                for name, view in self._views.items()
+            }
+
+        result = {}
+        for name, (count, wall, sql, queries, slowest) in sorted(views.items()):
+            result[name] = {
+                'requests': count,
+                'window': len(wall),
+                'wall_ms': {f'p{p}': round(percentile(wall, p / 100) * 1000, 2) for p in (50, 95, 99)},
+                'sql_ms': {f'p{p}': round(percentile(sql, p / 100) * 1000, 2) for p in (50, 95, 99)},
+                'queries': {'mean': round(sum(queries) / len(queries), 2), 'max': max(queries)},
+                'slowest_query': {'ms': round(slowest[0] * 1000, 2), 'sql': slowest[1]} if slowest else None,
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+performance_stats = PerformanceStats()
+
+
+def server_timing(wall, metrics):
+    sql = metrics.sql_time * 1000
+    total = wall * 1000
+    return (
+        f'db;dur={sql:.1f};desc="{metrics.queries} queries", '
+        f'app;dur={max(total - sql, 0):.1f}, '
+        f'total;dur={total:.1f}'
+    )
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _start(self):
+        config = performance_config()
+        if not config['ENABLED'] or random.random() >= config['SAMPLE_RATE']:
+            return None
+        metrics = RequestMetrics()
+        return config, metrics, _current.set(metrics), time.perf_counter()
+
+    def _finish(self, request, response, state):
+        config, metrics, token, started = state
+        wall = time.perf_counter() - started
+        _current.reset(token)
+
+        match = request.resolver_match
+        performance_stats.record(match.view_name if match else 'unresolved', wall, metrics)
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(wall, metrics)
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = self._start()
+        if state is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _current.reset(state[2])
+            raise
+        return self._finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self._start()
+        if state is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _current.reset(state[2])
+            raise
+        return self._finish(request, response, state)
@@ -0,0 +1,212 @@
+"""
+Token-bucket rate limiting per URL name.
+
+RateLimitMiddleware looks up the resolved URL name in
+``booking.urls.RATE_LIMITS``, which ``settings.RATE_LIMIT['RATES']`` can
+override. It takes one token from each of the caller's buckets before the
+view runs. A bucket holds ``burst`` tokens and refills at ``rate``. An
+empty bucket answers 429 with a Retry-After header. Signed-in callers are
+keyed by the user id in their session, everyone else by client IP. A limit
+with ``'by': 'ip'`` is always keyed by client IP, so checking it never reads
+the session. A limit with a ``field`` is keyed by that POST field as well,
+so one address gets its own, smaller allowance of guesses at each username
+without anyone else being able to use it up. Limits are taken in order and
+the first empty bucket refuses the request, so a throttled login,
+registration or booking is refused before any ORM query or password hash.
+
+Buckets live in process memory by default (LocalBuckets). CacheBuckets
+keeps them in a Django cache alias that every worker shares. Its
+read-modify-write is not atomic, so simultaneous requests for one key can
+occasionally let an extra request through.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core import checks
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    'BACKEND': 'booking.ratelimit.LocalBuckets',
+    'OPTIONS': {},
+    'RATES': {},
+    # e.g. 'HTTP_X_FORWARDED_FOR' behind a proxy; the right-most address is used
+    'IP_HEADER': None,
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/m' -> (tokens per second, default burst)."""
+    count, _, period = rate.partition('/')
+    return int(count) / PERIODS[period], int(count)
+
+
+def take(state, now, per_second, burst):
+    """
+    Take one token from a bucket ``state`` of (tokens, updated at). Returns
+    the new state and the seconds until a token is free, 0 if one was taken.
+    """
+    tokens, updated = state if state is not None else (burst, now)
+    tokens = min(burst, tokens + (now - updated) * per_second)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / per_second
+
+
+class LocalBuckets:
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, per_second, burst):
+        now = self.clock()
+        with self._lock:
+            state, wait = take(self._buckets.get(key), now, per_second, burst)
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Buckets on a Django cache alias (e.g. Redis), shared by every worker."""
+    clock = staticmethod(time.time)
+
+    def __init__(self, alias='default', key_prefix='ratelimit:'):
+        self.cache = caches[alias]
+        self.key_prefix = key_prefix
+
+    def hit(self, key, per_second, burst):
+        key = self.key_prefix + key
+        state, wait = take(self.cache.get(key), self.clock(), per_second, burst)
+        # A bucket left alone until it is full again is the same as no bucket
+        self.cache.set(key, state, math.ceil(burst / per_second) + 1)
+        return wait
+
+    def clear(self):
+        pass
+
+
+class RateLimiter:
+    def __init__(self):
+        self._backend = None
+        self._backend_config = None
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return {**DEFAULT_SETTINGS, **getattr(settings, 'RATE_LIMIT', {})}
+
+    @property
+    def backend(self):
+        config = self.config
+        backend_config = (config['BACKEND'], config['OPTIONS'])
+        with self._lock:
+            if self._backend is None or self._backend_config != backend_config:
+                self._backend = import_string(config['BACKEND'])(**config['OPTIONS'])
+                self._backend_config = backend_config
+            return self._backend
+
+    def limits(self):
+        from .urls import RATE_LIMITS
+        return {**RATE_LIMITS, **self.config['RATES']}
+
+    def bucket_keys(self, request, url_name):
+        """
+        Yield (bucket key, limit) for each limit on ``url_name`` this request
+        counts against, in order. Keys are worked out as they are yielded.
+        """
+        limits = self.limits().get(url_name) or ()
+        # One limit, or a list of them
+        for limit in [limits] if isinstance(limits, dict) else limits:
+            if request.method not in limit.get('methods', (request.method,)):
+                continue
+            field = limit.get('field')
+            if field is None:
+                yield f'{url_name}:{self.client_key(request, limit.get("by"))}', limit
+                continue
+            value = request.POST.get(field, '').strip().casefold()
+            if value:
+                digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+                yield f'{url_name}:{self.client_key(request, limit.get("by"))}:{field}:{digest}', limit
+
+    def client_key(self, request, by=None):
+        if by != 'ip':
+            user_id = request.session.get(SESSION_KEY) if hasattr(request, 'session') else None
+            if user_id is not None:
+                return f'user:{user_id}'
+        header = self.config['IP_HEADER']
+        forwarded = request.META.get(header, '') if header else ''
+        return 'ip:' + (forwarded.split(',')[-1].strip() or request.META.get('REMOTE_ADDR', ''))
+
+    def check(self, request, url_name):
+        """Take a token for this request; returns 0, or the seconds to wait."""
+        if not self.config['ENABLED'] or url_name is None:
+            return 0
+        for key, limit in self.bucket_keys(request, url_name):
+            per_second, burst = parse_rate(limit['rate'])
+            wait = self.backend.hit(key, per_second, limit.get('burst', burst))
+            if wait:
+                # The later buckets, and any session read their keys need, are skipped
+                return wait
+        return 0
+
+    def clear(self):
+        self.backend.clear()
+
+
+rate_limiter = RateLimiter()
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def check_ip_header(app_configs, **kwargs):
+    config = rate_limiter.config
+    if config['ENABLED'] and not config['IP_HEADER']:
+        return [checks.Warning(
+            'Rate limiting keys anonymous clients on REMOTE_ADDR.',
+            hint=(
+                'Behind a proxy every client shares the proxy\'s address; set '
+                'RATE_LIMIT_IP_HEADER to the header the proxy appends the client to.'
+            ),
+            id='booking.W001',
+        )]
+    return []
+
+
+def too_many_requests(url_name, wait):
+    retry_after = max(1, math.ceil(wait))
+    message = f'Too many requests. Try again in {retry_after} seconds.'
+    if url_name.startswith('api_'):
+        response = JsonResponse({'errors': {'__all__': [message]}}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        wait = rate_limiter.check(request, url_name)
+        if wait:
+            return too_many_requests(url_name, wait)
+        return None
@@ -0,0 +1,188 @@
+"""
+Process-local index of upcoming departures per (source, destination, type).
+
+Each key maps to parallel arrays of departure times and option ids sorted by
+departure, so a route/date-window lookup is a dictionary hit plus two bisects
+and never touches the free-text city columns. The index is rebuilt from the
+normalized Route/City tables every ``ROUTE_INDEX_TTL`` seconds, in the
+background (booking.index_rebuild), and kept current in between by the
+TravelOption save/delete signals.
+
+Those signals only reach the worker that made the change. Every catalog
+write also advances the shared CatalogVersion row, and an index that is
+behind it gives no candidates, so searches filter the table until a
+rebuild catches up.
+"""
+import bisect
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .index_rebuild import BackgroundRebuildMixin
+from .models import CatalogVersion, Route, TravelOption
+
+MAX_CANDIDATES = 2000
+
+
+class RouteIndex(BackgroundRebuildMixin):
+    def __init__(self):
+        super().__init__()
+        self._routes = {}    # source -> destination -> type -> (departures, ids)
+        self._entries = {}   # option id -> (source, destination, type, departure)
+        self._version = None
+        self.complete = False
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ROUTE_INDEX_TTL', 300)
+
+    def load(self):
+        # Read the version first: a write after it leaves the index behind
+        version = CatalogVersion.current()
+        now = timezone.now()
+        cities = {
+            route_id: (source, destination)
+            for route_id, source, destination in Route.objects.values_list('id', 'source__name', 'destination__name')
+        }
+        rows = (
+            TravelOption.objects
+            .filter(departure_date_time__gte=now)
+            .order_by('departure_date_time', 'pk')
+            .values_list('pk', 'route_id', 'type', 'departure_date_time')
+        )
+
+        routes = {}
+        entries = {}
+        complete = True
+        for pk, route_id, travel_type, departure in rows.iterator(chunk_size=5000):
+            if route_id is None:
+                # Rows written without a route cannot be resolved from the index
+                complete = False
+                continue
+            source, destination = cities[route_id]
+            departures, ids = (
+                routes.setdefault(source, {})
+                .setdefault(destination, {})
+                .setdefault(travel_type, ([], []))
+            )
+            departures.append(departure)
+            ids.append(pk)
+            entries[pk] = (source, destination, travel_type, departure)
+        return routes, entries, complete, version
+
+    def install(self, state):
+        self._routes, self._entries, self.complete, self._version = state
+
+    def _caught_up(self, version):
+        # The change that moved the catalog to ``version`` is applied here;
+        # the index is current again only if it was current before it
+        if version is not None and self._version == version - 1:
+            self._version = version
+
+    def add(self, option, version=None):
+        with self._lock:
+            if self._journaled(self.add, option, version):
+                return
+            self._discard(option.pk)
+            self._caught_up(version)
+            if option.route_id is None:
+                self.complete = False
+                return
+            key = (option.source, option.destination, option.type)
+            departures, ids = (
+                self._routes.setdefault(option.source, {})
+                .setdefault(option.destination, {})
+                .setdefault(option.type, ([], []))
+            )
+            position = bisect.bisect_right(departures, option.departure_date_time)
+            departures.insert(position, option.departure_date_time)
+            ids.insert(position, option.pk)
+            self._entries[option.pk] = key + (option.departure_date_time,)
+
+    def discard(self, pk, version=None):
+        with self._lock:
+            if not self._journaled(self.discard, pk, version):
+                self._discard(pk)
+                self._caught_up(version)
+
+    def _discard(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        source, destination, travel_type, departure = entry
+        departures, ids = self._routes[source][destination][travel_type]
+        position = bisect.bisect_left(departures, departure)
+        while position < len(ids) and ids[position] != pk:
+            position += 1
+        if position < len(ids):
+            del departures[position]
+            del ids[position]
+
+    def _match(self, names, term, exact):
+        if term is None:
+            return list(names)
+        term = term.strip().casefold()
+        if exact:
+            return [name for name in names if name.casefold() == term]
+        return [name for name in names if term in name.casefold()]
+
+    def pairs(self, source=None, destination=None):
+        """
+        Return the (source, destination) city names with upcoming departures
+        whose names contain the terms, or None when the index cannot answer
+        authoritatively.
+        """
+        self.ensure_fresh()
+        version = CatalogVersion.current()
+        with self._lock:
+            if version != self._version or not self.complete:
+                return None
+            return [
+                (source_name, destination_name)
+                for source_name in self._match(self._routes, source, False)
+                for destination_name in self._match(self._routes[source_name], destination, False)
+            ]
+
+    def candidates(self, source=None, destination=None, travel_type=None,
+                   start=None, end=None, exact=False, limit=MAX_CANDIDATES):
+        """
+        Return option ids departing in [start, end) ordered by departure.
+
+        City terms match case-insensitively, by substring unless ``exact``.
+        Returns None when the index cannot answer authoritatively (rows without
+        a route, or catalog changes it has not seen) or the match is too broad
+        to be worth an IN list, so callers fall back to filtering the table.
+        """
+        self.ensure_fresh()
+        start = max(start or timezone.now(), timezone.now())
+        version = CatalogVersion.current()
+
+        with self._lock:
+            if version != self._version:
+                transaction.on_commit(self.schedule_rebuild)
+                return None
+            if not self.complete:
+                return None
+            slices = []
+            for source_name in self._match(self._routes, source, exact):
+                by_destination = self._routes[source_name]
+                for destination_name in self._match(by_destination, destination, exact):
+                    by_type = by_destination[destination_name]
+                    types = [travel_type] if travel_type else list(by_type)
+                    for name in types:
+                        if name not in by_type:
+                            continue
+                        departures, ids = by_type[name]
+                        lo = bisect.bisect_left(departures, start)
+                        hi = bisect.bisect_left(departures, end) if end else len(departures)
+                        if lo < hi:
+                            slices.append(list(zip(departures[lo:hi], ids[lo:hi])))
+
+            if sum(len(chunk) for chunk in slices) > limit:
+                return None
+        return [pk for _, pk in heapq.merge(*slices)]
+
+
+route_index = RouteIndex()
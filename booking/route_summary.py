@@ -0,0 +1,134 @@
+"""
+Per-(route, type, departure date) availability summary.
+
+RouteDaySummary holds the option count, seats left and cheapest fare for
+each group. A single booking or cancellation applies its seat delta to the
+option's row with one UPDATE (seats_changed), which commutes with
+concurrent deltas and needs no lock. Catalog saves and deletes
+(booking.signals), batch bookings and swept holds recompute the affected
+groups instead (refresh_groups). Bulk loads skip both paths, so
+``populate_data`` finishes with ``rebuild_route_summary``, which
+recomputes the whole table.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Route, RouteDaySummary, TravelOption
+
+REBUILD_BATCH_SIZE = 500
+SUMMARY_FIELDS = ['option_count', 'available_seats', 'min_price', 'updated_at']
+
+
+def _grouped(options):
+    return (
+        options.annotate(date=TruncDate('departure_date_time'))
+        .order_by()
+        .values('route_id', 'type', 'date')
+        .annotate(
+            options=Count('id'),
+            seats=Sum('available_seats'),
+            cheapest=Min('price'),
+        )
+    )
+
+
+def _summary(row):
+    return RouteDaySummary(
+        route_id=row['route_id'], type=row['type'], date=row['date'],
+        option_count=row['options'], available_seats=row['seats'], min_price=row['cheapest'],
+    )
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def summary_keys(option_ids):
+    return set(
+        TravelOption.objects.filter(pk__in=option_ids, route__isnull=False)
+        .annotate(date=TruncDate('departure_date_time'))
+        .values_list('route_id', 'type', 'date')
+    )
+
+
+def option_key(option):
+    if option.route_id is None:
+        return None
+    return option.route_id, option.type, timezone.localdate(option.departure_date_time)
+
+
+def seats_changed(option_id, delta):
+    """Add ``delta`` seats to the summary row of the option's group."""
+    option = TravelOption.objects.filter(pk=option_id)
+    RouteDaySummary.objects.filter(
+        route_id=Subquery(option.values('route_id')),
+        type=Subquery(option.values('type')),
+        date=Subquery(option.annotate(date=TruncDate('departure_date_time')).values('date')),
+    ).update(available_seats=F('available_seats') + delta, updated_at=timezone.now())
+
+
+def refresh_groups(keys):
+    """Recompute the summary rows for ``keys`` of (route_id, type, date)."""
+    keys = {key for key in keys if key is not None}
+    if not keys:
+        return
+    route_ids = {route_id for route_id, _, _ in keys}
+    types = {travel_type for _, travel_type, _ in keys}
+    dates = {day for _, _, day in keys}
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            # Queue behind other refreshes of these groups so the aggregate
+            # below sees their committed seat changes. SQLite serializes
+            # writers on its own.
+            list(
+                RouteDaySummary.objects.select_for_update()
+                .filter(route_id__in=route_ids, type__in=types, date__in=dates)
+                .values_list('pk', flat=True)
+            )
+        rows = _grouped(TravelOption.objects.filter(
+            route_id__in=route_ids,
+            type__in=types,
+            departure_date_time__gte=_day_start(min(dates)),
+            departure_date_time__lt=_day_start(max(dates) + timedelta(days=1)),
+        ))
+        summaries = [
+            _summary(row) for row in rows
+            if (row['route_id'], row['type'], row['date']) in keys
+        ]
+        RouteDaySummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['route', 'type', 'date'],
+            update_fields=SUMMARY_FIELDS,
+        )
+
+        # Groups whose last option was deleted or moved away
+        emptied = keys - {(s.route_id, s.type, s.date) for s in summaries}
+        if emptied:
+            condition = Q()
+            for route_id, travel_type, day in emptied:
+                condition |= Q(route_id=route_id, type=travel_type, date=day)
+            RouteDaySummary.objects.filter(condition).delete()
+
+
+def refresh_options(option_ids):
+    refresh_groups(summary_keys(option_ids))
+
+
+def rebuild_route_summary(batch_size=REBUILD_BATCH_SIZE):
+    """Recompute every summary row, ``batch_size`` routes per aggregate. Returns the row count."""
+    created = 0
+    with transaction.atomic():
+        RouteDaySummary.objects.all().delete()
+        route_ids = list(Route.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(route_ids), batch_size):
+            batch = route_ids[start:start + batch_size]
+            rows = _grouped(TravelOption.objects.filter(route_id__gte=batch[0], route_id__lte=batch[-1]))
+            summaries = RouteDaySummary.objects.bulk_create([_summary(row) for row in rows], batch_size=1000)
+            created += len(summaries)
+    return created
@@ -0,0 +1,187 @@
+import hashlib
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import TravelOption
+from .route_index import route_index
+from .search_cache import search_cache
+
+# Every ordering ends in pk so keyset pagination has a unique, stable key
+DEFAULT_ORDERING = ['departure_date_time', 'pk']
+SORT_ORDERING = {
+    'price_low': ['price', 'pk'],
+    'price_high': ['-price', '-pk'],
+    'departure': ['departure_date_time', 'pk'],
+}
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def upcoming_options():
+    return TravelOption.objects.filter(
+        departure_date_time__gte=timezone.now(),
+        available_seats__gt=0
+    )
+
+
+def search_ordering(cleaned_data=None):
+    return SORT_ORDERING.get((cleaned_data or {}).get('sort_by'), DEFAULT_ORDERING)
+
+
+def normalize_search(cleaned_data=None):
+    """Canonical, hashable form of the search filters (empty values dropped)."""
+    normalized = []
+    for name, value in sorted((cleaned_data or {}).items()):
+        if value in (None, ''):
+            continue
+        if isinstance(value, str):
+            value = ' '.join(value.split()).casefold()
+        normalized.append((name, str(value)))
+    return tuple(normalized)
+
+
+def search_key(prefix, cleaned_data=None, exclude=()):
+    normalized = [item for item in normalize_search(cleaned_data) if item[0] not in exclude]
+    digest = hashlib.sha1(repr(normalized).encode()).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def _count_key(cleaned_data):
+    # Sort order does not change the count, so all orderings share one entry
+    return search_key('search-count', cleaned_data, exclude=('sort_by',))
+
+
+def cached_search_count(options, cleaned_data=None):
+    key = _count_key(cleaned_data)
+    count = cache.get(key)
+    if count is None:
+        count = options.order_by().count()
+        cache.set(key, count, getattr(settings, 'SEARCH_COUNT_TTL', 60))
+    return count
+
+
+async def acached_search_count(options, cleaned_data=None):
+    key = _count_key(cleaned_data)
+    count = await cache.aget(key)
+    if count is None:
+        count = await options.order_by().acount()
+        await cache.aset(key, count, getattr(settings, 'SEARCH_COUNT_TTL', 60))
+    return count
+
+
+def search_travel_options(cleaned_data=None):
+    options = upcoming_options()
+    if not cleaned_data:
+        return options.order_by(*DEFAULT_ORDERING)
+
+    # Compare against day boundaries rather than departure_date_time__date so
+    # the column stays bare and the departure indexes remain usable.
+    start = end = None
+    if cleaned_data.get('date_from'):
+        start = _start_of_day(cleaned_data['date_from'])
+        options = options.filter(departure_date_time__gte=start)
+
+    if cleaned_data.get('date_to'):
+        end = _start_of_day(cleaned_data['date_to'] + timedelta(days=1))
+        options = options.filter(departure_date_time__lt=end)
+
+    if cleaned_data.get('type'):
+        options = options.filter(type=cleaned_data['type'])
+
+    source = cleaned_data.get('source')
+    destination = cleaned_data.get('destination')
+    if source or destination:
+        candidates = route_index.candidates(
+            source=source or None,
+            destination=destination or None,
+            travel_type=cleaned_data.get('type') or None,
+            start=start,
+            end=end,
+        )
+        if candidates is not None:
+            options = options.filter(pk__in=candidates)
+        else:
+            if source:
+                options = options.filter(source__icontains=source)
+            if destination:
+                options = options.filter(destination__icontains=destination)
+
+    if cleaned_data.get('max_price'):
+        options = options.filter(price__lte=cleaned_data['max_price'])
+
+    return options.order_by(*search_ordering(cleaned_data))
+
+
+def _cache_results(key, cleaned_data, rows, stamp):
+    ids = [pk for pk, _ in rows]
+    valid_until = min((departure for _, departure in rows), default=None)
+    search_cache.set(key, normalize_search(cleaned_data), ids, valid_until, stamp)
+    return ids
+
+
+def _cache_too_broad(key, cleaned_data):
+    # No ids: later requests skip the probe and query the filters directly
+    search_cache.set(key, normalize_search(cleaned_data), None)
+
+
+def _cached_options(cleaned_data, ids):
+    return upcoming_options().filter(pk__in=ids).order_by(*search_ordering(cleaned_data))
+
+
+def cached_search(cleaned_data=None):
+    """
+    Return ``(options, total_count)`` for a search, serving the matching ids
+    from the search cache when possible.
+
+    The returned queryset always re-applies the upcoming/seats-left filter, so
+    an option that sold out or departed since the entry was cached drops out
+    even before the entry is invalidated. A search matching more than
+    MAX_IDS options is cached as too broad and then runs against the table.
+    """
+    key = search_key('search-results', cleaned_data)
+    entry = search_cache.get(key)
+    if entry is None:
+        stamp = search_cache.stamp(normalize_search(cleaned_data))
+        options = search_travel_options(cleaned_data)
+        max_ids = search_cache.config['MAX_IDS']
+        rows = list(options.values_list('pk', 'departure_date_time')[:max_ids + 1])
+        if len(rows) > max_ids:
+            _cache_too_broad(key, cleaned_data)
+            return options, cached_search_count(options, cleaned_data)
+        ids = _cache_results(key, cleaned_data, rows, stamp)
+    elif entry['ids'] is None:
+        options = search_travel_options(cleaned_data)
+        return options, cached_search_count(options, cleaned_data)
+    else:
+        ids = entry['ids']
+
+    return _cached_options(cleaned_data, ids), len(ids)
+
+
+async def acached_search(cleaned_data=None):
+    """Async counterpart of cached_search for the ASGI views."""
+    key = search_key('search-results', cleaned_data)
+    entry = await sync_to_async(search_cache.get)(key)
+    if entry is None:
+        # The stamp and the queryset may consult (and rebuild) the route index
+        stamp = await sync_to_async(search_cache.stamp)(normalize_search(cleaned_data))
+        options = await sync_to_async(search_travel_options)(cleaned_data)
+        max_ids = search_cache.config['MAX_IDS']
+        rows = [row async for row in options.values_list('pk', 'departure_date_time')[:max_ids + 1]]
+        if len(rows) > max_ids:
+            await sync_to_async(_cache_too_broad)(key, cleaned_data)
+            return options, await acached_search_count(options, cleaned_data)
+        ids = await sync_to_async(_cache_results)(key, cleaned_data, rows, stamp)
+    elif entry['ids'] is None:
+        options = await sync_to_async(search_travel_options)(cleaned_data)
+        return options, await acached_search_count(options, cleaned_data)
+    else:
+        ids = entry['ids']
+
+    return _cached_options(cleaned_data, ids), len(ids)
@@ -0,0 +1,269 @@
+"""
+Cache of search result ids keyed by the normalized TravelSearchForm data.
+
+Entries hold the ordered option ids for one search together with the
+generation tokens it depends on: one per city pair its source and
+destination filters match, or one per travel type (or for everything) when
+the search names no cities or matches too many pairs, plus a token for the
+whole catalog. A seat change bumps the four tokens of its option's pair and
+type once it commits, and a catalog save or delete bumps the catalog token, so invalidation
+costs the same however many entries are cached. A lookup whose tokens have
+moved on is a miss. An entry also expires once the earliest departure in it
+has passed. An entry without ids marks a search too broad to cache; it only
+expires with the TTL. The backing store is pluggable through
+``settings.SEARCH_CACHE``: an in-process LRU, or any Django cache backend
+(Redis, Memcached) through DjangoCacheStore.
+"""
+import hashlib
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TravelOption
+from .route_index import route_index
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'booking.search_cache.LocMemLRUStore',
+    'OPTIONS': {},
+    'TTL': 120,
+    'MAX_IDS': 2000,
+}
+
+# A search matching more city pairs than this depends on its type's token
+MAX_PAIRS = 50
+
+
+def cache_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'SEARCH_CACHE', {})}
+
+
+def token_key(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'search-cache:token:{digest}'
+
+
+class LocMemLRUStore:
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._tokens = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def tokens(self, keys):
+        """Return {key: token}, starting a token for any key that has none."""
+        with self._lock:
+            return {key: self._tokens.setdefault(key, next(self._counter)) for key in keys}
+
+    def bump(self, keys):
+        with self._lock:
+            for key in keys:
+                self._tokens[key] = next(self._counter)
+
+    def items(self):
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tokens.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheStore:
+    """
+    Shared store on a Django cache alias.
+
+    Tokens are random values under their own keys with no timeout. A token
+    the cache has evicted comes back as a new value, so the entries that
+    recorded the old one turn stale rather than wrongly current. The store
+    keeps no list of its entries: clear() leaves them to expire and
+    SearchCache.clear() bumps the catalog token every entry depends on.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        if entry is not None and entry['expires_at'] <= time.time():
+            return None
+        return entry
+
+    def set(self, key, entry):
+        timeout = max(1, int(entry['expires_at'] - time.time()))
+        self.cache.set(key, entry, timeout)
+
+    def delete_many(self, keys):
+        self.cache.delete_many(list(keys))
+
+    def tokens(self, keys):
+        found = self.cache.get_many(list(keys))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            # add() keeps a token another worker started in the meantime
+            for key in missing:
+                self.cache.add(key, uuid.uuid4().hex, None)
+            found.update(self.cache.get_many(missing))
+        return found
+
+    def bump(self, keys):
+        self.cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    def clear(self):
+        pass
+
+
+class SearchCache:
+    def __init__(self):
+        self._store = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def config(self):
+        return cache_config()
+
+    @property
+    def store(self):
+        if self._store is None:
+            config = self.config
+            self._store = import_string(config['BACKEND'])(**config['OPTIONS'])
+        return self._store
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def dependencies(self, filters):
+        """Token keys a search on the normalized ``filters`` depends on."""
+        filters = dict(filters)
+        travel_type = filters.get('type')
+        keys = [token_key('catalog')]
+        pairs = None
+        if 'source' in filters or 'destination' in filters:
+            # None while the index is behind the catalog
+            pairs = route_index.pairs(filters.get('source'), filters.get('destination'))
+        if pairs is not None and len(pairs) <= MAX_PAIRS:
+            keys += [
+                token_key('pair', source.casefold(), destination.casefold(), *([travel_type] if travel_type else []))
+                for source, destination in pairs
+            ]
+        else:
+            keys.append(token_key('type', travel_type) if travel_type else token_key('all'))
+        return keys
+
+    def stamp(self, filters):
+        """
+        Read the tokens for ``filters``. Take the stamp before querying so a
+        change that commits during the query leaves the entry stale.
+        """
+        return self.store.tokens(self.dependencies(filters))
+
+    def get(self, key):
+        entry = self.store.get(key)
+        if entry is not None and (
+            (entry['valid_until'] is not None and entry['valid_until'] <= timezone.now())
+            # A change since the entry was stamped
+            or (entry['tokens'] and self.store.tokens(list(entry['tokens'])) != entry['tokens'])
+        ):
+            self.store.delete_many([key])
+            entry = None
+        self._count('hits' if entry is not None else 'misses')
+        return entry
+
+    def set(self, key, filters, ids, valid_until=None, stamp=None):
+        self.store.set(key, {
+            'filters': filters,
+            'ids': ids,
+            'tokens': stamp or {},
+            'valid_until': valid_until,
+            'expires_at': time.time() + self.config['TTL'],
+        })
+
+    def options_changed(self, option_ids):
+        """
+        Stale every entry the options could be listed in or missing from
+        after a seat change: those for each option's city pair and type, its
+        pair, its type, and searches naming no cities. Call it inside the
+        transaction that changed the options; the tokens move once it commits.
+        """
+        rows = TravelOption.objects.filter(pk__in=option_ids).values_list('source', 'destination', 'type').distinct()
+        keys = set()
+        for source, destination, travel_type in rows:
+            source, destination, travel_type = source.casefold(), destination.casefold(), travel_type.casefold()
+            keys.update([
+                token_key('pair', source, destination, travel_type),
+                token_key('pair', source, destination),
+                token_key('type', travel_type),
+                token_key('all'),
+            ])
+        if keys:
+            transaction.on_commit(lambda: self._bump(keys))
+
+    def _bump(self, keys):
+        self.store.bump(list(keys))
+        self._count('invalidations')
+
+    def catalog_changed(self):
+        """Stale every entry after an option is created, edited or deleted."""
+        self._bump([token_key('catalog')])
+
+    def clear(self):
+        self.store.bump([token_key('catalog')])
+        self.store.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.config['BACKEND'],
+            # A shared store does not know how many entries it holds
+            'entries': len(self.store) if hasattr(self.store, '__len__') else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'invalidations': self.invalidations,
+            'evictions': self.store.evictions,
+        }
+
+
+search_cache = SearchCache()
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .city_index import city_index
+from .fare_calendar import routes_changed
+from .featured import featured_feed
+from .itineraries import connection_graph
+from .models import CatalogVersion, TravelOption
+from .route_index import route_index
+from .route_summary import option_key, refresh_groups, summary_keys
+from .search_cache import search_cache
+
+
+@receiver(pre_save, sender=TravelOption)
+def remember_summary_key(sender, instance, raw=False, **kwargs):
+    # An edit can move the option to another route, type or day; both the
+    # old and the new summary rows need refreshing
+    if instance.pk is not None and not raw:
+        instance._previous_summary_keys = summary_keys([instance.pk])
+
+
+@receiver(post_save, sender=TravelOption)
+def index_travel_option(sender, instance, created=False, **kwargs):
+    route_index.add(instance, CatalogVersion.bump())
+    if created:
+        city_index.option_created(instance)
+    connection_graph.add(instance)
+    search_cache.catalog_changed()
+    featured_feed.mark_stale()
+    keys = getattr(instance, '_previous_summary_keys', set()) | {option_key(instance)}
+    refresh_groups(keys)
+    routes_changed([instance.route_id] + [key[0] for key in keys if key is not None])
+
+
+@receiver(post_delete, sender=TravelOption)
+def unindex_travel_option(sender, instance, **kwargs):
+    route_index.discard(instance.pk, CatalogVersion.bump())
+    city_index.option_deleted(instance)
+    connection_graph.discard(instance.pk)
+    search_cache.catalog_changed()
+    featured_feed.mark_stale()
+    refresh_groups([option_key(instance)])
+    routes_changed([instance.route_id])
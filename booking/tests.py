@@ -1,12 +1,52 @@
-from django.test import TestCase, Client
+import importlib
+import itertools
+import os
+import re
+import tempfile
+import threading
+import time
+import types
+from datetime import date
+from decimal import Decimal
+from django.apps import apps as django_apps
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase, Client, AsyncClient, AsyncRequestFactory
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from io import StringIO
+import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from unittest import mock
+from urllib.error import URLError
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import TravelOption, Booking, UserProfile
+from .models import CatalogVersion, TravelOption, Booking, UserProfile, City, Passenger, Route, RouteDaySummary
+from . import admin as booking_admin, async_views
+from .batch import book_batch
+from .city_index import city_index
+from .booking_ids import is_valid_booking_id, new_booking_id, new_booking_ids
+from .fare_calendar import calendar_config, route_calendar
+from .featured import featured_feed, rank_options
+from .forms import BookingForm, TravelSearchForm
+from .itineraries import connection_graph
+from . import inventory
+from .inventory import SeatsUnavailable, confirm_hold, place_hold, release_expired_holds, reserve_seats, reserve_seats_bulk, release_seats
+from .performance import performance_stats
+from .ratelimit import CacheBuckets, LocalBuckets, rate_limiter
+from .search import search_travel_options
+from .route_index import route_index
+from .route_summary import rebuild_route_summary
+from .search_cache import LocMemLRUStore, SearchCache, search_cache
+from .views import TRAVEL_OPTIONS_PER_PAGE
+from .urls import build_urlpatterns, urlpatterns
 
 class TravelBookingTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
@@ -56,4 +96,1814 @@ class TravelBookingTestCase(TestCase):
             'contact_phone': '1234567890'
         })
         self.assertEqual(response.status_code, 302)  # Redirect after successful booking
-        self.assertTrue(Booking.objects.filter(user=self.user).exists())
\ No newline at end of file
+        self.assertTrue(Booking.objects.filter(user=self.user).exists())
+
+def make_option(**kwargs):
+    departure = timezone.now() + timedelta(days=7)
+    fields = {
+        'travel_id': 'T1234',
+        'type': 'FLIGHT',
+        'source': 'New York',
+        'destination': 'Los Angeles',
+        'departure_date_time': departure,
+        'arrival_date_time': departure + timedelta(hours=5),
+        'price': 299.99,
+        'available_seats': 150,
+        'total_seats': 200,
+        'operator': 'Test Airlines',
+    }
+    fields.update(kwargs)
+    return TravelOption.objects.create(**fields)
+
+# Admin pages need static URLs without a collectstatic manifest
+PLAIN_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+class SeatInventoryTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.option = make_option(available_seats=3, total_seats=3)
+
+    def test_reserve_and_release(self):
+        reserve_seats(self.option.pk, 2)
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.available_seats, 1)
+
+        with self.assertRaises(SeatsUnavailable):
+            reserve_seats(self.option.pk, 2)
+
+        self.assertTrue(release_seats(self.option.pk, 2))
+        self.assertFalse(release_seats(self.option.pk, 1))
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.available_seats, 3)
+
+    def test_locked_reservation(self):
+        reserve_seats(self.option.pk, 3, lock=True)
+        with self.assertRaises(SeatsUnavailable):
+            reserve_seats(self.option.pk, 1, lock=True)
+
+    def test_departed_option_is_not_reservable(self):
+        past = make_option(
+            travel_id='T0001',
+            departure_date_time=timezone.now() - timedelta(hours=1),
+            arrival_date_time=timezone.now() + timedelta(hours=1),
+        )
+        with self.assertRaises(SeatsUnavailable):
+            reserve_seats(past.pk, 1)
+
+    def test_booking_more_than_available_does_not_oversell(self):
+        self.client.login(username='testuser', password='testpass123')
+        TravelOption.objects.filter(pk=self.option.pk).update(available_seats=1)
+        response = self.client.post(reverse('book_travel', args=[self.option.pk]), {
+            'number_of_seats': 2,
+            'passenger_names': 'John Doe, Jane Doe',
+            'contact_email': 'test@example.com',
+            'contact_phone': '1234567890'
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Booking.objects.exists())
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.available_seats, 1)
+
+    def test_double_cancel_releases_seats_once(self):
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('book_travel', args=[self.option.pk]), {
+            'number_of_seats': 2,
+            'passenger_names': 'John Doe, Jane Doe',
+            'contact_email': 'test@example.com',
+            'contact_phone': '1234567890'
+        })
+        booking = Booking.objects.get()
+        self.client.post(reverse('cancel_booking', args=[booking.pk]))
+        self.client.post(reverse('cancel_booking', args=[booking.pk]))
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.available_seats, 3)
+
+class SeatInventoryStressTestCase(TransactionTestCase):
+    THREADS = 300
+    SEATS = 120
+
+    def run_concurrently(self, **reserve_kwargs):
+        option = make_option(available_seats=self.SEATS, total_seats=self.SEATS)
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                barrier.wait()
+                try:
+                    reserve_seats(option.pk, 1, retries=50, **reserve_kwargs)
+                    outcome = 'booked'
+                except SeatsUnavailable:
+                    outcome = 'sold_out'
+                with lock:
+                    results.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        option.refresh_from_db()
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(results.count('booked'), self.SEATS)
+        self.assertEqual(option.available_seats, 0)
+
+    def test_concurrent_conditional_reservations_never_oversell(self):
+        self.run_concurrently()
+
+    def test_concurrent_locked_reservations_never_oversell(self):
+        self.run_concurrently(lock=True)
+
+class SearchQueryPlanTestCase(TestCase):
+    FILTER_VALUES = {
+        'type': 'FLIGHT',
+        'source': 'Delhi',
+        'destination': 'Mumbai',
+        'date_from': date.today() + timedelta(days=1),
+        'date_to': date.today() + timedelta(days=30),
+        'max_price': Decimal('5000'),
+    }
+    # SQLite's SCAN, with or without USING INDEX, reads the whole table or index
+    SEQ_SCAN_PATTERNS = {
+        'postgresql': re.compile(r'Seq Scan on booking_traveloption'),
+        'sqlite': re.compile(r'SCAN booking_traveloption\b'),
+    }
+    # Except a walk of the price index in sort order, which stops after a page
+    ORDERED_WALK = re.compile(r'SCAN booking_traveloption USING INDEX travel_price_idx')
+    CITIES = ['Pune', 'Goa', 'Chennai', 'Kolkata', 'Jaipur', 'Lucknow', 'Bengaluru', 'Hyderabad']
+    SEEDED = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        # Enough rows, with realistic spread, for the planners' statistics to matter
+        now = timezone.now()
+        types = [choice for choice, _ in TravelOption.TRAVEL_TYPES]
+        options = []
+        for i in range(cls.SEEDED):
+            departure = now + timedelta(days=1 + i % 90, minutes=i)
+            options.append(TravelOption(
+                travel_id=f'S{i}', type=types[i % len(types)],
+                source=cls.CITIES[i % len(cls.CITIES)], destination=cls.CITIES[(i * 3 + 1) % len(cls.CITIES)],
+                departure_date_time=departure, arrival_date_time=departure + timedelta(hours=3),
+                price=500 + (i * 37) % 9000, available_seats=i % 7, total_seats=100, operator='Seed',
+            ))
+        TravelOption.objects.bulk_create(options)
+        for i in range(20):
+            make_option(travel_id=f'T{i}', source='Delhi', destination='Mumbai', price=1000 + i)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def search_combinations(self, filters=None):
+        filters = list(filters or self.FILTER_VALUES)
+        sort_choices = [choice for choice, _ in TravelSearchForm.SORT_CHOICES]
+        for size in range(len(filters) + 1):
+            for combo in itertools.combinations(filters, size):
+                for sort_by in sort_choices:
+                    data = {name: self.FILTER_VALUES[name] for name in combo}
+                    data['sort_by'] = sort_by
+                    yield data
+
+    def plan(self, data, page=True):
+        form = TravelSearchForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        options = search_travel_options(form.cleaned_data)
+        # Plan what the view runs: one page, plus the row that says there is another
+        return (options[:TRAVEL_OPTIONS_PER_PAGE + 1] if page else options).explain()
+
+    def assertNoFullScan(self, plan, data):
+        pattern = self.SEQ_SCAN_PATTERNS[connection.vendor]
+        if connection.vendor == 'sqlite' and data['sort_by'] in ('price_low', 'price_high') and 'TEMP B-TREE' not in plan:
+            plan = self.ORDERED_WALK.sub('', plan)
+        self.assertIsNone(pattern.search(plan), plan)
+
+    def test_no_search_combination_falls_back_to_seq_scan(self):
+        if connection.vendor not in self.SEQ_SCAN_PATTERNS:
+            self.skipTest(f'No plan checks for {connection.vendor}')
+
+        for data in self.search_combinations():
+            plan = self.plan(data)
+            with self.subTest(search=data):
+                self.assertNoFullScan(plan, data)
+
+    def test_text_fallback_uses_trigram_indexes(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('The trigram indexes exist on PostgreSQL only')
+
+        # Without route index candidates the search filters on icontains
+        with mock.patch.object(route_index, 'candidates', return_value=None):
+            for data in self.search_combinations(['source', 'destination']):
+                if 'source' not in data and 'destination' not in data:
+                    continue
+                plan = self.plan(data, page=False)
+                with self.subTest(search=data):
+                    self.assertNoFullScan(plan, data)
+                    self.assertRegex(plan, r'travel_(source|destination)_trgm_idx')
+
+    def test_date_filters_keep_bare_column(self):
+        form = TravelSearchForm({'date_from': self.FILTER_VALUES['date_from'], 'date_to': self.FILTER_VALUES['date_to']})
+        self.assertTrue(form.is_valid())
+        sql = str(search_travel_options(form.cleaned_data).query)
+        self.assertNotIn('django_datetime_cast_date', sql)
+        expected = sum(
+            self.FILTER_VALUES['date_from'] <= timezone.localtime(departure).date() <= self.FILTER_VALUES['date_to']
+            for departure in TravelOption.objects.filter(available_seats__gt=0).values_list('departure_date_time', flat=True)
+        )
+        self.assertEqual(search_travel_options(form.cleaned_data).count(), expected)
+
+class RouteIndexTestCase(TestCase):
+    def setUp(self):
+        route_index.invalidate()
+        self.delhi_mumbai = [
+            make_option(travel_id=f'DM{i}', source='Delhi', destination='Mumbai',
+                        departure_date_time=timezone.now() + timedelta(days=i + 1),
+                        arrival_date_time=timezone.now() + timedelta(days=i + 1, hours=2))
+            for i in range(4)
+        ]
+        self.train = make_option(travel_id='TR1', type='TRAIN', source='Delhi', destination='Mumbai')
+        self.other = make_option(travel_id='HM1', source='Ho Chi Minh City', destination='Pimpri-Chinchwad')
+
+    def test_save_assigns_normalized_route(self):
+        route = self.delhi_mumbai[0].route
+        self.assertEqual((route.source.name, route.destination.name), ('Delhi', 'Mumbai'))
+        self.assertEqual(Route.objects.count(), 2)
+        self.assertEqual(City.objects.count(), 4)
+
+        self.other.destination = 'Delhi'
+        self.other.save()
+        self.other.refresh_from_db()
+        self.assertEqual(str(self.other.route), 'Ho Chi Minh City → Delhi')
+
+    def test_candidates_are_ordered_by_departure(self):
+        ids = route_index.candidates(source='delhi', destination='MUM', travel_type='FLIGHT')
+        self.assertEqual(ids, [option.pk for option in self.delhi_mumbai])
+
+        window = route_index.candidates(
+            source='Delhi', destination='Mumbai', travel_type='FLIGHT',
+            end=self.delhi_mumbai[2].departure_date_time,
+        )
+        self.assertEqual(window, [self.delhi_mumbai[0].pk, self.delhi_mumbai[1].pk])
+
+    def test_incremental_updates(self):
+        self.delhi_mumbai[0].delete()
+        added = make_option(travel_id='DM9', source='Delhi', destination='Mumbai')
+        ids = route_index.candidates(source='Delhi', destination='Mumbai', exact=True)
+        self.assertNotIn(self.delhi_mumbai[0].pk, ids)
+        self.assertIn(added.pk, ids)
+        self.assertIn(self.train.pk, ids)
+
+    def test_search_matches_text_filter(self):
+        for data in [{'source': 'chi'}, {'destination': 'mumbai', 'type': 'TRAIN'}, {'source': 'Minh', 'destination': 'chinch'}]:
+            with self.subTest(search=data):
+                indexed = search_travel_options(data)
+                text = TravelOption.objects.filter(departure_date_time__gte=timezone.now(), available_seats__gt=0)
+                if data.get('source'):
+                    text = text.filter(source__icontains=data['source'])
+                if data.get('destination'):
+                    text = text.filter(destination__icontains=data['destination'])
+                if data.get('type'):
+                    text = text.filter(type=data['type'])
+                self.assertIn('IN', str(indexed.query))
+                self.assertEqual(list(indexed), list(text))
+
+    def test_rows_without_route_fall_back_to_text_search(self):
+        TravelOption.objects.filter(pk=self.other.pk).update(route=None)
+        route_index.invalidate()
+        self.assertIsNone(route_index.candidates(source='Delhi'))
+        self.assertEqual(search_travel_options({'source': 'Minh'}).get(), self.other)
+
+    def test_changes_from_other_processes_fall_back_to_text_search(self):
+        ids = route_index.candidates(source='Delhi', destination='Mumbai')
+        # As populate_data or another worker would: no signals here, only the version
+        departure = timezone.now() + timedelta(days=2)
+        added, = TravelOption.objects.bulk_create([TravelOption(
+            travel_id='DM8', type='BUS', source='Delhi', destination='Mumbai', route=self.train.route,
+            departure_date_time=departure, arrival_date_time=departure + timedelta(hours=9),
+            price=40, available_seats=30, total_seats=30,
+        )])
+        CatalogVersion.bump()
+
+        with mock.patch.object(route_index, 'schedule_rebuild') as schedule_rebuild, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(route_index.candidates(source='Delhi', destination='Mumbai'))
+            self.assertIn(added, search_travel_options({'source': 'delhi', 'type': 'BUS'}))
+        schedule_rebuild.assert_called()
+
+        route_index.build()
+        rebuilt = route_index.candidates(source='Delhi', destination='Mumbai')
+        self.assertEqual(sorted(rebuilt), sorted(ids + [added.pk]))
+
+    def test_stale_index_keeps_answering_while_it_rebuilds(self):
+        ids = route_index.candidates(source='Delhi', destination='Mumbai')
+        route_index._built_at -= route_index.ttl
+        with mock.patch.object(route_index, 'schedule_rebuild') as schedule_rebuild, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(route_index.candidates(source='Delhi', destination='Mumbai'), ids)
+        schedule_rebuild.assert_called_once_with()
+
+    def test_detail_similar_options(self):
+        response = self.client.get(reverse('travel_option_detail', args=[self.delhi_mumbai[0].pk]))
+        similar = list(response.context['similar_options'])
+        self.assertEqual(len(similar), 3)
+        self.assertNotIn(self.delhi_mumbai[0], similar)
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_cache.clear()
+        now = timezone.now()
+        # Shared prices and departures force the pk tiebreak to matter
+        for i in range(25):
+            make_option(
+                travel_id=f'K{i}',
+                price=100 + i % 4,
+                departure_date_time=now + timedelta(days=1 + i % 3),
+                arrival_date_time=now + timedelta(days=2 + i % 3),
+            )
+
+    def walk(self, params):
+        seen = []
+        cursor = None
+        pages = []
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            page = self.client.get(reverse('travel_options'), query).context['page_obj']
+            pages.append(page)
+            seen.extend(option.pk for option in page)
+            if not page.has_next:
+                return seen, pages
+            cursor = page.next_cursor
+
+    def test_cursor_walk_matches_full_ordering(self):
+        for sort_by in ['', 'price_low', 'price_high', 'departure']:
+            with self.subTest(sort_by=sort_by):
+                seen, pages = self.walk({'sort_by': sort_by})
+                expected = list(search_travel_options({'sort_by': sort_by}).values_list('pk', flat=True))
+                self.assertEqual(seen, expected)
+                self.assertEqual([len(page) for page in pages], [9, 9, 7])
+
+    def test_previous_cursor_returns_previous_page(self):
+        _, pages = self.walk({'sort_by': 'price_high'})
+        response = self.client.get(reverse('travel_options'), {'sort_by': 'price_high', 'cursor': pages[2].previous_cursor})
+        page = response.context['page_obj']
+        self.assertEqual(list(page), list(pages[1]))
+        self.assertTrue(page.has_next)
+        self.assertTrue(page.has_previous)
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('travel_options'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous)
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get(reverse('travel_options'), {'page': 3})
+        self.assertEqual(len(response.context['page_obj']), 7)
+        self.assertFalse(response.context['keyset'])
+        self.assertContains(response, 'page=2')
+        self.assertNotContains(response, 'cursor=')
+
+    def test_keyset_pages_link_by_cursor(self):
+        response = self.client.get(reverse('travel_options'))
+        self.assertTrue(response.context['keyset'])
+        self.assertContains(response, 'cursor=')
+        self.assertNotContains(response, 'page=2')
+
+    def test_total_count_is_cached(self):
+        self.client.get(reverse('travel_options'), {'type': 'FLIGHT'})
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('travel_options'), {'type': 'FLIGHT'})
+        self.assertEqual(response.context['total_count'], 25)
+
+class SearchCacheTestCase(TestCase):
+    def setUp(self):
+        search_cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.flight = make_option(travel_id='F1', source='Delhi', destination='Mumbai', available_seats=2)
+        self.train = make_option(travel_id='R1', type='TRAIN', source='Pune', destination='Goa')
+        route_index.invalidate()
+
+    def search(self, **params):
+        return self.client.get(reverse('travel_options'), params).context
+
+    def book(self, option, seats):
+        self.client.login(username='testuser', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('book_travel', args=[option.pk]), {
+                'number_of_seats': seats,
+                'passenger_names': 'John Doe',
+                'contact_email': 'test@example.com',
+                'contact_phone': '1234567890'
+            })
+
+    def test_repeat_search_is_a_hit(self):
+        hits, misses = search_cache.hits, search_cache.misses
+        self.search(source='Delhi', sort_by='price_low')
+        with self.assertNumQueries(1):
+            context = self.search(source=' delhi', sort_by='price_low')
+        self.assertEqual(list(context['page_obj']), [self.flight])
+        self.assertEqual((search_cache.hits - hits, search_cache.misses - misses), (1, 1))
+
+    def test_booking_invalidates_only_matching_searches(self):
+        for params in [{'type': 'FLIGHT'}, {'type': 'TRAIN'}, {'source': 'delhi'}, {'source': 'pune'}]:
+            self.search(**params)
+
+        self.book(self.flight, 2)
+        hits, misses = search_cache.hits, search_cache.misses
+        self.assertEqual(self.search(type='FLIGHT')['total_count'], 0)
+        self.assertEqual(self.search(source='delhi')['total_count'], 0)
+        self.assertEqual(self.search(type='TRAIN')['total_count'], 1)
+        self.assertEqual(self.search(source='pune')['total_count'], 1)
+        self.assertEqual((search_cache.hits - hits, search_cache.misses - misses), (2, 2))
+
+    def test_cancellation_brings_option_back(self):
+        self.book(self.flight, 2)
+        self.assertEqual(self.search(source='delhi')['total_count'], 0)
+
+        booking = Booking.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel_booking', args=[booking.pk]))
+        self.assertEqual(list(self.search(source='delhi')['page_obj']), [self.flight])
+
+    def test_catalog_change_invalidates(self):
+        self.assertEqual(self.search(destination='goa')['total_count'], 1)
+        self.flight.destination = 'Goa'
+        self.flight.save()
+        self.assertEqual(self.search(destination='goa')['total_count'], 2)
+
+    def test_entry_expires_when_earliest_departure_passes(self):
+        self.search(type='TRAIN')
+        key, entry = search_cache.store.items()[0]
+        entry['valid_until'] = timezone.now() - timedelta(seconds=1)
+        self.assertIsNone(search_cache.get(key))
+        self.assertEqual(len(search_cache.store), 0)
+
+    def test_lru_evicts_least_recently_used(self):
+        store = LocMemLRUStore(max_entries=2)
+        entry = {'expires_at': float('inf')}
+        store.set('a', entry)
+        store.set('b', entry)
+        store.get('a')
+        store.set('c', entry)
+        self.assertEqual([key for key, _ in store.items()], ['a', 'c'])
+        self.assertEqual(store.evictions, 1)
+
+    @override_settings(SEARCH_CACHE={'MAX_IDS': 1})
+    def test_too_broad_search_is_remembered(self):
+        hits = search_cache.hits
+        self.assertEqual(self.search()['total_count'], 2)
+        (key, entry), = search_cache.store.items()
+        self.assertIsNone(entry['ids'])
+
+        # No id probe the second time: one query for the page, the count is cached
+        with self.assertNumQueries(1):
+            context = self.search()
+        self.assertEqual(list(context['page_obj']), [self.flight, self.train])
+        self.assertEqual(search_cache.hits - hits, 1)
+        # Results come straight from the table, so bookings need not drop it
+        self.book(self.flight, 2)
+        self.assertEqual(len(search_cache.store), 1)
+        self.assertEqual(list(self.search()['page_obj']), [self.train])
+
+    def test_invalidation_cost_does_not_grow_with_entries(self):
+        store = search_cache.store
+        for n in range(200):
+            search_cache.set(f'entry:{n}', (('type', 'flight'),), [self.flight.pk], stamp=search_cache.stamp((('type', 'flight'),)))
+        with mock.patch.object(store, 'bump', wraps=store.bump) as bump, mock.patch.object(store, 'items') as items:
+            # One pk lookup inside the transaction, no entry scan after it commits
+            with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+                search_cache.options_changed([self.flight.pk])
+        self.assertEqual(bump.call_count, 1)
+        items.assert_not_called()
+        self.assertIsNone(search_cache.get('entry:0'))
+
+    def test_shared_store_invalidates_every_worker(self):
+        cache.clear()
+        with override_settings(SEARCH_CACHE={'BACKEND': 'booking.search_cache.DjangoCacheStore'}):
+            workers = [SearchCache(), SearchCache()]
+            filters = (('source', 'delhi'),)
+            workers[0].set('delhi', filters, [self.flight.pk], stamp=workers[0].stamp(filters))
+            workers[0].set('pune', (('source', 'pune'),), [self.train.pk], stamp=workers[0].stamp((('source', 'pune'),)))
+            self.assertEqual(workers[1].get('delhi')['ids'], [self.flight.pk])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                workers[1].options_changed([self.flight.pk])
+            self.assertIsNone(workers[0].get('delhi'))
+            self.assertIsNotNone(workers[0].get('pune'))
+
+            # An evicted token reads as a new one, so its entries turn stale
+            cache.delete_many(list(workers[0].get('pune')['tokens']))
+            self.assertIsNone(workers[1].get('pune'))
+
+            workers[0].set('pune', (('source', 'pune'),), [self.train.pk], stamp=workers[0].stamp((('source', 'pune'),)))
+            workers[1].clear()
+            self.assertIsNone(workers[0].get('pune'))
+            self.assertIsNone(workers[0].stats()['entries'])
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.login(username='testuser', password='testpass123')
+        self.assertEqual(self.client.get(reverse('search_cache_stats')).status_code, 302)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        stats = self.client.get(reverse('search_cache_stats')).json()
+        self.assertIn('hit_rate', stats)
+
+class PopulateDataTestCase(TestCase):
+    def populate(self, **options):
+        out = StringIO()
+        call_command('populate_data', stdout=out, **options)
+        return out.getvalue()
+
+    def catalog(self):
+        return list(TravelOption.objects.order_by('travel_id').values_list(
+            'travel_id', 'type', 'source', 'destination', 'price', 'available_seats'))
+
+    def test_bulk_generation_is_unique_and_routed(self):
+        output = self.populate(count=500, batch_size=120, seed=42)
+        self.assertEqual(TravelOption.objects.count(), 500)
+        self.assertEqual(TravelOption.objects.values('travel_id').distinct().count(), 500)
+        self.assertFalse(TravelOption.objects.filter(route__isnull=True).exists())
+        self.assertIn('rows/s', output)
+
+        flights = TravelOption.objects.filter(type='FLIGHT').count()
+        self.assertIn(f'Flights: {flights}\n', output)
+
+    def test_seed_is_reproducible_across_batch_sizes(self):
+        self.populate(count=300, batch_size=300, seed=7)
+        first = self.catalog()
+        self.populate(count=300, batch_size=50, seed=7)
+        self.assertEqual(self.catalog(), first)
+
+class QueryCountHarness:
+    """
+    Assert every named booking URL issues the same number of queries however
+    many bookings the requesting user has. Each URL is fetched with GET,
+    reversed with the arguments from URL_ARGS and once per query string in
+    QUERIES. EXCLUDED lists the URLs left out, with the reason; a named URL
+    that takes arguments and is in neither URL_ARGS nor EXCLUDED fails the test.
+    """
+    BOOKING_COUNTS = (1, 10, 1000)
+    # URL name -> factory(test, booking) returning the reverse() args
+    URL_ARGS = {}
+    # URL name -> query strings to fetch it with
+    QUERIES = {}
+    # URL name -> why it is not counted here
+    EXCLUDED = {}
+
+    def views(self):
+        """Yield (label, url factory) for every named URL that is not excluded."""
+        names = [pattern.name for pattern in urlpatterns if pattern.name]
+        self.assertEqual(set(self.EXCLUDED) - set(names), set(), 'EXCLUDED names URLs that no longer exist')
+        for pattern in urlpatterns:
+            name = pattern.name
+            if name is None or name in self.EXCLUDED:
+                continue
+            args_for = self.URL_ARGS.get(name)
+            if args_for is None and pattern.pattern.converters:
+                self.fail(f'{name} takes arguments: add it to URL_ARGS, or to EXCLUDED with the reason')
+            for query in self.QUERIES.get(name, ['']):
+                yield name + query, lambda test, booking, name=name, args_for=args_for, query=query: (
+                    reverse(name, args=args_for(test, booking) if args_for else None) + query
+                )
+
+    def create_user_with_bookings(self, count):
+        # Staff, so the staff-only views answer instead of redirecting
+        user = User.objects.create_user(username=f'user{count}', password='testpass123', email=f'user{count}@example.com', is_staff=True)
+        UserProfile.objects.create(user=user)
+        statuses = ['CONFIRMED', 'CANCELLED', 'PENDING']
+        Booking.objects.bulk_create([
+            Booking(
+                booking_id=f'BK{count:04d}{i:05d}',
+                user=user,
+                travel_option=self.options[i % len(self.options)],
+                number_of_seats=1,
+                total_price=100,
+                status=statuses[i % len(statuses)],
+                passenger_names='John Doe',
+                contact_email='test@example.com',
+                contact_phone='1234567890',
+            )
+            for i in range(count)
+        ])
+        return user, Booking.objects.filter(user=user, status='CONFIRMED').order_by('pk').first() or Booking.objects.filter(user=user).first()
+
+    def reset_process_caches(self):
+        cache.clear()
+        search_cache.clear()
+        route_index.invalidate()
+        connection_graph.invalidate()
+        city_index.invalidate()
+
+    def count_queries(self, url):
+        self.reset_process_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertIn(response.status_code, (200, 302), url)
+        return len(queries)
+
+    def test_query_count_is_constant(self):
+        users = [self.create_user_with_bookings(count) for count in self.BOOKING_COUNTS]
+        for label, url_for in self.views():
+            counts = []
+            for user, booking in users:
+                self.client.force_login(user)
+                counts.append(self.count_queries(url_for(self, booking)))
+            with self.subTest(view=label):
+                self.assertEqual(len(set(counts)), 1, f'{label}: {dict(zip(self.BOOKING_COUNTS, counts))}')
+
+class ViewQueryCountTestCase(QueryCountHarness, TestCase):
+    URL_ARGS = {
+        'travel_option_detail': lambda test, booking: [booking.travel_option_id],
+        'book_travel': lambda test, booking: [test.options[0].pk],
+        'booking_detail': lambda test, booking: [booking.pk],
+        'confirm_booking': lambda test, booking: [booking.pk],
+        'cancel_booking': lambda test, booking: [booking.pk],
+    }
+    QUERIES = {
+        'my_bookings': ['', '?status=CONFIRMED', '?status=CANCELLED'],
+        'api_connections': ['?source=Delhi&destination=Mumbai&date={date}'],
+        'api_fare_calendar': ['?source=Delhi&destination=Mumbai'],
+        'api_cities': ['?q=del'],
+    }
+    EXCLUDED = {
+        # GET answers 405; BatchBookingTestCase counts its POST queries
+        'api_batch_booking': 'POST only',
+    }
+
+    def setUp(self):
+        past = timezone.now() - timedelta(days=2)
+        self.options = [make_option(travel_id=f'Q{i}', source='Delhi', destination='Mumbai') for i in range(4)]
+        self.options.append(make_option(travel_id='QPAST', departure_date_time=past, arrival_date_time=past + timedelta(hours=2)))
+        date = timezone.localdate(self.options[0].departure_date_time)
+        self.QUERIES = {**self.QUERIES, 'api_connections': [query.format(date=date) for query in self.QUERIES['api_connections']]}
+
+class TravelSearchApiTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        route_index.invalidate()
+        for i in range(12):
+            make_option(travel_id=f'A{i}', source='Delhi', destination='Dubai' if i % 2 else 'Mumbai', price=1000 + i)
+
+    def test_json_rows_are_compact_and_paginated(self):
+        url = reverse('api_travel_options')
+        first = self.client.get(url, {'source': 'delhi', 'sort_by': 'price_high', 'limit': 5}).json()
+        self.assertEqual(first['count'], 12)
+        self.assertEqual(first['fields'][0], 'id')
+        self.assertEqual(len(first['rows']), 5)
+        self.assertIsNone(first['previous'])
+
+        price = first['fields'].index('price')
+        rows = first['rows']
+        cursor = first['next']
+        while cursor:
+            page = self.client.get(url, {'source': 'delhi', 'sort_by': 'price_high', 'limit': 5, 'cursor': cursor}).json()
+            rows += page['rows']
+            cursor = page['next']
+        self.assertEqual([row[price] for row in rows], [f'{1011 - i}.00' for i in range(12)])
+
+    def test_ndjson_streams_every_match(self):
+        response = self.client.get(reverse('api_travel_options'), {'destination': 'dubai', 'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(lines), 6)
+        self.assertEqual({line['destination'] for line in lines}, {'Dubai'})
+
+    def test_invalid_parameters_are_rejected(self):
+        url = reverse('api_travel_options')
+        self.assertEqual(self.client.get(url, {'type': 'BOAT'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 5000}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_cache.clear()
+        route_index.invalidate()
+        self.factory = AsyncRequestFactory()
+        self.options = [make_option(travel_id=f'AS{i}', source='Delhi', destination='Goa', price=500 + i) for i in range(12)]
+
+    async def test_home(self):
+        response = await async_views.home(self.factory.get('/'))
+        self.assertContains(response, 'Featured Travel Options')
+        self.assertContains(response, 'Delhi → Goa', count=1)
+
+    async def test_travel_options_keyset_and_numbered_pages(self):
+        response = await async_views.travel_options(self.factory.get('/travel-options/', {'source': 'delhi', 'sort_by': 'price_low'}))
+        self.assertContains(response, '12 results found')
+        self.assertContains(response, 'cursor=')
+
+        response = await async_views.travel_options(self.factory.get('/travel-options/', {'page': 2}))
+        self.assertContains(response, 'Delhi → Goa', count=3)
+
+    async def test_travel_option_detail(self):
+        response = await async_views.travel_option_detail(self.factory.get('/'), self.options[0].pk)
+        self.assertContains(response, 'Delhi → Goa')
+        with self.assertRaises(Http404):
+            await async_views.travel_option_detail(self.factory.get('/'), 0)
+
+class TravelCardCachingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_cache.clear()
+        route_index.invalidate()
+        self.client = Client()
+        self.option = make_option(source='Delhi', destination='Goa', available_seats=5, total_seats=5)
+
+    def test_duration_is_stored(self):
+        self.assertEqual(self.option.duration_minutes, 300)
+        self.assertEqual(self.option.duration, '5h 0m')
+
+        self.option.arrival_date_time = self.option.departure_date_time + timedelta(hours=26, minutes=45)
+        self.option.save(update_fields=['arrival_date_time'])
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.duration, '26h 45m')
+
+    def test_cached_cards_follow_seat_changes(self):
+        response = self.client.get(reverse('travel_options'))
+        self.assertContains(response, '5 seats left')
+
+        # Served from the fragment cache until updated_at moves
+        TravelOption.objects.filter(pk=self.option.pk).update(operator='Renamed Air')
+        response = self.client.get(reverse('travel_options'))
+        self.assertNotContains(response, 'Renamed Air')
+
+        # Seat changes bump updated_at, which moves every fragment key
+        reserve_seats(self.option.pk, 2)
+        response = self.client.get(reverse('travel_options'))
+        self.assertContains(response, 'Renamed Air')
+        self.assertContains(response, '3 seats left')
+        self.assertContains(self.client.get(reverse('home')), '3 seats left')
+        self.assertContains(self.client.get(reverse('travel_option_detail', args=[self.option.pk])), 'Renamed Air')
+
+
+@override_settings(FEATURED_FEED={'SIZE': 3, 'TTL': 300, 'BACKGROUND_REFRESH': False})
+class FeaturedFeedTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_cache.clear()
+        self.client = Client()
+        now = timezone.now()
+        self.soon_full = make_option(travel_id='F1', destination='Goa', departure_date_time=now + timedelta(days=1), available_seats=10, total_seats=200)
+        self.soon_empty = make_option(travel_id='F2', destination='Pune', departure_date_time=now + timedelta(days=1), available_seats=150, total_seats=200)
+        self.later_empty = make_option(travel_id='F3', destination='Agra', departure_date_time=now + timedelta(days=30), available_seats=200, total_seats=200)
+        self.same_route = make_option(travel_id='F4', destination='Pune', departure_date_time=now + timedelta(days=2), available_seats=200, total_seats=200)
+        self.leaving_now = make_option(travel_id='F5', destination='Kochi', departure_date_time=now + timedelta(minutes=30), available_seats=200, total_seats=200)
+
+    def test_ranking(self):
+        featured = featured_feed.refresh()
+        # Seat share discounted by days out, one per route, nothing inside the lead time
+        self.assertEqual(featured, [self.soon_empty, self.later_empty, self.soon_full])
+
+        options = [self.soon_full, self.soon_empty, self.later_empty]
+        self.assertEqual(rank_options(options, 1, timezone.now()), [self.soon_empty])
+
+    def test_warm_home_runs_no_queries(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'New York → Pune', count=1)
+
+    def test_seat_change_refreshes_feed(self):
+        self.assertContains(self.client.get(reverse('home')), '10 seats left')
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.soon_full.pk, 4)
+        self.assertContains(self.client.get(reverse('home')), '6 seats left')
+
+    def test_stale_feed_is_served_while_refreshing(self):
+        self.client.get(reverse('home'))
+        featured_feed.mark_stale()
+        with override_settings(FEATURED_FEED={'BACKGROUND_REFRESH': True}):
+            with mock.patch.object(featured_feed, 'schedule_refresh') as schedule_refresh:
+                with self.assertNumQueries(0):
+                    self.assertContains(self.client.get(reverse('home')), '150 seats left')
+        schedule_refresh.assert_called_once()
+
+
+@override_settings(PERFORMANCE_MONITOR={'SAMPLE_RATE': 1.0})
+class PerformanceMiddlewareTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_cache.clear()
+        route_index.invalidate()
+        performance_stats.reset()
+        self.client = Client()
+        self.option = make_option(source='Delhi', destination='Goa')
+
+    def test_records_per_view_and_sets_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('travel_options'), {'source': 'delhi'})
+        query_count = len(queries)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+, total;dur=[\d.]+$')
+        self.client.get(reverse('travel_option_detail', args=[self.option.pk]))
+
+        stats = performance_stats.snapshot()
+        self.assertEqual(set(stats), {'travel_options', 'travel_option_detail'})
+        search = stats['travel_options']
+        self.assertEqual(search['requests'], 1)
+        self.assertEqual(search['queries']['max'], query_count)
+        self.assertLessEqual(search['sql_ms']['p50'], search['wall_ms']['p50'])
+        # Which query is slowest depends on timing; only check one was kept
+        self.assertTrue(search['slowest_query']['sql'].startswith('SELECT'))
+        self.assertLessEqual(search['slowest_query']['ms'], search['sql_ms']['p50'])
+
+    def test_unsampled_requests_are_not_recorded(self):
+        with override_settings(PERFORMANCE_MONITOR={'SAMPLE_RATE': 0}):
+            response = self.client.get(reverse('home'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(performance_stats.snapshot(), {})
+
+    async def test_async_views_count_queries(self):
+        urlconf = types.ModuleType('async_urls')
+        urlconf.urlpatterns = build_urlpatterns(async_views)
+        with override_settings(ROOT_URLCONF=urlconf):
+            response = await AsyncClient().get(f'/travel-option/{self.option.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(performance_stats.snapshot()['travel_option_detail']['queries']['max'], 0)
+
+    def test_staff_endpoint(self):
+        self.client.get(reverse('home'))
+        self.assertEqual(self.client.get(reverse('performance_stats')).status_code, 302)
+
+        User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.login(username='staff', password='testpass123')
+        stats = self.client.get(reverse('performance_stats')).json()
+        self.assertEqual(stats['home']['requests'], 1)
+
+        self.client.post(reverse('performance_stats'))
+        self.assertEqual(list(performance_stats.snapshot()), ['performance_stats'])
+
+
+class LoadBenchmarkTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_cache.clear()
+        route_index.invalidate()
+        for i in range(5):
+            make_option(travel_id=f'LB{i}', destination=f'City {i}')
+
+    def test_replays_mix_and_writes_json(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'benchmark_load', '--no-seed', '--requests', 60, '--users', 3, '--concurrency', 1,
+                '--warmup', 0, '--mix', 'home=1,search=1,detail=1,book=1,cancel=1,my_bookings=1',
+                '--output', output.name, stdout=StringIO(),
+            )
+            results = json.load(output)
+
+        run = results['runs'][0]
+        self.assertEqual(run['rows'], 5)
+        self.assertEqual(run['overall']['requests'], 60)
+        self.assertEqual(run['overall']['errors'], 0)
+        self.assertEqual(set(run['endpoints']), {'home', 'search', 'detail', 'book', 'cancel', 'my_bookings'})
+        for result in run['endpoints'].values():
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+        self.assertTrue(Booking.objects.filter(user__username__startswith='loadtest_user_').exists())
+
+    def test_http_benchmark_encodes_paths_and_reports_failures(self):
+        TravelOption.objects.filter(travel_id='LB0').update(source='São Paulo')
+        urls = []
+
+        def fake_urlopen(url, timeout):
+            urls.append(url)
+            url.encode('ascii')
+            if url.endswith('/'):
+                raise URLError('connection refused')
+            return mock.MagicMock()
+
+        out, err = StringIO(), StringIO()
+        with mock.patch('booking.management.commands.http_benchmark.urlopen', side_effect=fake_urlopen):
+            call_command('http_benchmark', '--requests', 8, '--concurrency', 1, stdout=out, stderr=err)
+        self.assertIn('/travel-options/?source=S%C3%A3o+Paulo&sort_by=price_low', ''.join(urls))
+        self.assertIn('(6 of 8 failed)', out.getvalue())
+        self.assertIn('connection refused', err.getvalue())
+
+        with mock.patch('booking.management.commands.http_benchmark.urlopen', side_effect=URLError('down')):
+            with self.assertRaisesMessage(CommandError, 'All 8 requests failed'):
+                call_command('http_benchmark', '--requests', 8, '--concurrency', 1, stdout=StringIO(), stderr=StringIO())
+
+
+class SeatHoldTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.option = make_option(available_seats=5, total_seats=5)
+
+    def hold(self, option, seats, ttl=None):
+        booking = Booking(
+            user=self.user, travel_option=option, number_of_seats=seats, total_price=100,
+            passenger_names='John Doe', contact_email='test@example.com', contact_phone='1234567890',
+        )
+        return place_hold(booking, ttl=ttl)
+
+    def test_book_then_confirm(self):
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('book_travel', args=[self.option.pk]), {
+            'number_of_seats': 2,
+            'passenger_names': 'John Doe, Jane Doe',
+            'contact_email': 'test@example.com',
+            'contact_phone': '1234567890'
+        }, follow=True)
+        booking = Booking.objects.get()
+        self.assertEqual(booking.status, 'PENDING')
+        self.assertTrue(booking.is_held)
+        self.assertContains(response, reverse('confirm_booking', args=[booking.pk]))
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.available_seats, 3)
+
+        self.client.post(reverse('confirm_booking', args=[booking.pk]))
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'CONFIRMED')
+        self.assertIsNone(booking.hold_expires_at)
+
+    def test_expired_holds_are_swept_in_batches(self):
+        other = make_option(travel_id='T2', available_seats=4, total_seats=4)
+        expired = [self.hold(self.option, 1, ttl=-1), self.hold(self.option, 2, ttl=-1), self.hold(other, 3, ttl=-1)]
+        live = self.hold(self.option, 1)
+
+        self.assertFalse(confirm_hold(expired[0].pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(release_expired_holds(batch_size=2), 3)
+        self.assertEqual(release_expired_holds(), 0)
+
+        self.assertEqual(Booking.objects.filter(status='CANCELLED').count(), 3)
+        self.assertTrue(confirm_hold(live.pk))
+        self.option.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.option.available_seats, 4)
+        self.assertEqual(other.available_seats, 4)
+
+    def test_cancelled_hold_is_not_released_twice(self):
+        booking = self.hold(self.option, 2, ttl=-1)
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('cancel_booking', args=[booking.pk]))
+        self.assertEqual(release_expired_holds(), 0)
+        self.option.refresh_from_db()
+        self.assertEqual(self.option.available_seats, 5)
+
+    def test_sweeper_command(self):
+        self.hold(self.option, 2, ttl=-1)
+        out = StringIO()
+        call_command('release_expired_holds', '--batch-size', 10, stdout=out)
+        self.assertIn('Released 1 expired holds', out.getvalue())
+
+    def test_my_bookings_lists_live_holds_with_a_confirm_action(self):
+        live = self.hold(self.option, 1)
+        lapsed = self.hold(self.option, 1, ttl=-1)
+        self.client.login(username='testuser', password='testpass123')
+
+        for query in ({}, {'status': 'PENDING'}):
+            response = self.client.get(reverse('my_bookings'), query)
+            self.assertEqual(list(response.context['current_bookings']), [live])
+            self.assertContains(response, reverse('confirm_booking', args=[live.pk]))
+            self.assertNotContains(response, reverse('confirm_booking', args=[lapsed.pk]))
+            # Past as soon as it lapses, before the sweeper has released it
+            self.assertEqual(list(response.context['past_bookings']), [lapsed])
+            self.assertContains(response, 'Hold expired')
+
+    def test_hold_sweeper_thread(self):
+        self.assertIsNone(inventory.start_hold_sweeper(0))
+
+        # SystemExit ends the thread after its first sweep
+        with mock.patch.object(inventory, '_sweeper', None), \
+                mock.patch.object(inventory, 'release_expired_holds', side_effect=SystemExit) as sweep, \
+                mock.patch.object(inventory, 'connection') as sweeper_connection:
+            thread = inventory.start_hold_sweeper(0.05, batch_size=7)
+            self.assertIs(inventory.start_hold_sweeper(0.05), thread)
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(thread.daemon)
+        sweep.assert_called_once_with(batch_size=7)
+        sweeper_connection.close.assert_called_once_with()
+
+
+# The query count test posts single bookings for one user
+@override_settings(RATE_LIMIT={'ENABLED': False})
+class BatchBookingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='agency', password='testpass123')
+        self.client.login(username='agency', password='testpass123')
+        self.options = [make_option(travel_id=f'BT{i}', available_seats=200, total_seats=200) for i in range(3)]
+
+    def item(self, option, seats=1, **kwargs):
+        item = {
+            'travel_option': option.pk,
+            'number_of_seats': seats,
+            'passenger_names': 'John Doe',
+            'contact_email': 'agency@example.com',
+            'contact_phone': '1234567890',
+        }
+        item.update(kwargs)
+        return item
+
+    def post_batch(self, items):
+        return self.client.post(reverse('api_batch_booking'), json.dumps({'items': items}), content_type='application/json')
+
+    def test_books_every_item(self):
+        response = self.post_batch([self.item(self.options[0], 2), self.item(self.options[1]), self.item(self.options[0], 3)])
+        self.assertEqual(response.status_code, 201)
+        booking_ids = [booking['booking_id'] for booking in response.json()['bookings']]
+        self.assertEqual(len(set(booking_ids)), 3)
+        self.assertEqual(Booking.objects.filter(user=self.user, status='CONFIRMED', booking_id__in=booking_ids).count(), 3)
+        self.options[0].refresh_from_db()
+        self.assertEqual(self.options[0].available_seats, 195)
+
+    def test_invalid_items_book_nothing(self):
+        response = self.post_batch([
+            self.item(self.options[0]),
+            self.item(self.options[1], contact_phone='123'),
+            self.item(self.options[2], 201),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'1', '2'})
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.post_batch([]).status_code, 400)
+        self.assertEqual(self.client.post(reverse('api_batch_booking'), 'nope', content_type='application/json').status_code, 400)
+
+    def test_bulk_reservation_is_all_or_nothing(self):
+        with self.assertRaises(SeatsUnavailable):
+            reserve_seats_bulk({self.options[0].pk: 5, self.options[1].pk: 500})
+        self.options[0].refresh_from_db()
+        self.assertEqual(self.options[0].available_seats, 200)
+
+    def test_batch_queries_do_not_grow_with_items(self):
+        # Wall-clock comparisons live in `manage.py benchmark_batch_booking`
+        with CaptureQueriesContext(connection) as single:
+            for i in range(6):
+                self.client.post(reverse('book_travel', args=[self.options[i % 3].pk]), self.item(self.options[i % 3]))
+
+        counts = []
+        for count in (6, 60):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_batch([self.item(self.options[i % 3]) for i in range(count)])
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(Booking.objects.count(), 6 + 6 + 60)
+        self.assertEqual(counts[0], counts[1])
+        self.assertLess(counts[0], len(single))
+
+    def test_boolean_option_ids_are_rejected(self):
+        # true == 1, so make sure there is an option 1 to book by mistake
+        if not TravelOption.objects.filter(pk=1).exists():
+            make_option(pk=1, travel_id='BT-ONE')
+        response = self.post_batch([self.item(self.options[0], travel_option=True)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['0']['travel_option'][0]['code'], 'invalid')
+        self.assertFalse(Booking.objects.exists())
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_batch_booking', '--items', 6, stdout=out)
+        self.assertIn('faster for 6 items', out.getvalue())
+        self.assertFalse(Booking.objects.exists())
+        self.options[0].refresh_from_db()
+        self.assertEqual(self.options[0].available_seats, 200)
+
+
+class BookingIdTestCase(TestCase):
+    def test_millions_of_ids_without_collisions(self):
+        ids = []
+        for _ in range(200):
+            ids.extend(new_booking_ids(10000))
+
+        results = []
+
+        def generate():
+            results.append([new_booking_id() for _ in range(50000)])
+
+        threads = [threading.Thread(target=generate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for generated in results:
+            ids.extend(generated)
+
+        self.assertEqual(len(ids), 2200000)
+        self.assertEqual(len(set(ids)), len(ids))
+        # One process hands out strictly increasing ids
+        bulk = ids[:2000000]
+        self.assertEqual(bulk, sorted(bulk))
+
+    def test_format(self):
+        booking_id = new_booking_id()
+        self.assertEqual(len(booking_id), 20)
+        self.assertLessEqual(len(booking_id), Booking._meta.get_field('booking_id').max_length)
+        self.assertTrue(is_valid_booking_id(booking_id))
+        self.assertTrue(is_valid_booking_id('BKA1B2C3D4'))
+        self.assertFalse(is_valid_booking_id('BK123'))
+        self.assertLess(booking_id, new_booking_id())
+
+    def test_saved_bookings_get_ids(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        option = make_option()
+        booking = Booking.objects.create(
+            user=user, travel_option=option, number_of_seats=1,
+            passenger_names='John Doe', contact_email='test@example.com', contact_phone='1234567890',
+        )
+        self.assertTrue(is_valid_booking_id(booking.booking_id))
+
+
+class PassengerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.option = make_option()
+
+    def make_booking(self, names):
+        return Booking.objects.create(
+            user=self.user, travel_option=self.option, number_of_seats=2,
+            passenger_names=names, contact_email='test@example.com', contact_phone='1234567890',
+        )
+
+    def test_form_keeps_comma_separated_input(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('book_travel', args=[self.option.pk]), {
+                'number_of_seats': 2,
+                'passenger_names': ' john  doe, Jane Doe ,',
+                'contact_email': 'test@example.com',
+                'contact_phone': '1234567890',
+            })
+        booking = Booking.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('booking_detail', args=[booking.pk]))
+        self.assertEqual(booking.passenger_names, 'john doe, Jane Doe')
+        self.assertEqual(
+            list(booking.passengers.values_list('position', 'name', 'normalized_name')),
+            [(0, 'john doe', 'john doe'), (1, 'Jane Doe', 'jane doe')],
+        )
+
+        response = self.client.get(reverse('booking_detail', args=[booking.pk]))
+        self.assertEqual([p.name for p in response.context['passengers']], ['john doe', 'Jane Doe'])
+
+    def test_form_requires_a_name(self):
+        form = BookingForm({'number_of_seats': 1, 'passenger_names': ' , ', 'contact_email': 'a@example.com', 'contact_phone': '1234567890'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('passenger_names', form.errors)
+
+    def test_passengers_follow_edits(self):
+        booking = self.make_booking('John Doe, Jane Doe')
+        booking.passenger_names = 'Jane Doe'
+        booking.save()
+        self.assertEqual(list(booking.passengers.values_list('name', flat=True)), ['Jane Doe'])
+
+        booking = Booking.objects.get(pk=booking.pk)
+        with self.assertNumQueries(1):
+            booking.status = 'CONFIRMED'
+            booking.save(update_fields=['status'])
+        with self.assertNumQueries(1):
+            booking.save()
+
+    def test_lookup_by_passenger_uses_index(self):
+        booking = self.make_booking('John Doe, Jane Doe')
+        self.make_booking('Someone Else')
+        self.assertEqual(list(Booking.for_passenger('  JOHN   doe ')), [booking])
+
+        plan = Passenger.objects.filter(normalized_name='john doe').values('booking_id').explain()
+        if connection.vendor == 'sqlite':
+            self.assertIn('passenger_name_idx', plan)
+
+    @override_settings(STORAGES=PLAIN_STORAGES)
+    def test_admin_search_finds_passenger(self):
+        booking = self.make_booking('John Doe')
+        self.make_booking('Someone Else')
+        User.objects.create_superuser(username='admin', password='adminpass123', email='admin@example.com')
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(reverse('admin:booking_booking_changelist'), {'q': 'john doe'})
+        self.assertEqual(list(response.context['cl'].result_list), [booking])
+
+    def test_batch_bookings_get_passengers(self):
+        items = [{
+            'travel_option': self.option.pk, 'number_of_seats': 2, 'passenger_names': 'A One, B Two',
+            'contact_email': 'agency@example.com', 'contact_phone': '1234567890',
+        }] * 3
+        bookings = book_batch(self.user, items)
+        self.assertEqual(Passenger.objects.filter(booking__in=bookings).count(), 6)
+
+    def test_migration_backfills_existing_bookings(self):
+        booking = self.make_booking('John Doe,  Jane   Doe')
+        Passenger.objects.all().delete()
+        migration = importlib.import_module('booking.migrations.0008_passengers')
+        with mock.patch.object(migration, 'BATCH_SIZE', 1):
+            self.make_booking('Someone Else')
+            Passenger.objects.all().delete()
+            migration.backfill_passengers(django_apps, None)
+        self.assertEqual(
+            list(booking.passengers.values_list('name', 'normalized_name')),
+            [('John Doe', 'john doe'), ('Jane Doe', 'jane doe')],
+        )
+        self.assertEqual(Passenger.objects.count(), 3)
+
+
+class RouteSummaryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.departure = timezone.now().replace(hour=9, minute=0) + timedelta(days=7)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap = make_option(travel_id='S1', price=100, available_seats=2, total_seats=2, departure_date_time=self.departure)
+            self.dear = make_option(travel_id='S2', price=300, available_seats=5, total_seats=5, departure_date_time=self.departure + timedelta(hours=2))
+            make_option(travel_id='S3', type='BUS', price=50, departure_date_time=self.departure)
+
+    def summaries(self):
+        return list(RouteDaySummary.objects.order_by('route', 'type', 'date').values_list(
+            'route_id', 'type', 'date', 'option_count', 'available_seats', 'min_price'))
+
+    def flight_summary(self):
+        return RouteDaySummary.objects.get(type='FLIGHT', date=self.departure.date())
+
+    def test_catalog_changes_update_groups(self):
+        summary = self.flight_summary()
+        self.assertEqual((summary.option_count, summary.available_seats, summary.min_price), (2, 7, Decimal('100')))
+        self.assertEqual(RouteDaySummary.objects.count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dear.departure_date_time += timedelta(days=1)
+            self.dear.arrival_date_time += timedelta(days=1)
+            self.dear.save()
+        summary = self.flight_summary()
+        self.assertEqual((summary.option_count, summary.available_seats), (1, 2))
+        self.assertEqual(RouteDaySummary.objects.get(type='FLIGHT', date=self.dear.departure_date_time.date()).option_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap.delete()
+        self.assertFalse(RouteDaySummary.objects.filter(type='FLIGHT', date=self.departure.date()).exists())
+
+    def test_bookings_and_cancellations_update_seats_and_price(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('book_travel', args=[self.cheap.pk]), {
+                'number_of_seats': 2,
+                'passenger_names': 'John Doe, Jane Doe',
+                'contact_email': 'test@example.com',
+                'contact_phone': '1234567890',
+            })
+        summary = self.flight_summary()
+        self.assertEqual((summary.option_count, summary.available_seats, summary.min_price), (2, 5, Decimal('100')))
+
+        booking = Booking.objects.get(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel_booking', args=[booking.pk]))
+        self.assertEqual(self.flight_summary().available_seats, 7)
+
+    def test_seat_change_is_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            reserve_seats(self.dear.pk, 1)
+        summary_queries = [q['sql'] for q in queries.captured_queries if 'booking_routedaysummary' in q['sql']]
+        self.assertEqual(len(summary_queries), 1)
+        self.assertTrue(summary_queries[0].startswith('UPDATE'))
+        self.assertEqual(self.flight_summary().available_seats, 6)
+
+    def test_expired_holds_update_summary(self):
+        booking = Booking(
+            user=self.user, travel_option=self.dear, number_of_seats=5,
+            passenger_names='A, B, C, D, E', contact_email='test@example.com', contact_phone='1234567890',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            place_hold(booking, ttl=60)
+        self.assertEqual(self.flight_summary().available_seats, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            release_expired_holds(now=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(self.flight_summary().available_seats, 7)
+
+    def test_rebuild_matches_incremental(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.dear.pk, 3)
+            make_option(travel_id='S4', destination='Boston', departure_date_time=self.departure)
+        incremental = self.summaries()
+        RouteDaySummary.objects.update(available_seats=0)
+
+        out = StringIO()
+        call_command('rebuild_route_summary', '--batch-size', '1', stdout=out)
+        self.assertIn('Rebuilt 3 route summary rows', out.getvalue())
+        self.assertEqual(self.summaries(), incremental)
+        self.assertEqual(rebuild_route_summary(), 3)
+
+
+@override_settings(STORAGES=PLAIN_STORAGES)
+class AdminChangelistTestCase(TestCase):
+    CHANGELISTS = [
+        'admin:booking_userprofile_changelist',
+        'admin:booking_traveloption_changelist',
+        'admin:booking_booking_changelist',
+        'admin:booking_routedaysummary_changelist',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass123', email='admin@example.com')
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        for i in range(self.rows, self.rows + count):
+            option = make_option(travel_id=f'AD{i}', source=f'City {i}', destination=f'Town {i}', departure_date_time=timezone.now() + timedelta(days=i + 1))
+            user = User.objects.create_user(username=f'admin_user{i}', password='testpass123')
+            UserProfile.objects.create(user=user)
+            Booking.objects.create(
+                user=user, travel_option=option, number_of_seats=1, status='CONFIRMED',
+                passenger_names='John Doe', contact_email='test@example.com', contact_phone='1234567890',
+            )
+        self.rows += count
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_query_count_is_constant_per_changelist(self):
+        counts = {}
+        for size in (2, 20):
+            self.add_rows(size - self.rows)
+            for name in self.CHANGELISTS:
+                counts.setdefault(name, []).append(len(self.count_queries(reverse(name))))
+        for name, (small, large) in counts.items():
+            with self.subTest(changelist=name):
+                self.assertEqual(small, large)
+                self.assertLessEqual(large, 10)
+
+    def test_city_filters_are_cached_and_skip_distinct(self):
+        self.add_rows(3)
+        url = reverse('admin:booking_traveloption_changelist')
+        first = self.count_queries(url)
+        self.assertFalse([sql for sql in first if 'DISTINCT' in sql and 'booking_traveloption' in sql])
+
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'source': 'City 1'})
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'booking_city' in q['sql']])
+        self.assertEqual([option.travel_id for option in response.context['cl'].result_list], ['AD1'])
+
+    def test_large_unfiltered_changelist_uses_estimate(self):
+        self.add_rows(2)
+        with mock.patch.object(booking_admin, 'estimated_row_count', return_value=250000):
+            queries = self.count_queries(reverse('admin:booking_booking_changelist'))
+            response = self.client.get(reverse('admin:booking_booking_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 250000)
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql and 'booking_booking' in sql])
+
+        response = self.client.get(reverse('admin:booking_booking_changelist'), {'status__exact': 'CONFIRMED'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class ConnectionSearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        connection_graph.invalidate()
+        self.day = (timezone.now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.first = self.leg('C1', 'Alpha', 'Beta', 8, 10, price=100)
+        self.tight = self.leg('C2', 'Beta', 'Gamma', 10.5, 12, price=10)
+        self.second = self.leg('C3', 'Beta', 'Gamma', 11.5, 13, price=200)
+        self.third = self.leg('C4', 'Gamma', 'Delta', 15, 16, price=300)
+
+    def leg(self, travel_id, source, destination, departs, arrives, **kwargs):
+        return make_option(
+            travel_id=travel_id, source=source, destination=destination,
+            departure_date_time=self.day + timedelta(hours=departs),
+            arrival_date_time=self.day + timedelta(hours=arrives), **kwargs
+        )
+
+    def search(self, source, destination, **kwargs):
+        return connection_graph.search(source, destination, self.day, self.day + timedelta(days=1), **kwargs)
+
+    def test_respects_minimum_layover(self):
+        itineraries = self.search('Alpha', 'Gamma')
+        self.assertEqual([i.legs for i in itineraries], [(self.first.pk, self.second.pk)])
+        self.assertEqual(itineraries[0].as_dict()['price'], Decimal('300'))
+
+    def test_three_legs_and_leg_limit(self):
+        self.assertEqual([i.legs for i in self.search('Alpha', 'Delta')], [(self.first.pk, self.second.pk, self.third.pk)])
+        self.assertEqual(self.search('Alpha', 'Delta', max_legs=2), [])
+
+    def test_sold_out_legs_are_skipped_after_seat_change(self):
+        self.assertEqual(len(self.search('Alpha', 'Gamma', seats=2)), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.second.pk, 149)
+        self.assertEqual(self.search('Alpha', 'Gamma', seats=2), [])
+        self.assertEqual(len(self.search('Alpha', 'Gamma', seats=1)), 1)
+
+    def test_catalog_changes_are_incremental(self):
+        self.search('Alpha', 'Delta')
+        with mock.patch.object(connection_graph, 'build') as build:
+            direct = self.leg('C5', 'Alpha', 'Delta', 9, 12, price=900)
+            itineraries = self.search('Alpha', 'Delta', sort='arrival')
+            self.assertEqual([i.legs for i in itineraries][0], (direct.pk,))
+            self.assertEqual(self.search('Alpha', 'Delta', sort='price')[0].legs, (self.first.pk, self.second.pk, self.third.pk))
+            direct.delete()
+            self.assertEqual(len(self.search('Alpha', 'Delta')), 1)
+        build.assert_not_called()
+
+    def test_top_limit_is_exact_through_one_hub(self):
+        later = [self.leg(f'CB{hour}', 'Beta', 'Gamma', hour, hour + 1, price=hour) for hour in range(12, 18)]
+        itineraries = self.search('Alpha', 'Gamma', limit=7)
+        # C3 and CB12 both land at 13:00; CB12 is cheaper
+        self.assertEqual([i.legs[1] for i in itineraries], [later[0].pk, self.second.pk] + [leg.pk for leg in later[1:]])
+        self.assertEqual(len(self.search('Alpha', 'Gamma', limit=3)), 3)
+
+    def test_stale_graph_is_rebuilt_in_the_background(self):
+        self.search('Alpha', 'Gamma')
+        state = connection_graph.load()
+        loading, release = threading.Event(), threading.Event()
+
+        def slow_load():
+            loading.set()
+            release.wait(5)
+            return state
+
+        connection_graph._built_at -= connection_graph.ttl
+        with mock.patch.object(connection_graph, 'load', side_effect=slow_load) as load:
+            with self.captureOnCommitCallbacks(execute=True):
+                # Both searches are answered from the old graph and ask for one rebuild
+                self.assertEqual(len(self.search('Alpha', 'Gamma')), 1)
+                self.assertEqual(len(self.search('Alpha', 'Gamma')), 1)
+            self.assertTrue(loading.wait(5))
+            # A change the rebuild's read missed is replayed onto the new graph
+            direct = self.leg('C5', 'Alpha', 'Gamma', 9, 12, price=900)
+            self.assertEqual(self.search('Alpha', 'Gamma')[0].legs, (direct.pk,))
+            release.set()
+            with connection_graph._rebuilding:
+                pass
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(self.search('Alpha', 'Gamma')[0].legs, (direct.pk,))
+        self.assertIs(connection_graph._hops[('Alpha', 'Beta')], state[0][('Alpha', 'Beta')])
+
+    def test_api_returns_leg_rows(self):
+        url = reverse('api_connections')
+        params = {'source': ' alpha', 'destination': 'DELTA', 'date': self.day.date().isoformat()}
+        self.client.get(url, params)
+        with self.assertNumQueries(1):
+            data = self.client.get(url, params).json()
+        itinerary, = data['itineraries']
+        travel_ids = [dict(zip(data['fields'], row))['travel_id'] for row in itinerary['legs']]
+        self.assertEqual(travel_ids, ['C1', 'C3', 'C4'])
+        self.assertEqual(itinerary['duration_minutes'], 8 * 60)
+
+        response = self.client.get(url, {**params, 'destination': 'Nowhere'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('destination', response.json()['errors'])
+
+
+class FareCalendarTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = (timezone.now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.cheap = self.fare('F1', 3, 10, 120)
+        self.fare('F2', 3, 14, 180, type='TRAIN')
+        self.fare('F3', 3, 16, 50, available_seats=0)
+        self.later = self.fare('F4', 5, 9, 300)
+        self.fare('F5', 200, 9, 10)
+        self.fare('F6', 3, 9, 5, destination='Elsewhere')
+        self.route_id = self.cheap.route_id
+
+    def fare(self, travel_id, days, hour, price, **kwargs):
+        departure = timezone.now().replace(hour=hour, minute=0, second=0, microsecond=0) + timedelta(days=days)
+        fields = {
+            'travel_id': travel_id, 'source': 'Delhi', 'destination': 'Dubai', 'price': price,
+            'departure_date_time': departure, 'arrival_date_time': departure + timedelta(hours=4),
+        }
+        fields.update(kwargs)
+        return make_option(**fields)
+
+    def days(self, travel_type=None):
+        return [(day['date'], day['min_price'], day['options']) for day in route_calendar(self.route_id, travel_type)]
+
+    def test_one_grouped_query_then_cached(self):
+        first = timezone.localdate(self.cheap.departure_date_time)
+        second = timezone.localdate(self.later.departure_date_time)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.days(), [(first, Decimal('120'), 2), (second, Decimal('300'), 1)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.days('TRAIN'), [(first, Decimal('180'), 1)])
+
+    def test_price_and_seat_changes_refresh_the_route(self):
+        self.days()
+        self.later.price = Decimal('90')
+        self.later.save()
+        self.assertEqual(self.days()[1][1:], (Decimal('90'), 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.cheap.pk, self.cheap.available_seats)
+        self.assertEqual(self.days()[0][1:], (Decimal('180'), 1))
+
+    def test_api(self):
+        url = reverse('api_fare_calendar')
+        params = {'source': 'delhi', 'destination': ' Dubai'}
+        self.client.get(url, params)
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {**params, 'type': 'FLIGHT'}).json()
+        self.assertEqual(data['route'], self.route_id)
+        self.assertEqual([day['min_price'] for day in data['days']], ['120.00', '300.00'])
+
+        response = self.client.get(url, {'source': 'Dubai', 'destination': 'Delhi'})
+        self.assertEqual(response.status_code, 400)
+
+    def cached_timeout(self):
+        backend = caches[calendar_config()['CACHE']]
+        with mock.patch.object(backend, 'set', wraps=backend.set) as cache_set:
+            self.days()
+        return cache_set.call_args.args[2]
+
+    def test_process_local_cache_keeps_entries_short(self):
+        with override_settings(FARE_CALENDAR={'TTL': 3600, 'LOCAL_TTL': 60}):
+            self.assertEqual(self.cached_timeout(), 60)
+
+    def test_shared_cache_keeps_the_full_ttl(self):
+        shared = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with override_settings(
+            CACHES={**settings.CACHES, 'shared': shared},
+            FARE_CALENDAR={'TTL': 3600, 'CACHE': 'shared'},
+        ):
+            self.assertEqual(self.cached_timeout(), 3600)
+
+
+class CityIndexTestCase(TestCase):
+    def setUp(self):
+        city_index.invalidate()
+        for n, (source, destination) in enumerate([
+            ('Pimpri-Chinchwad', 'Pune'), ('Pimpri-Chinchwad', 'Pune'), ('Pimpri-Chinchwad', 'Chennai'),
+            ('Ho Chi Minh City', 'Chennai'), ('Chennai', 'Pune'), ('Chennai', 'Ho Chi Minh City'),
+        ]):
+            make_option(travel_id=f'AC{n}', source=source, destination=destination)
+
+    def names(self, term, **kwargs):
+        return [name for name, _ in city_index.complete(term, **kwargs)]
+
+    def test_hyphenated_and_multi_word_names(self):
+        city_index.ensure_fresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('chinch'), ['Pimpri-Chinchwad'])
+            self.assertEqual(self.names('Pimpri chin'), ['Pimpri-Chinchwad'])
+            self.assertEqual(self.names(' ho-chi  '), ['Ho Chi Minh City'])
+            self.assertEqual(self.names('minh c'), ['Ho Chi Minh City'])
+            self.assertEqual(self.names('xyz'), [])
+
+    def test_ranking_and_signal_upkeep(self):
+        # Word matches rank by departures, after names that start with the term
+        self.assertEqual(self.names('chi'), ['Pimpri-Chinchwad', 'Ho Chi Minh City'])
+        self.assertEqual(self.names('ch'), ['Chennai', 'Pimpri-Chinchwad', 'Ho Chi Minh City'])
+        self.assertEqual(self.names('', limit=2), ['Pimpri-Chinchwad', 'Chennai'])
+
+        with mock.patch.object(city_index, 'build') as build:
+            for n in range(3):
+                make_option(travel_id=f'HC{n}', source='Ho Chi Minh City', destination='Pune')
+            make_option(travel_id='NEW', source='Chittagong', destination='Pune')
+            self.assertEqual(self.names('chi'), ['Chittagong', 'Ho Chi Minh City', 'Pimpri-Chinchwad'])
+            TravelOption.objects.get(travel_id='HC0').delete()
+            self.assertEqual(dict(city_index.complete('ho'))['Ho Chi Minh City'], 3)
+        build.assert_not_called()
+
+    def test_api(self):
+        self.client.get(reverse('api_cities'), {'q': 'p'})
+        with self.assertNumQueries(0):
+            data = self.client.get(reverse('api_cities'), {'q': 'p', 'limit': 1}).json()
+        self.assertEqual(data['cities'], [{'name': 'Pimpri-Chinchwad', 'departures': 3}])
+        self.assertEqual(self.client.get(reverse('api_cities'), {'limit': 0}).status_code, 400)
+
+    def test_counts_only_upcoming_departures(self):
+        departed = timezone.now() - timedelta(days=1)
+        for n in range(4):
+            make_option(travel_id=f'OLD{n}', source='Chennai', destination='Pune', departure_date_time=departed, arrival_date_time=departed)
+        self.assertEqual(dict(city_index.complete('chennai'))['Chennai'], 2)
+
+    def test_stale_index_answers_while_it_rebuilds(self):
+        city_index.ensure_fresh()
+        city_index._built_at -= city_index.ttl
+        City.objects.create(name='Chandigarh')
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(0):
+            # The stale copy answers; the rebuild waits for the commit
+            self.assertEqual(self.names('chand'), [])
+        self.assertEqual(len(callbacks), 1)
+
+        with mock.patch('booking.index_rebuild.threading.Thread') as thread:
+            callbacks[0]()
+        thread.return_value.start.assert_called_once_with()
+        thread.call_args.kwargs['target']()
+        self.assertEqual(self.names('chand'), ['Chandigarh'])
+
+
+class SessionStorageTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sessions', password='testpass123')
+
+    def session_queries(self, queries):
+        return [q['sql'] for q in queries if 'django_session' in q['sql']]
+
+    def test_cached_sessions_only_default_with_a_shared_cache(self):
+        from travel_booking import settings as project_settings
+        environ = {k: v for k, v in os.environ.items() if k not in ('SESSION_BACKEND', 'SESSION_CACHE_URL')}
+        try:
+            with mock.patch.dict(os.environ, environ, clear=True):
+                importlib.reload(project_settings)
+                self.assertEqual(project_settings.SESSION_ENGINE, 'django.contrib.sessions.backends.db')
+            with mock.patch.dict(os.environ, {**environ, 'SESSION_CACHE_URL': 'redis://cache:6379/1'}, clear=True):
+                importlib.reload(project_settings)
+                self.assertEqual(project_settings.SESSION_ENGINE, 'django.contrib.sessions.backends.cached_db')
+                self.assertIn('RedisCache', project_settings.CACHES['sessions']['BACKEND'])
+        finally:
+            importlib.reload(project_settings)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_logged_in_pages_and_messages_skip_the_session_table(self):
+        self.client.login(username='sessions', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('my_bookings'))
+        self.assertEqual(self.session_queries(queries), [])
+
+        response = self.client.get(reverse('logout'))
+        self.assertIn('messages', response.cookies)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), {'username': 'sessions', 'password': 'wrong'})
+        self.assertEqual(self.session_queries(queries), [])
+        self.assertContains(response, 'Invalid username or password')
+
+    def test_clear_expired_sessions_in_batches(self):
+        from django.contrib.sessions.models import Session
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i:03}', session_data='', expire_date=now - timedelta(minutes=i + 1)) for i in range(25)]
+            + [Session(session_key=f'live{i}', session_data='', expire_date=now + timedelta(days=1)) for i in range(3)]
+        )
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('clear_expired_sessions', batch_size=10, stdout=out)
+        self.assertIn('Deleted 25 expired sessions', out.getvalue())
+        self.assertEqual(sorted(Session.objects.values_list('session_key', flat=True)), ['live0', 'live1', 'live2'])
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('DELETE')]), 3)
+
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache'):
+            out = StringIO()
+            call_command('clear_expired_sessions', stdout=out)
+            self.assertIn('Deleted 0 expired sessions', out.getvalue())
+
+
+class RateLimitTestCase(TestCase):
+    LIMITS = {
+        'travel_options': {'rate': '60/m', 'burst': 3},
+        'login': {'rate': '6/m', 'burst': 2, 'methods': ('POST',)},
+    }
+
+    def setUp(self):
+        rate_limiter.clear()
+        self.now = 1000.0
+        for buckets in (LocalBuckets, CacheBuckets):
+            patcher = mock.patch.object(buckets, 'clock', staticmethod(lambda: self.now))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def statuses(self, count, url=None, **extra):
+        url = url or reverse('travel_options')
+        return [self.client.get(url, **extra).status_code for _ in range(count)]
+
+    def test_burst_then_429_without_queries(self):
+        with override_settings(RATE_LIMIT={'RATES': self.LIMITS}):
+            self.assertEqual(self.statuses(3), [200, 200, 200])
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('travel_options'))
+            self.assertEqual(len(queries), 0)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '1')
+            # Another client address has its own bucket
+            self.assertEqual(self.statuses(1, REMOTE_ADDR='10.0.0.2'), [200])
+
+    def test_steady_state_refill_rate(self):
+        with override_settings(RATE_LIMIT={'RATES': self.LIMITS}):
+            allowed = 0
+            # Two requests a second against one token a second, for a minute
+            for _ in range(120):
+                allowed += self.statuses(1) == [200]
+                self.now += 0.5
+            self.assertEqual(allowed, 3 + 60 - 1)
+
+            # A long pause refills only up to the burst
+            self.now += 3600
+            self.assertEqual(self.statuses(4), [200, 200, 200, 429])
+
+    def test_login_is_refused_before_hashing(self):
+        with override_settings(RATE_LIMIT={'RATES': self.LIMITS}), mock.patch('booking.views.authenticate', return_value=None) as authenticate:
+            for _ in range(3):
+                response = self.client.post(reverse('login'), {'username': 'someone', 'password': 'guess'})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(authenticate.call_count, 2)
+            # Only POSTs are limited
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+    def test_signed_in_users_are_keyed_by_user(self):
+        User.objects.create_user(username='limited', password='testpass123')
+        self.client.login(username='limited', password='testpass123')
+        with override_settings(RATE_LIMIT={'RATES': self.LIMITS}):
+            self.assertEqual(self.statuses(4), [200, 200, 200, 429])
+            # Same address, no session: a separate bucket
+            self.assertEqual(Client().get(reverse('travel_options')).status_code, 200)
+
+    def test_login_guesses_are_limited_per_address_and_username(self):
+        limits = {'login': [
+            {'rate': '60/m', 'burst': 10, 'methods': ('POST',), 'by': 'ip'},
+            {'rate': '6/m', 'burst': 2, 'methods': ('POST',), 'by': 'ip', 'field': 'username'},
+        ]}
+
+        def post(username, address):
+            return self.client.post(reverse('login'), {'username': username, 'password': 'guess'}, REMOTE_ADDR=address).status_code
+
+        with override_settings(RATE_LIMIT={'RATES': limits}), mock.patch('booking.views.authenticate', return_value=None) as authenticate:
+            statuses = [post(username, '10.0.0.1') for username in ['victim', ' Victim', 'VICTIM']]
+            self.assertEqual(statuses, [200, 200, 429])
+            self.assertEqual(authenticate.call_count, 2)
+            # The account's owner, from another address, is not locked out
+            self.assertEqual(post('victim', '10.0.0.2'), 200)
+            # Other usernames, and posts without one, only count against the address
+            self.assertEqual(post('someone', '10.0.0.1'), 200)
+            self.assertEqual(self.client.post(reverse('login'), {'password': 'guess'}, REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+    def test_refused_login_reads_no_session(self):
+        User.objects.create_user(username='limited', password='testpass123')
+        self.client.login(username='limited', password='testpass123')
+        limits = {'login': {'rate': '6/m', 'burst': 1, 'methods': ('POST',), 'by': 'ip'}}
+        with override_settings(RATE_LIMIT={'RATES': limits}):
+            self.client.post(reverse('login'), {'username': 'limited', 'password': 'guess'})
+            with self.assertNumQueries(0):
+                response = self.client.post(reverse('login'), {'username': 'limited', 'password': 'guess'})
+            self.assertEqual(response.status_code, 429)
+
+    def test_proxy_header_defaults_on_render(self):
+        from travel_booking import settings as project_settings
+        environ = {k: v for k, v in os.environ.items() if k not in ('RENDER', 'RATE_LIMIT_IP_HEADER')}
+        try:
+            with mock.patch.dict(os.environ, environ, clear=True):
+                importlib.reload(project_settings)
+                self.assertIsNone(project_settings.RATE_LIMIT['IP_HEADER'])
+            with mock.patch.dict(os.environ, {**environ, 'RENDER': 'true'}, clear=True):
+                importlib.reload(project_settings)
+                self.assertEqual(project_settings.RATE_LIMIT['IP_HEADER'], 'HTTP_X_FORWARDED_FOR')
+        finally:
+            importlib.reload(project_settings)
+
+        with override_settings(RATE_LIMIT={'RATES': self.LIMITS, 'IP_HEADER': 'HTTP_X_FORWARDED_FOR'}):
+            # The proxy appends the real address after whatever the client sent
+            self.assertEqual(self.statuses(4, HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.9'), [200, 200, 200, 429])
+            self.assertEqual(self.statuses(1, HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.8'), [200])
+
+    def test_deploy_check_warns_without_a_proxy_header(self):
+        from .ratelimit import check_ip_header
+        with override_settings(RATE_LIMIT={'IP_HEADER': None}):
+            self.assertEqual([warning.id for warning in check_ip_header(None)], ['booking.W001'])
+        with override_settings(RATE_LIMIT={'IP_HEADER': 'HTTP_X_FORWARDED_FOR'}):
+            self.assertEqual(check_ip_header(None), [])
+
+    def test_shared_cache_backend(self):
+        cache.clear()
+        settings = {'RATES': {'api_travel_options': {'rate': '60/m', 'burst': 2}}, 'BACKEND': 'booking.ratelimit.CacheBuckets'}
+        with override_settings(RATE_LIMIT=settings):
+            self.assertEqual(self.statuses(3, reverse('api_travel_options')), [200, 200, 429])
+            response = self.client.get(reverse('api_travel_options'))
+            self.assertIn('Too many requests', response.json()['errors']['__all__'][0])
+
+
+class GunicornConfigTestCase(TestCase):
+    CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+    def load(self, **environ):
+        import runpy
+        names = ('WEB_CONCURRENCY', 'GUNICORN_THREADS', 'DB_CONNECTION_BUDGET', 'DB_POOLER', 'SERVER_MODE')
+        clean = {k: v for k, v in os.environ.items() if k not in names}
+        with mock.patch.dict(os.environ, {**clean, **environ}, clear=True):
+            return runpy.run_path(self.CONFIG)
+
+    def test_workers_fit_the_database_connection_budget(self):
+        config = self.load(WEB_CONCURRENCY='33')
+        self.assertEqual((config['workers'], config['threads']), (10, 4))
+        self.assertLessEqual(config['workers'] * (config['threads'] + 1), 50)
+
+        self.assertEqual(self.load(WEB_CONCURRENCY='33', DB_POOLER='pgbouncer')['workers'], 33)
+        self.assertEqual(self.load(WEB_CONCURRENCY='33', DB_CONNECTION_BUDGET='3')['workers'], 1)
+        self.assertEqual(self.load(WEB_CONCURRENCY='33', SERVER_MODE='asgi')['workers'], 25)
+
+    def test_cpus_come_from_the_cgroup_quota(self):
+        config = self.load()
+        available_cpus = config['available_cpus']
+        files = {config['CGROUP_V2_CPU_MAX']: '150000 100000\n'}
+
+        def fake_open(path, *args, **kwargs):
+            if path not in files:
+                raise FileNotFoundError(path)
+            return StringIO(files[path])
+
+        with mock.patch.object(os, 'sched_getaffinity', return_value=set(range(16)), create=True), \
+                mock.patch('builtins.open', fake_open):
+            self.assertEqual(available_cpus(), 2)
+            files[config['CGROUP_V2_CPU_MAX']] = 'max 100000\n'
+            self.assertEqual(available_cpus(), 16)
+            files.clear()
+            self.assertEqual(available_cpus(), 16)
@@ -1,16 +1,48 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
-urlpatterns = [
-    path('', views.home, name='home'),
-    path('register/', views.register, name='register'),
-    path('login/', views.user_login, name='login'),
-    path('logout/', views.user_logout, name='logout'),
-    path('profile/', views.profile, name='profile'),
-    path('travel-options/', views.travel_options, name='travel_options'),
-    path('travel-option/<int:pk>/', views.travel_option_detail, name='travel_option_detail'),
-    path('book-travel/<int:pk>/', views.book_travel, name='book_travel'),
-    path('my-bookings/', views.my_bookings, name='my_bookings'),
-    path('booking/<int:pk>/', views.booking_detail, name='booking_detail'),
-    path('cancel-booking/<int:pk>/', views.cancel_booking, name='cancel_booking'),
-]
\ No newline at end of file
+# Token buckets per URL name (booking.ratelimit), per signed-in user or
+# client IP. ``methods`` limits only those methods; ``burst`` defaults to the
+# rate's count; ``'by': 'ip'`` keys by client IP without reading the session.
+# settings.RATE_LIMIT['RATES'] overrides entries by name.
+RATE_LIMITS = {
+    'login': [
+        {'rate': '10/m', 'burst': 5, 'methods': ('POST',), 'by': 'ip'},
+        # Per address and submitted username, so nobody else can use up an
+        # account's allowance and lock its owner out
+        {'rate': '20/h', 'burst': 10, 'methods': ('POST',), 'by': 'ip', 'field': 'username'},
+    ],
+    'register': {'rate': '10/h', 'burst': 3, 'methods': ('POST',), 'by': 'ip'},
+    'travel_options': {'rate': '120/m', 'burst': 30},
+    'api_travel_options': {'rate': '120/m', 'burst': 30},
+    'api_connections': {'rate': '60/m', 'burst': 20},
+    'book_travel': {'rate': '20/m', 'burst': 5, 'methods': ('POST',)},
+    'api_batch_booking': {'rate': '10/m', 'burst': 3, 'methods': ('POST',)},
+}
+
+def build_urlpatterns(read_views):
+    # Read-heavy pages come from read_views: views, or async_views under ASGI
+    return [
+        path('', read_views.home, name='home'),
+        path('register/', views.register, name='register'),
+        path('login/', views.user_login, name='login'),
+        path('logout/', views.user_logout, name='logout'),
+        path('profile/', views.profile, name='profile'),
+        path('travel-options/', read_views.travel_options, name='travel_options'),
+        path('travel-option/<int:pk>/', read_views.travel_option_detail, name='travel_option_detail'),
+        path('book-travel/<int:pk>/', views.book_travel, name='book_travel'),
+        path('my-bookings/', views.my_bookings, name='my_bookings'),
+        path('booking/<int:pk>/', views.booking_detail, name='booking_detail'),
+        path('confirm-booking/<int:pk>/', views.confirm_booking, name='confirm_booking'),
+        path('cancel-booking/<int:pk>/', views.cancel_booking, name='cancel_booking'),
+        path('api/travel-options/', api.travel_options_api, name='api_travel_options'),
+        path('api/connections/', api.connections_api, name='api_connections'),
+        path('api/fare-calendar/', api.fare_calendar_api, name='api_fare_calendar'),
+        path('api/cities/', api.city_autocomplete_api, name='api_cities'),
+        path('api/bookings/batch/', api.batch_booking_api, name='api_batch_booking'),
+        path('staff/search-cache/', views.search_cache_stats, name='search_cache_stats'),
+        path('staff/performance/', views.performance_stats_view, name='performance_stats'),
+    ]
+
+urlpatterns = build_urlpatterns(async_views if settings.ASYNC_VIEWS else views)
\ No newline at end of file
@@ -1,21 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.utils import timezone
 from django.core.paginator import Paginator
 from django.db import transaction
 from datetime import datetime
 from .models import TravelOption, Booking, UserProfile
 from .forms import UserRegistrationForm, UserProfileForm, BookingForm, TravelSearchForm
+from .search import cached_search, search_ordering
+from .search_cache import search_cache
+from .featured import featured_feed
+from .performance import performance_stats
+from .pagination import KeysetPaginator
+from .route_index import route_index
+from .inventory import SeatsUnavailable, confirm_hold, place_hold, release_seats
+
+TRAVEL_OPTIONS_PER_PAGE = 9
 
 def home(request):
-    featured_options = TravelOption.objects.filter(
-        departure_date_time__gte=timezone.now(),
-        available_seats__gt=0
-    )[:6]
+    featured_options = featured_feed.get()
     return render(request, 'booking/home.html', {'featured_options': featured_options})
 
 def register(request):
@@ -76,67 +84,56 @@ def profile(request):
     else:
         form = UserProfileForm(instance=profile)
     
-    recent_bookings = Booking.objects.filter(user=request.user)[:5]
+    bookings = Booking.objects.filter(user=request.user)
+    recent_bookings = bookings.select_related('travel_option')[:5]
+    stats = bookings.aggregate(
+        total_bookings=Count('pk'),
+        active_bookings=Count('pk', filter=Q(status='CONFIRMED', travel_option__departure_date_time__gte=timezone.now()))
+    )
     return render(request, 'booking/profile.html', {
         'form': form,
         'profile': profile,
-        'recent_bookings': recent_bookings
+        'recent_bookings': recent_bookings,
+        **stats
     })
 
 def travel_options(request):
     form = TravelSearchForm(request.GET)
-    options = TravelOption.objects.filter(
-        departure_date_time__gte=timezone.now(),
-        available_seats__gt=0
-    )
+    cleaned_data = form.cleaned_data if form.is_valid() else None
+    options, total_count = cached_search(cleaned_data)
     
-    # Search and filter functionality
-    if form.is_valid():
-        if form.cleaned_data.get('type'):
-            options = options.filter(type=form.cleaned_data['type'])
-        
-        if form.cleaned_data.get('source'):
-            options = options.filter(source__icontains=form.cleaned_data['source'])
-        
-        if form.cleaned_data.get('destination'):
-            options = options.filter(destination__icontains=form.cleaned_data['destination'])
-        
-        if form.cleaned_data.get('date_from'):
-            options = options.filter(departure_date_time__date__gte=form.cleaned_data['date_from'])
-        
-        if form.cleaned_data.get('date_to'):
-            options = options.filter(departure_date_time__date__lte=form.cleaned_data['date_to'])
-        
-        if form.cleaned_data.get('max_price'):
-            options = options.filter(price__lte=form.cleaned_data['max_price'])
-        
-        # Sorting
-        sort_by = form.cleaned_data.get('sort_by')
-        if sort_by == 'price_low':
-            options = options.order_by('price')
-        elif sort_by == 'price_high':
-            options = options.order_by('-price')
-        elif sort_by == 'departure':
-            options = options.order_by('departure_date_time')
-    
-    # Pagination
-    paginator = Paginator(options, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination: keyset cursors by default, numbered pages for old ?page= links
+    keyset = 'page' not in request.GET
+    if not keyset:
+        paginator = Paginator(options, TRAVEL_OPTIONS_PER_PAGE)
+        paginator.count = total_count
+        page_obj = paginator.get_page(request.GET.get('page'))
+    else:
+        paginator = KeysetPaginator(options, search_ordering(cleaned_data), TRAVEL_OPTIONS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('cursor', None)
     
     return render(request, 'booking/travel_options.html', {
         'page_obj': page_obj,
+        'keyset': keyset,
         'form': form,
-        'total_count': paginator.count
+        'total_count': total_count,
+        'query_string': query.urlencode()
     })
 
 def travel_option_detail(request, pk):
     option = get_object_or_404(TravelOption, pk=pk)
-    similar_options = TravelOption.objects.filter(
-        source=option.source,
-        destination=option.destination,
-        departure_date_time__gte=timezone.now()
-    ).exclude(pk=pk)[:3]
+    similar_options = TravelOption.objects.filter(departure_date_time__gte=timezone.now()).exclude(pk=pk)
+    candidates = route_index.candidates(source=option.source, destination=option.destination, exact=True)
+    if candidates is not None:
+        # A few spare ids cover the current option and any stale index entries
+        similar_options = similar_options.filter(pk__in=candidates[:10])
+    else:
+        similar_options = similar_options.filter(source=option.source, destination=option.destination)
+    similar_options = similar_options[:3]
     
     return render(request, 'booking/travel_option_detail.html', {
         'option': option,
@@ -144,7 +141,6 @@ def travel_option_detail(request, pk):
     })
 
 @login_required
-@transaction.atomic
 def book_travel(request, pk):
     option = get_object_or_404(TravelOption, pk=pk)
     
@@ -155,20 +151,20 @@ def book_travel(request, pk):
     if request.method == 'POST':
         form = BookingForm(request.POST, max_seats=option.available_seats)
         if form.is_valid():
-            with transaction.atomic():
-                booking = form.save(commit=False)
-                booking.user = request.user
-                booking.travel_option = option
-                booking.total_price = option.price * booking.number_of_seats
-                booking.status = 'CONFIRMED'
-                booking.save()
-                
-                # Update available seats
-                option.available_seats -= booking.number_of_seats
-                option.save()
-                
-                messages.success(request, f'Booking {booking.booking_id} confirmed successfully!')
-                return redirect('booking_detail', pk=booking.pk)
+            booking = form.save(commit=False)
+            booking.user = request.user
+            booking.travel_option = option
+            booking.total_price = option.price * booking.number_of_seats
+            try:
+                # Short hold on the seats; confirmation is a separate step
+                place_hold(booking)
+            except SeatsUnavailable:
+                messages.error(request, 'Sorry, the requested seats are no longer available.')
+                return redirect('travel_option_detail', pk=option.pk)
+            
+            expires = timezone.localtime(booking.hold_expires_at)
+            messages.info(request, f'Seats held for booking {booking.booking_id} until {expires:%H:%M}. Confirm to complete your booking.')
+            return redirect('booking_detail', pk=booking.pk)
     else:
         initial = {
             'contact_email': request.user.email,
@@ -184,18 +180,22 @@ def book_travel(request, pk):
 @login_required
 def my_bookings(request):
     status_filter = request.GET.get('status', '')
-    bookings = Booking.objects.filter(user=request.user)
+    bookings = Booking.objects.filter(user=request.user).select_related('travel_option')
     
     if status_filter:
         bookings = bookings.filter(status=status_filter)
     
     # Separate current and past bookings
+    # Live seat holds are listed with confirmed trips so they can be confirmed
+    now = timezone.now()
+    live_hold = Q(status='PENDING', hold_expires_at__gt=now)
     current_bookings = bookings.filter(
-        travel_option__departure_date_time__gte=timezone.now(),
-        status='CONFIRMED'
+        Q(status='CONFIRMED') | live_hold,
+        travel_option__departure_date_time__gte=now
     )
+    # A lapsed hold is past as soon as it expires, swept or not
     past_bookings = bookings.filter(
-        Q(travel_option__departure_date_time__lt=timezone.now()) | Q(status='CANCELLED')
+        Q(travel_option__departure_date_time__lt=now) | Q(status='CANCELLED') | (Q(status='PENDING') & ~live_hold)
     )
     
     return render(request, 'booking/my_bookings.html', {
@@ -206,20 +206,30 @@ def my_bookings(request):
 
 @login_required
 def booking_detail(request, pk):
-    booking = get_object_or_404(Booking, pk=pk, user=request.user)
-    
-    # Split passenger names into a list
-    passenger_names = [name.strip() for name in booking.passenger_names.split(',') if name.strip()]
+    booking = get_object_or_404(
+        Booking.objects.select_related('travel_option').prefetch_related('passengers'), pk=pk, user=request.user
+    )
     
     return render(request, 'booking/booking_detail.html', {
         'booking': booking,
-        'passenger_names': passenger_names
+        'passengers': booking.passengers.all()
     })
 
+@login_required
+def confirm_booking(request, pk):
+    booking = get_object_or_404(Booking, pk=pk, user=request.user)
+    
+    if request.method == 'POST':
+        if confirm_hold(booking.pk):
+            messages.success(request, f'Booking {booking.booking_id} confirmed successfully!')
+        else:
+            messages.error(request, 'This seat hold has expired or was released. Please book again.')
+    return redirect('booking_detail', pk=pk)
+
 @login_required
 @transaction.atomic
 def cancel_booking(request, pk):
-    booking = get_object_or_404(Booking, pk=pk, user=request.user)
+    booking = get_object_or_404(Booking.objects.select_related('travel_option'), pk=pk, user=request.user)
     
     if not booking.is_cancellable:
         messages.error(request, 'This booking cannot be cancelled.')
@@ -227,15 +237,28 @@ def cancel_booking(request, pk):
     
     if request.method == 'POST':
         with transaction.atomic():
-            # Return seats to available pool
-            booking.travel_option.available_seats += booking.number_of_seats
-            booking.travel_option.save()
+            # Flip the status first so a double submit cannot release seats twice
+            cancelled = Booking.objects.filter(
+                pk=booking.pk, status__in=['CONFIRMED', 'PENDING']
+            ).update(status='CANCELLED', hold_expires_at=None)
+            if not cancelled:
+                messages.error(request, 'This booking cannot be cancelled.')
+                return redirect('booking_detail', pk=pk)
             
-            # Update booking status
-            booking.status = 'CANCELLED'
-            booking.save()
+            # Return seats to available pool
+            release_seats(booking.travel_option_id, booking.number_of_seats)
             
             messages.success(request, f'Booking {booking.booking_id} has been cancelled successfully.')
             return redirect('my_bookings')
     
-    return render(request, 'booking/cancel_booking.html', {'booking': booking})
\ No newline at end of file
+    return render(request, 'booking/cancel_booking.html', {'booking': booking})
+
+@staff_member_required
+def search_cache_stats(request):
+    return JsonResponse(search_cache.stats())
+
+@staff_member_required
+def performance_stats_view(request):
+    if request.method == 'POST':
+        performance_stats.reset()
+    return JsonResponse(performance_stats.snapshot())
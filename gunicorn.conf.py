@@ -0,0 +1,93 @@
+# Gunicorn configuration: `gunicorn -c gunicorn.conf.py`
+#
+# SERVER_MODE=wsgi (default) runs threaded sync workers on the WSGI app;
+# SERVER_MODE=asgi runs uvicorn workers on the ASGI app with async views.
+# Every value can be overridden through the environment.
+import math
+import os
+
+CGROUP_V2_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().split()
+
+
+def available_cpus():
+    # os.cpu_count() reports the host's CPUs; a container may be limited to
+    # fewer by its affinity mask or its cgroup CPU quota
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    try:
+        quota, period = _read(CGROUP_V2_CPU_MAX)
+        quota = -1 if quota == 'max' else int(quota)
+    except (OSError, ValueError):
+        try:
+            quota, period = int(_read(CGROUP_V1_QUOTA)[0]), _read(CGROUP_V1_PERIOD)[0]
+        except (OSError, ValueError, IndexError):
+            quota = -1
+    if quota > 0:
+        cpus = min(cpus, max(1, math.ceil(quota / int(period))))
+    return cpus
+
+
+cpu_count = available_cpus()
+server_mode = os.environ.get('SERVER_MODE', 'wsgi')
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+if server_mode == 'asgi':
+    wsgi_app = 'travel_booking.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    # One event loop per core; each serves many concurrent requests
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count + 1))
+    threads = 1
+else:
+    wsgi_app = 'travel_booking.wsgi:application'
+    worker_class = 'gthread'
+    # Requests mostly wait on PostgreSQL, so a few threads per process add
+    # concurrency without multiplying per-process memory
+    workers = int(os.environ.get('WEB_CONCURRENCY', 2 * cpu_count + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Every thread may hold a persistent database connection (DB_CONN_MAX_AGE),
+# and each worker's hold sweeper holds one more. PostgreSQL allows 100 by
+# default, shared with deploys overlapping this instance, management
+# commands and admin sessions, so one instance gets DB_CONNECTION_BUDGET
+# (50; 400 behind PgBouncer, whose client limit is 500) and the worker
+# count is cut to fit it. Under ASGI the ORM runs on one thread per worker.
+db_connection_budget = int(os.environ.get('DB_CONNECTION_BUDGET', 400 if os.environ.get('DB_POOLER') else 50))
+connections_per_worker = (threads if server_mode != 'asgi' else 1) + 1
+workers = max(1, min(workers, db_connection_budget // connections_per_worker))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to cap memory growth; jitter avoids all
+# workers restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Seconds between sweeps for lapsed seat holds in every worker (see
+# booking.inventory.start_hold_sweeper); 0 leaves it to a cron job running
+# `manage.py release_expired_holds`
+hold_sweep_interval = int(os.environ.get('HOLD_SWEEP_INTERVAL', 60))
+
+
+def on_starting(server):
+    server.log.info(
+        'Sizing: %d CPUs available, %d workers x %d threads, up to %d database connections (budget %d)',
+        cpu_count, workers, threads, workers * connections_per_worker, db_connection_budget,
+    )
+
+
+def post_worker_init(worker):
+    if hold_sweep_interval > 0:
+        from booking.inventory import start_hold_sweeper
+        start_hold_sweeper(hold_sweep_interval)
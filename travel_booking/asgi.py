@@ -0,0 +1,8 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'travel_booking.settings')
+# Serve the async search and detail views when running under ASGI
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+
+application = get_asgi_application()
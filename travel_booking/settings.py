@@ -30,12 +30,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'booking.performance.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'booking.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,14 +60,34 @@ TEMPLATES = [
     },
 ]
 
+# Compile each template once per process in production. An explicit loaders
+# list can't be combined with APP_DIRS.
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'travel_booking.wsgi.application'
+ASGI_APPLICATION = 'travel_booking.asgi.application'
+
+# Route home, search and detail to booking.async_views (set by asgi.py)
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
 
 # Database configuration
+# Persistent connections with health checks on both branches. Under ASGI the
+# connection is not reused across requests, so rely on a pooler (pgbouncer)
+# there instead and close connections after each request.
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 0 if ASYNC_VIEWS else 600))
+
 if os.environ.get('DATABASE_URL'):
     DATABASES = {
         'default': dj_database_url.config(
             default=os.environ.get('DATABASE_URL'),
-            conn_max_age=600,
+            conn_max_age=CONN_MAX_AGE,
             conn_health_checks=True,
         )
     }
@@ -78,9 +100,16 @@ else:
             'PASSWORD': os.environ.get('DB_PASSWORD'),
             'HOST': os.environ.get('DB_HOST'),
             'PORT': os.environ.get('DB_PORT'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 
+# pgbouncer in transaction mode cannot keep the named cursors behind
+# queryset.iterator() open across statements
+if os.environ.get('DB_POOLER') == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -116,6 +145,77 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Search: seconds between route index rebuilds and result count cache lifetime
+ROUTE_INDEX_TTL = int(os.environ.get('ROUTE_INDEX_TTL', 300))
+SEARCH_COUNT_TTL = int(os.environ.get('SEARCH_COUNT_TTL', 60))
+# Seconds between city autocomplete index rebuilds (booking.city_index)
+CITY_INDEX_TTL = int(os.environ.get('CITY_INDEX_TTL', 600))
+
+# Search result id cache. Use booking.search_cache.DjangoCacheStore to share
+# entries across workers through a CACHES alias (e.g. Redis).
+SEARCH_CACHE = {
+    'BACKEND': os.environ.get('SEARCH_CACHE_BACKEND', 'booking.search_cache.LocMemLRUStore'),
+    'OPTIONS': {},
+    'TTL': int(os.environ.get('SEARCH_CACHE_TTL', 120)),
+    'MAX_IDS': 2000,
+}
+
+# Multi-leg connection search (booking.itineraries). Layovers are measured
+# from one leg's arrival to the next leg's departure.
+CONNECTION_SEARCH = {
+    'MIN_LAYOVER_MINUTES': int(os.environ.get('CONNECTION_MIN_LAYOVER_MINUTES', 60)),
+    'MAX_LAYOVER_HOURS': 24,
+    'MAX_LEGS': 3,
+    'TTL': int(os.environ.get('CONNECTION_GRAPH_TTL', 3600)),
+}
+
+# Per-route fare calendar (booking.fare_calendar): cheapest bookable fare
+# per departure day over the next DAYS days, cached for up to TTL seconds.
+# Other workers' bookings only clear entries in a shared CACHE alias (e.g.
+# Redis). In a process-local one an entry lives at most LOCAL_TTL seconds.
+FARE_CALENDAR = {
+    'DAYS': 90,
+    'TTL': int(os.environ.get('FARE_CALENDAR_TTL', 3600)),
+    'CACHE': os.environ.get('FARE_CALENDAR_CACHE', 'default'),
+    'LOCAL_TTL': int(os.environ.get('FARE_CALENDAR_LOCAL_TTL', 60)),
+}
+
+# Seconds a PENDING booking holds its seats before release_expired_holds
+# returns them
+SEAT_HOLD_TTL = int(os.environ.get('SEAT_HOLD_TTL', 600))
+
+# Home page featured feed, rebuilt in the background once older than TTL
+# seconds or after an inventory change
+FEATURED_FEED = {
+    'SIZE': 6,
+    'TTL': int(os.environ.get('FEATURED_FEED_TTL', 300)),
+    'BACKGROUND_REFRESH': True,
+}
+
+# Rate limits (booking.ratelimit); the limits per URL name are in
+# booking.urls.RATE_LIMITS. Use booking.ratelimit.CacheBuckets to share
+# buckets across workers through a CACHES alias. RATE_LIMIT_IP_HEADER names
+# the header a proxy appends the client address to. Render (which sets
+# RENDER) appends it to X-Forwarded-For. Never set it without a proxy in
+# front: clients could then pick their own address.
+RATE_LIMIT = {
+    'ENABLED': os.environ.get('RATE_LIMIT', 'True') == 'True',
+    'BACKEND': os.environ.get('RATE_LIMIT_BACKEND', 'booking.ratelimit.LocalBuckets'),
+    'OPTIONS': {},
+    'IP_HEADER': os.environ.get(
+        'RATE_LIMIT_IP_HEADER', 'HTTP_X_FORWARDED_FOR' if os.environ.get('RENDER') else ''
+    ) or None,
+}
+
+# Per-view timing (booking.performance). SAMPLE_RATE is the fraction of
+# requests timed; sampled responses get a Server-Timing header.
+PERFORMANCE_MONITOR = {
+    'ENABLED': os.environ.get('PERFORMANCE_MONITOR', 'True') == 'True',
+    'SAMPLE_RATE': float(os.environ.get('PERFORMANCE_SAMPLE_RATE', 1.0 if DEBUG else 0.1)),
+    'WINDOW': 1000,
+    'SERVER_TIMING': True,
+}
+
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/'
@@ -126,6 +226,39 @@ MESSAGE_TAGS = {
     messages.ERROR: 'danger',
 }
 
+# Flash messages travel in a signed cookie instead of the session. They are
+# short status lines (booking references at most) shown to the user who
+# caused them, so they never need the session table.
+MESSAGE_STORAGE = os.environ.get('MESSAGE_STORAGE', 'django.contrib.messages.storage.cookie.CookieStorage')
+
+# Sessions: SESSION_BACKEND is db, cached_db or cache. cached_db serves
+# reads from the 'sessions' cache and writes through to the database; cache
+# skips the database entirely. Both need a cache every worker shares, or a
+# session flushed on one worker (logout, login key rotation) stays valid on
+# the others: set SESSION_CACHE_URL to a Redis URL (requires the redis
+# package). cached_db is the default only then; otherwise sessions stay in
+# the database and the per-process LocMemCache below is just a stand-in for
+# single-process runs.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    'SESSION_BACKEND', 'cached_db' if os.environ.get('SESSION_CACHE_URL') else 'db'
+)
+SESSION_CACHE_ALIAS = 'sessions'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+if os.environ.get('SESSION_CACHE_URL'):
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['SESSION_CACHE_URL'],
+    }
+
 # FIX FOR REDIRECT LOOP - Add these lines
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SECURE_SSL_REDIRECT = False  # Set to False for Render